@@ -0,0 +1,88 @@
+"""
+Commit latency on synthetic repositories: GitManager.commit_changes against the
+old `git add --all` + `repo.index.commit` path, across tree sizes and
+numbers of changed files.
+
+    python benchmarks/commit_scaling.py --sizes 10000,100000 --changes 1,10,100,1000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from git import Repo  # noqa: E402
+from monacode.git import GitManager  # noqa: E402
+
+
+def make_repo(root: Path, files: int) -> None:
+    subprocess.run(["git", "init", "-q", str(root)], check=True)
+    for i in range(files):
+        d = root / f"d{i // 1000:04d}"
+        if i % 1000 == 0:
+            d.mkdir()
+        (d / f"f{i}.txt").write_text(f"{i}\n")
+    env = dict(os.environ, GIT_AUTHOR_NAME="bench", GIT_AUTHOR_EMAIL="bench@example.com",
+               GIT_COMMITTER_NAME="bench", GIT_COMMITTER_EMAIL="bench@example.com")
+    subprocess.run(["git", "add", "--all"], cwd=str(root), check=True, env=env)
+    subprocess.run(["git", "commit", "-q", "--no-verify", "-m", "init"], cwd=str(root),
+                   check=True, env=env)
+
+
+def touch(root: Path, files: int, count: int, round_no: int) -> None:
+    step = max(1, files // count)
+    for i in range(0, step * count, step):
+        path = root / f"d{i // 1000:04d}" / f"f{i}.txt"
+        path.write_text(f"{i} {round_no}\n")
+
+
+def legacy_commit(root: Path, message: str) -> None:
+    repo = Repo(str(root))
+    repo.git.add("--all")
+    repo.index.commit(message)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="10000,50000")
+    parser.add_argument("--changes", default="1,10,100,1000")
+    parser.add_argument("--no-legacy", action="store_true",
+                        help="Skip timing the old add --all path")
+    args = parser.parse_args()
+
+    os.environ.setdefault("GIT_AUTHOR_NAME", "bench")
+    os.environ.setdefault("GIT_AUTHOR_EMAIL", "bench@example.com")
+    os.environ.setdefault("GIT_COMMITTER_NAME", "bench")
+    os.environ.setdefault("GIT_COMMITTER_EMAIL", "bench@example.com")
+
+    gm = GitManager()
+    print(f"{'files':>8} {'changed':>8} {'commit':>12} {'legacy':>12}")
+    for files in (int(x) for x in args.sizes.split(",")):
+        with tempfile.TemporaryDirectory(prefix="monacode-bench-") as tmp:
+            root = Path(tmp) / "repo"
+            make_repo(root, files)
+            round_no = 0
+            for count in (int(x) for x in args.changes.split(",")):
+                count = min(count, files)
+                round_no += 1
+                touch(root, files, count, round_no)
+                start = time.perf_counter()
+                gm.commit_changes(str(root), f"bench {round_no}")
+                new = time.perf_counter() - start
+
+                legacy = float("nan")
+                if not args.no_legacy:
+                    round_no += 1
+                    touch(root, files, count, round_no)
+                    start = time.perf_counter()
+                    legacy_commit(root, f"bench {round_no}")
+                    legacy = time.perf_counter() - start
+                print(f"{files:>8} {count:>8} {new * 1000:>10.1f}ms {legacy * 1000:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import base64
+import select
+import socket
+import struct
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+from .utils import VaultError
+
+
+SOCKET_NAME = "agent.sock"
+
+
+def socket_path(vault_home: Path) -> Path:
+    """
+    Agent socket for a vault; MONACODE_VAULT_AGENT overrides the default
+    `<vault_home>/agent.sock`.
+    """
+    override = os.environ.get("MONACODE_VAULT_AGENT")
+    return Path(override) if override else vault_home / SOCKET_NAME
+
+
+def _supported() -> bool:
+    return hasattr(socket, "AF_UNIX") and hasattr(os, "fork")
+
+
+class VaultAgent:
+    """
+    ssh-agent style holder for a derived vault key. Serves newline-delimited
+    JSON requests on a 0600 Unix socket and exits after `idle_timeout`
+    seconds without a key request (or on "lock").
+    """
+
+    def __init__(self, key: bytes, vault_home: Path, idle_timeout: float = 900):
+        self.key = key
+        self.vault_home = Path(vault_home).resolve()
+        self.idle_timeout = idle_timeout
+        self.path = socket_path(self.vault_home)
+        self.last_used = time.monotonic()
+
+    def _bind(self) -> socket.socket:
+        if self.path.exists():
+            self.path.unlink()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old = os.umask(0o177)
+        try:
+            sock.bind(str(self.path))
+        finally:
+            os.umask(old)
+        os.chmod(str(self.path), 0o600)
+        sock.listen(16)
+        return sock
+
+    @staticmethod
+    def _peer_allowed(conn: socket.socket) -> bool:
+        opt = getattr(socket, "SO_PEERCRED", None)
+        if opt is None:
+            return True  # socket mode 0600 is the only guard here
+        creds = conn.getsockopt(socket.SOL_SOCKET, opt, struct.calcsize("3i"))
+        _, uid, _ = struct.unpack("3i", creds)
+        return uid == os.getuid()
+
+    def _handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        if op == "key":
+            if Path(request.get("vault", "")).resolve() != self.vault_home:
+                return {"error": "agent holds a different vault"}
+            self.last_used = time.monotonic()
+            return {"key": self.key.decode("ascii")}
+        if op == "ping":
+            remaining = self.idle_timeout - (time.monotonic() - self.last_used)
+            return {"ok": True, "pid": os.getpid(), "expires_in": max(0, int(remaining))}
+        if op == "lock":
+            return {"ok": True}
+        return {"error": f"unknown op: {op}"}
+
+    def serve(self) -> None:
+        sock = self._bind()
+        try:
+            while True:
+                remaining = self.idle_timeout - (time.monotonic() - self.last_used)
+                if remaining <= 0:
+                    return
+                ready, _, _ = select.select([sock], [], [], remaining)
+                if not ready:
+                    continue
+                conn, _ = sock.accept()
+                with conn:
+                    conn.settimeout(2)
+                    if not self._peer_allowed(conn):
+                        continue
+                    try:
+                        request = json.loads(conn.makefile("rb").readline() or b"{}")
+                    except (OSError, ValueError):
+                        continue
+                    reply = self._handle(request)
+                    try:
+                        conn.sendall(json.dumps(reply).encode() + b"\n")
+                    except OSError:
+                        pass
+                    if request.get("op") == "lock":
+                        return
+        finally:
+            sock.close()
+            try:
+                self.path.unlink()
+            except FileNotFoundError:
+                pass
+            # drop the key material as far as Python lets us
+            self.key = b""
+
+
+def _request(vault_home: Path, payload: Dict[str, Any], timeout: float = 0.5) -> Optional[Dict[str, Any]]:
+    """
+    Send one request to the agent; None if no agent is reachable.
+    """
+    if not _supported():
+        return None
+    path = socket_path(vault_home)
+    if not path.exists():
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(timeout)
+            conn.connect(str(path))
+            conn.sendall(json.dumps(payload).encode() + b"\n")
+            line = conn.makefile("rb").readline()
+        return json.loads(line) if line else None
+    except (OSError, ValueError):
+        return None
+
+
+def agent_key(vault_home: Path) -> Optional[bytes]:
+    """
+    The derived Fernet key held by a running agent for this vault, if any.
+    """
+    reply = _request(vault_home, {"op": "key", "vault": str(Path(vault_home).resolve())})
+    if not reply or "key" not in reply:
+        return None
+    return reply["key"].encode("ascii")
+
+
+def agent_status(vault_home: Path) -> Optional[Dict[str, Any]]:
+    return _request(vault_home, {"op": "ping"})
+
+
+def stop_agent(vault_home: Path) -> bool:
+    return _request(vault_home, {"op": "lock"}) is not None
+
+
+def spawn_agent(key: bytes, vault_home: Path, idle_timeout: float = 900) -> int:
+    """
+    Start a detached agent process holding `key`; returns its pid once the
+    socket answers.
+    """
+    if not _supported():
+        raise VaultError("The vault agent requires Unix domain sockets.")
+    stop_agent(vault_home)
+    base64.urlsafe_b64decode(key)  # refuse to serve anything but a Fernet key
+    agent = VaultAgent(key, vault_home, idle_timeout)
+
+    pid = os.fork()
+    if pid == 0:
+        # detach: new session, second fork so the agent is not a session leader
+        os.setsid()
+        if os.fork() != 0:
+            os._exit(0)
+        devnull = os.open(os.devnull, os.O_RDWR)
+        for fd in (0, 1, 2):
+            os.dup2(devnull, fd)
+        try:
+            agent.serve()
+        finally:
+            os._exit(0)
+    os.waitpid(pid, 0)
+
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        status = agent_status(vault_home)
+        if status:
+            return status["pid"]
+        time.sleep(0.02)
+    raise VaultError("Vault agent did not start.")
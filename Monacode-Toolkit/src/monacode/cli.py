@@ -3,10 +3,8 @@ import json
 import click
 from pathlib import Path
 
-from .utils import EnvManager, ConfigLoader, VaultManager
-from .llm import LLMManager
-from .git import GitManager, PluginManager
-from .updater import Updater, UpdateError
+# Managers are imported inside each command so that a command only pays
+# for the modules it uses (notably, env/config/vault never import LLM SDKs).
 
 
 @click.group(context_settings={"help_option_names": ["-h", "--help"]})
@@ -28,6 +26,7 @@ def env():
 @env.command("list")
 def env_list():
     """List all variables in .env."""
+    from .utils import EnvManager
     mgr = EnvManager()
     for k, v in mgr.all().items():
         click.echo(f"{k}={v}")
@@ -38,19 +37,42 @@ def env_list():
 @click.argument("default", required=False)
 def env_get(key, default):
     """Get ENV value (or default)."""
+    from .utils import EnvManager
     mgr = EnvManager()
     val = mgr.get(key, default)
     click.echo(val if val is not None else "")
 
 
 @env.command("set")
-@click.argument("key")
-@click.argument("value")
-def env_set(key, value):
-    """Set ENV variable and persist."""
+@click.argument("assignments", nargs=-1, required=True)
+def env_set(assignments):
+    """Set ENV variables and persist: KEY VALUE, or KEY=VALUE ..."""
+    from .utils import EnvManager
+    if len(assignments) == 2 and "=" not in assignments[0]:
+        items = {assignments[0]: assignments[1]}
+    else:
+        items = {}
+        for a in assignments:
+            if "=" not in a:
+                click.echo(f"Expected KEY=VALUE, got '{a}'", err=True)
+                sys.exit(1)
+            k, v = a.split("=", 1)
+            items[k] = v
     mgr = EnvManager()
-    mgr.set(key, value)
-    click.echo(f"Set {key}={value}")
+    mgr.set_many(items)
+    for k, v in items.items():
+        click.echo(f"Set {k}={v}")
+
+
+@env.command("load")
+@click.argument("file", type=click.Path(exists=True, dir_okay=False))
+def env_load(file):
+    """Merge variables from a .env FILE in one write."""
+    from dotenv import dotenv_values
+    from .utils import EnvManager
+    items = {k: v for k, v in dotenv_values(file).items() if v is not None}
+    EnvManager().set_many(items)
+    click.echo(f"Loaded {len(items)} variable(s) from {file}")
 
 
 #
@@ -63,22 +85,36 @@ def config():
 
 
 @config.command("show")
-def config_show():
-    """Show current config."""
-    cfg = ConfigLoader().load()
-    click.echo(json.dumps(cfg, indent=2))
+@click.argument("key", required=False)
+def config_show(key):
+    """Show effective config (system < user < project), or one dotted KEY."""
+    from .utils import ConfigLoader
+    loader = ConfigLoader()
+    cfg = loader.get(key) if key else loader.effective()
+    click.echo(json.dumps(cfg, indent=2, default=str))
 
 
 @config.command("save")
 @click.argument("key")
 @click.argument("value")
-def config_save(key, value):
-    """Save a key/value to config.yml."""
-    loader = ConfigLoader()
-    data = loader.load()
-    data[key] = value
-    loader.save(data)
-    click.echo(f"Config saved: {key}={value}")
+@click.option("--yaml", "as_yaml", is_flag=True,
+              help="Parse VALUE as YAML (numbers, booleans, lists, mappings)")
+def config_save(key, value, as_yaml):
+    """Save a value to config.yml; KEY may be dotted (llm.openai.timeout).
+
+    VALUE is stored as a string unless --yaml is given.
+    """
+    import yaml
+    from .utils import ConfigLoader
+    parsed = value
+    if as_yaml:
+        try:
+            parsed = yaml.safe_load(value)
+        except yaml.YAMLError as e:
+            click.echo(f"Error: invalid YAML value: {e}", err=True)
+            sys.exit(1)
+    ConfigLoader().set(key, parsed)
+    click.echo(f"Config saved: {key}={json.dumps(parsed, default=str)}")
 
 
 #
@@ -96,6 +132,7 @@ def vault():
 @click.option("--password", "-p", help="Vault password (overrides prompt)")
 def vault_add(key, secret, password):
     """Add or update secret in vault."""
+    from .utils import VaultManager
     vm = VaultManager()
     if secret is None:
         secret = click.prompt("Secret value", hide_input=True)
@@ -103,23 +140,86 @@ def vault_add(key, secret, password):
 
 
 @vault.command("get")
-@click.argument("key")
+@click.argument("keys", nargs=-1, required=True)
 @click.option("--password", "-p", help="Vault password (overrides prompt)")
-def vault_get(key, password):
-    """Retrieve secret from vault."""
+@click.option("--json", "as_json", is_flag=True, help="Print secrets as a JSON object")
+def vault_get(keys, password, as_json):
+    """Retrieve one or more secrets from vault."""
+    from .utils import VaultManager, format_env_line
     vm = VaultManager()
     try:
-        secret = vm.get_secret(key, password)
-        click.echo(secret)
+        secrets = vm.get_many(list(keys), password)
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    if as_json:
+        click.echo(json.dumps(secrets, indent=2))
+    elif len(keys) == 1:
+        click.echo(secrets[keys[0]])
+    else:
+        for k, v in secrets.items():
+            click.echo(format_env_line(k, v))
+
+
+@vault.command("import")
+@click.argument("source", type=click.File("r"), default="-")
+@click.option("--format", "-f", "fmt", type=click.Choice(["auto", "json", "env"]), default="auto",
+              help="Input format (auto-detected by default)")
+@click.option("--password", "-p", help="Vault password (overrides prompt)")
+def vault_import(source, fmt, password):
+    """Add secrets in bulk from a JSON object or .env file (or stdin)."""
+    import io
+    from dotenv import dotenv_values
+    from .utils import VaultManager
+    text = source.read()
+    if fmt == "auto":
+        fmt = "json" if text.lstrip().startswith("{") else "env"
+    try:
+        if fmt == "json":
+            # non-strings keep their JSON spelling: true, 1.5, {"a": 1}
+            items = {str(k): v if isinstance(v, str) else json.dumps(v)
+                     for k, v in json.loads(text).items()}
+        else:
+            items = {k: v for k, v in dotenv_values(stream=io.StringIO(text)).items() if v is not None}
+    except (ValueError, AttributeError) as e:
+        click.echo(f"Invalid {fmt} input: {e}", err=True)
+        sys.exit(1)
+    if not items:
+        click.echo("Nothing to import.")
+        return
+    try:
+        VaultManager().add_many(items, password)
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
         sys.exit(1)
 
 
+@vault.command("export")
+@click.option("--format", "-f", "fmt", type=click.Choice(["env", "json"]), default="env",
+              show_default=True, help="Output format")
+@click.option("--output", "-o", type=click.File("w"), default="-",
+              help="Write to file (defaults to stdout)")
+@click.option("--password", "-p", help="Vault password (overrides prompt)")
+def vault_export(fmt, output, password):
+    """Export all secrets as .env lines or JSON."""
+    from .utils import VaultManager, format_env_line
+    try:
+        secrets = VaultManager().export_secrets(password)
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    if fmt == "json":
+        output.write(json.dumps(secrets, indent=2) + "\n")
+    else:
+        for k, v in secrets.items():
+            output.write(format_env_line(k, v) + "\n")
+
+
 @vault.command("list")
 @click.option("--password", "-p", help="Vault password (overrides prompt)")
 def vault_list(password):
     """List secret keys."""
+    from .utils import VaultManager
     vm = VaultManager()
     try:
         vm.list_keys(password)
@@ -128,6 +228,32 @@ def vault_list(password):
         sys.exit(1)
 
 
+@vault.command("unlock")
+@click.option("--password", "-p", help="Vault password (overrides prompt)")
+@click.option("--timeout", "-t", default=900, show_default=True,
+              help="Seconds of inactivity before the agent forgets the key")
+def vault_unlock(password, timeout):
+    """Cache the vault key in a background agent for this session."""
+    from .utils import VaultManager
+    vm = VaultManager()
+    try:
+        pid = vm.unlock(password, idle_timeout=timeout)
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    click.echo(f"Vault unlocked (agent pid {pid}, idle timeout {timeout}s).")
+
+
+@vault.command("lock")
+def vault_lock():
+    """Stop the vault agent and forget the cached key."""
+    from .utils import VaultManager
+    if VaultManager().lock():
+        click.echo("Vault locked.")
+    else:
+        click.echo("No vault agent running.")
+
+
 #
 # LLM COMMANDS
 #
@@ -140,6 +266,7 @@ def llm():
 @llm.command("list-engines")
 def llm_list_engines():
     """List available LLM engines."""
+    from .llm import LLMManager
     lm = LLMManager()
     engines = lm.list_engines()
     for name, desc in engines.items():
@@ -151,10 +278,12 @@ def llm_list_engines():
 @click.option("--engine", "-e", help="Engine to use")
 @click.option("--output", "-o", type=click.Path(), help="Save output to file")
 @click.option("--raw/--no-raw", default=False, help="Print raw JSON response")
+@click.option("--stream/--no-stream", default=False, help="Print output as it is generated")
 @click.option("--param", "-P", multiple=True, type=str,
               help="Extra key=val params passed to LLM (can repeat)")
-def llm_generate(prompt, engine, output, raw, param):
+def llm_generate(prompt, engine, output, raw, stream, param):
     """Generate text from LLM. PROMPT may be multiple words."""
+    from .llm import LLMManager
     text = " ".join(prompt)
     extra = {}
     for p in param:
@@ -162,6 +291,9 @@ def llm_generate(prompt, engine, output, raw, param):
             k, v = p.split("=", 1)
             extra[k] = v
     lm = LLMManager()
+    if stream:
+        _llm_stream(lm, text, engine, extra, output, raw)
+        return
     try:
         result = lm.generate(text, engine=engine, **extra)
     except Exception as e:
@@ -178,6 +310,69 @@ def llm_generate(prompt, engine, output, raw, param):
         click.echo(f"Saved to {output}")
 
 
+def _llm_stream(lm, text, engine, extra, output, raw):
+    """Echo chunks as they arrive, appending each to OUTPUT if given."""
+    fh = open(output, "w", encoding="utf-8") if output else None
+    try:
+        for chunk in lm.generate_stream(text, engine=engine, **extra):
+            chunk = str(chunk)
+            if raw:
+                click.echo(json.dumps({"chunk": chunk}))
+            else:
+                click.echo(chunk, nl=False)
+            if fh:
+                fh.write(chunk)
+                fh.flush()
+    except Exception as e:
+        click.echo(f"\nLLM error: {e}", err=True)
+        sys.exit(1)
+    finally:
+        if fh:
+            fh.close()
+    if not raw:
+        click.echo()
+    if output:
+        click.echo(f"Saved to {output}")
+
+
+@llm.command("batch")
+@click.argument("source", type=click.File("r"), default="-")
+@click.option("--engine", "-e", help="Default engine for records without one")
+@click.option("--workers", "-w", default=8, show_default=True,
+              help="Concurrent requests per engine")
+@click.option("--ordered/--unordered", default=False,
+              help="Emit results in input order instead of completion order")
+@click.option("--output", "-o", type=click.File("w"), default="-",
+              help="Write JSONL results to file (defaults to stdout)")
+def llm_batch(source, engine, workers, ordered, output):
+    """Run prompts from a JSONL file (or stdin) concurrently.
+
+    Each line is a JSON object with "prompt" and optional "id", "engine"
+    and "params", or a bare prompt string.
+    """
+    from .llm import LLMManager
+
+    def records():
+        for line in source:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                yield line
+
+    lm = LLMManager()
+    total = failed = 0
+    with lm:
+        for rec in lm.generate_many(records(), engine=engine, workers=workers, ordered=ordered):
+            total += 1
+            failed += "error" in rec
+            output.write(json.dumps(rec) + "\n")
+            output.flush()
+    click.echo(f"{total} prompts, {failed} failed", err=True)
+
+
 #
 # PLUGIN COMMANDS
 #
@@ -191,6 +386,7 @@ def plugin():
 @click.argument("name")
 def plugin_create(name):
     """Scaffold a new plugin."""
+    from .git import PluginManager
     pm = PluginManager()
     try:
         pm.generate_plugin_template(name)
@@ -202,22 +398,34 @@ def plugin_create(name):
 @plugin.command("list")
 def plugin_list():
     """List installed plugins."""
+    from .git import PluginManager
     pm = PluginManager()
-    for name in pm.list_plugins():
-        click.echo(name)
+    for name, info in pm.registry().items():
+        meta = info.get("metadata") or {}
+        detail = info.get("error") or meta.get("description", "")
+        click.echo(f"{name}  v{info.get('interface_version') or '?'}  {detail}")
 
 
 @plugin.command("run")
 @click.argument("name")
 @click.argument("data", required=False)
-def plugin_run(name, data):
-    """Run a plugin with optional JSON DATA."""
-    pm = PluginManager()
-    try:
-        mod = pm.load_plugin(name)
-    except Exception as e:
-        click.echo(f"Load error: {e}", err=True)
-        sys.exit(1)
+@click.option("--host", "use_host", is_flag=True, help="Run in a running `plugin serve` host")
+@click.option("--socket", "socket_path", type=click.Path(), help="Host socket path")
+@click.option("--jsonl", is_flag=True, help="Run once per JSON line of --input (or stdin)")
+@click.option("--input", "-i", "source", type=click.File("r"), default="-",
+              help="JSONL input for --jsonl (defaults to stdin)")
+@click.option("--workers", "-w", default=1, show_default=True,
+              help="Worker processes for --jsonl")
+@click.option("--no-cache", is_flag=True, help="Bypass the result cache of cacheable plugins")
+def plugin_run(name, data, use_host, socket_path, jsonl, source, workers, no_cache):
+    """Run a plugin with optional JSON DATA.
+
+    With --jsonl, each input line is passed to run() and each result is
+    written to stdout as one JSON line; failures go to stderr.
+    """
+    if jsonl:
+        _plugin_run_jsonl(name, source, workers, not no_cache)
+        return
 
     payload = {}
     if data:
@@ -227,14 +435,150 @@ def plugin_run(name, data):
             click.echo("DATA must be valid JSON", err=True)
             sys.exit(1)
 
+    if use_host:
+        from .pluginhost import HostError, call, default_socket
+        try:
+            result = call("run", {"name": name, "data": payload},
+                          Path(socket_path) if socket_path else default_socket())
+        except HostError as e:
+            click.echo(f"Execution error: {e}", err=True)
+            sys.exit(1)
+        click.echo(json.dumps(result, indent=2))
+        return
+
+    from .git import PluginManager
+    pm = PluginManager()
     try:
-        result = mod.run(payload)
+        run = pm.runner(name, use_cache=not no_cache)
+    except Exception as e:
+        click.echo(f"Load error: {e}", err=True)
+        sys.exit(1)
+
+    try:
+        result = run(payload)
         click.echo(json.dumps(result, indent=2))
     except Exception as e:
         click.echo(f"Execution error: {e}", err=True)
         sys.exit(1)
 
 
+def _plugin_run_jsonl(name, source, workers, use_cache):
+    from collections import deque
+    from .git import PluginManager
+    pm = PluginManager()
+    failed = 0
+    # (line number, parse error or None) per non-blank input line, in order;
+    # results from run_stream line up with the entries whose error is None
+    lines = deque()
+
+    def records():
+        for lineno, line in enumerate(source, 1):
+            if not line.strip():
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError as e:
+                lines.append((lineno, f"invalid JSON: {e}"))
+                continue
+            lines.append((lineno, None))
+            yield rec
+
+    def report(lineno, error):
+        nonlocal failed
+        failed += 1
+        click.echo(f"line {lineno}: {error}", err=True)
+
+    def flush_errors():
+        while lines and lines[0][1] is not None:
+            report(*lines.popleft())
+
+    out = sys.stdout
+    try:
+        for rec in pm.run_stream(name, records(), workers=workers, use_cache=use_cache):
+            flush_errors()
+            lineno, _ = lines.popleft()
+            if "error" in rec:
+                report(lineno, rec["error"])
+                continue
+            try:
+                out.write(json.dumps(rec["result"]) + "\n")
+            except (TypeError, ValueError) as e:
+                report(lineno, f"result is not JSON-serializable: {e}")
+        flush_errors()
+    except Exception as e:
+        click.echo(f"Load error: {e}", err=True)
+        sys.exit(1)
+    out.flush()
+    if failed:
+        sys.exit(1)
+
+
+@plugin.command("pipe")
+@click.argument("stages", nargs=-1)
+@click.option("--spec", "-s", help="Pipeline defined at plugins.pipelines.<SPEC> in config")
+@click.option("--data", "-d", help="JSON payload for a single run")
+@click.option("--jsonl", is_flag=True, help="Stream JSON lines from --input (or stdin)")
+@click.option("--input", "-i", "source", type=click.File("r"), default="-",
+              help="JSONL input for --jsonl (defaults to stdin)")
+@click.option("--queue-size", "-q", type=int, help="Max records buffered between stages")
+@click.option("--timings", is_flag=True, help="Print per-stage timing to stderr")
+def plugin_pipe(stages, spec, data, jsonl, source, queue_size, timings):
+    """Chain plugins in one process: each stage's output feeds the next."""
+    from .pipeline import Pipeline, PipelineError
+    if bool(stages) == bool(spec):
+        click.echo("Give either STAGES or --spec", err=True)
+        sys.exit(1)
+    try:
+        if spec:
+            pipe = Pipeline.from_config(spec)
+            if queue_size:
+                pipe.queue_size = queue_size
+        else:
+            pipe = Pipeline(list(stages), queue_size=queue_size or 64)
+    except Exception as e:
+        click.echo(f"Load error: {e}", err=True)
+        sys.exit(1)
+
+    try:
+        if jsonl:
+            records = (json.loads(line) for line in source if line.strip())
+            for result in pipe.stream(records):
+                sys.stdout.write(json.dumps(result) + "\n")
+            sys.stdout.flush()
+        else:
+            payload = json.loads(data) if data else {}
+            click.echo(json.dumps(pipe.run(payload), indent=2))
+    except json.JSONDecodeError as e:
+        click.echo(f"Invalid JSON input: {e}", err=True)
+        sys.exit(1)
+    except PipelineError as e:
+        click.echo(f"Execution error: {e}", err=True)
+        sys.exit(1)
+    finally:
+        if timings:
+            for row in pipe.timings():
+                click.echo(f"{row['stage']:<20} {row['calls']:>8} calls "
+                           f"{row['seconds']:>10.3f}s {row['avg_ms']:>9.3f} ms/call", err=True)
+
+
+@plugin.command("serve")
+@click.option("--socket", "socket_path", type=click.Path(), help="Unix socket to listen on")
+@click.option("--stdio", is_flag=True, help="Speak JSON-RPC over stdin/stdout instead")
+def plugin_serve(socket_path, stdio):
+    """Keep plugins loaded and serve run requests (JSON-RPC 2.0)."""
+    from .pluginhost import PluginHost, default_socket
+    host = PluginHost()
+    if stdio:
+        host.serve_stdio()
+        return
+    path = Path(socket_path) if socket_path else default_socket()
+    click.echo(f"Plugin host listening on {path}", err=True)
+    try:
+        host.serve_socket(path)
+    except KeyboardInterrupt:
+        pass
+
+
 #
 # GIT COMMANDS
 #
@@ -245,44 +589,99 @@ def git():
 
 
 @git.command("init")
-@click.argument("name")
+@click.argument("names", nargs=-1, required=True)
 @click.option("--template", "-t", help="Directory to use as template")
-def git_init(name, template):
-    """Initialize a new Git repository."""
+@click.option("--count", "-n", type=int, help="Create NAME-1 .. NAME-N from a single NAME")
+@click.option("--workers", "-w", default=8, show_default=True,
+              help="Repositories scaffolded in parallel")
+def git_init(names, template, count, workers):
+    """Initialize new Git repositories, optionally from a template."""
+    from .git import GitManager
     gm = GitManager()
+    if count:
+        if len(names) != 1:
+            click.echo("Error: --count takes exactly one NAME", err=True)
+            sys.exit(1)
+        names = tuple(f"{names[0]}-{i}" for i in range(1, count + 1))
+    if len(names) == 1:
+        try:
+            gm.init_repo(names[0], template)
+        except Exception as e:
+            click.echo(f"Error: {e}", err=True)
+            sys.exit(1)
+        return
+
+    failed = 0
     try:
-        gm.init_repo(name, template)
+        for name, path, error in gm.init_many(list(names), template, workers):
+            if error:
+                failed += 1
+                click.echo(f"Error: {name}: {error}", err=True)
+            else:
+                click.echo(f"Repository initialized at {path}")
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
         sys.exit(1)
+    if failed:
+        sys.exit(1)
 
 
 @git.command("clone")
 @click.argument("url")
 @click.option("--dest", "-d", help="Destination folder name")
-def git_clone(url, dest):
+@click.option("--depth", type=int, help="Shallow clone with this many commits")
+@click.option("--filter", "filter_spec", help="Partial clone filter, e.g. blob:none")
+@click.option("--sparse", multiple=True, help="Only check out this directory (repeatable)")
+@click.option("--no-cache", is_flag=True, help="Do not use the local mirror cache")
+@click.option("--dissociate", is_flag=True, help="Copy cached objects instead of borrowing them")
+def git_clone(url, dest, depth, filter_spec, sparse, no_cache, dissociate):
     """Clone a remote repository."""
+    from .git import GitManager
     gm = GitManager()
-    gm.clone_repo(url, dest)
+    gm.clone_repo(url, dest, depth=depth, filter_spec=filter_spec, sparse=list(sparse) or None,
+                  use_cache=not no_cache, dissociate=dissociate)
 
 
 @git.command("commit")
 @click.option("--path", "-p", help="Repo path (defaults to cwd)")
 @click.option("--message", "-m", default="Update", help="Commit message")
-def git_commit(path, message):
+@click.option("--paths", "pathspecs", multiple=True,
+              help="Only commit changes under this pathspec (repeatable, repo-relative)")
+@click.option("--since", help="Only commit files modified within a duration (90s, 30m, 2h, 1d) "
+                              "or since an ISO date")
+@click.option("--fsmonitor", is_flag=True, help="Ask git to use its fsmonitor daemon")
+@click.option("--no-verify", is_flag=True, help="Skip the pre-commit and commit-msg hooks")
+def git_commit(path, message, pathspecs, since, fsmonitor, no_verify):
     """Stage and commit all changes."""
+    from .git import GitManager
     gm = GitManager()
     try:
-        gm.commit_all(path, message)
+        cutoff = _parse_since(since) if since else None
+        gm.commit_all(path, message, paths=list(pathspecs) or None, since=cutoff,
+                      fsmonitor=fsmonitor, no_verify=no_verify)
     except Exception as e:
         click.echo(f"Error: {e}", err=True)
         sys.exit(1)
 
 
+def _parse_since(value):
+    """Epoch seconds for a duration like 30m / 2h / 1d or an ISO date."""
+    import time
+    from datetime import datetime
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+    if value[-1:] in units and value[:-1].replace(".", "", 1).isdigit():
+        return time.time() - float(value[:-1]) * units[value[-1]]
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise click.BadParameter(f"Cannot parse --since value: {value}")
+
+
 @git.command("branch")
 @click.option("--path", "-p", help="Repo path (defaults to cwd)")
 def git_branch(path):
     """Show current branch."""
+    from .git import GitManager
     gm = GitManager()
     try:
         branch = gm.current_branch(path)
@@ -292,6 +691,188 @@ def git_branch(path):
         sys.exit(1)
 
 
+@git.command("stats")
+@click.argument("paths", nargs=-1)
+@click.option("--path", "-p", "repo_path", help="Repo path (defaults to cwd)")
+@click.option("--rev", "-r", default="HEAD", show_default=True, help="Tip of the range")
+@click.option("--since-rev", "-s", "base", help="Exclude history reachable from this revision")
+@click.option("--top", "-n", default=10, show_default=True, help="Rows per table")
+@click.option("--json", "as_json", is_flag=True, help="Print the full aggregates as JSON")
+@click.option("--no-cache", is_flag=True, help="Recompute instead of using cached aggregates")
+def git_stats(paths, repo_path, rev, base, top, as_json, no_cache):
+    """Churn, author activity and hot files over a revision range."""
+    from datetime import datetime
+    from .git import GitManager
+    gm = GitManager()
+    try:
+        stats = gm.log_stats(repo_path, rev=rev, base=base, paths=list(paths) or None,
+                             use_cache=not no_cache)
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    if as_json:
+        click.echo(json.dumps(stats, indent=2))
+        return
+
+    span = ""
+    if stats["first"] is not None:
+        span = (f", {datetime.fromtimestamp(stats['first']):%Y-%m-%d} .. "
+                f"{datetime.fromtimestamp(stats['last']):%Y-%m-%d}")
+    click.echo(f"{stats['commits']} commits, +{stats['added']} -{stats['deleted']} lines, "
+               f"{len(stats['authors'])} authors, {len(stats['paths'])} paths{span}")
+
+    def table(title, rows, key):
+        click.echo(f"\n{title}")
+        for name, row in sorted(rows.items(), key=lambda kv: key(kv[1]), reverse=True)[:top]:
+            click.echo(f"  {row['commits']:>7} commits  +{row['added']:<8} -{row['deleted']:<8} {name}")
+
+    table("Authors", stats["authors"], lambda r: r["commits"])
+    table("Hot files (most commits)", stats["paths"], lambda r: r["commits"])
+    table("Churn (lines added + deleted)", stats["paths"], lambda r: r["added"] + r["deleted"])
+
+
+@git.group("ws")
+def git_ws():
+    """Run git operations across every repo in a workspace manifest."""
+    pass
+
+
+def _ws_options(fn):
+    fn = click.option("--file", "-f", "manifest", default="repos.yml", show_default=True,
+                      type=click.Path(), help="Workspace manifest")(fn)
+    fn = click.option("--workers", "-w", default=16, show_default=True,
+                      help="Repositories processed in parallel")(fn)
+    fn = click.option("--json", "as_json", is_flag=True, help="One JSON object per repo")(fn)
+    return fn
+
+
+def _ws_describe(op, data):
+    if op == "status":
+        parts = [data["branch"] or "?"]
+        if data["ahead"] or data["behind"]:
+            parts.append(f"+{data['ahead']}/-{data['behind']}")
+        counts = [f"{data[k]} {k}" for k in ("staged", "unstaged", "untracked", "conflicts") if data[k]]
+        parts.append(", ".join(counts) if counts else "clean")
+        return "  ".join(parts)
+    if op == "pull":
+        return f"{data['from'][:7]}..{data['to'][:7]}" if data["updated"] else "up to date"
+    if op == "commit":
+        return f"{data['sha'][:7]} ({data['paths']} paths)" if data["sha"] else "nothing to commit"
+    return "cloned" if data["cloned"] else "already present"
+
+
+def _ws_run(op, manifest, workers, as_json, **kwargs):
+    import time
+    from .workspace import Workspace, WorkspaceError
+    try:
+        ws = Workspace.load(manifest, workers)
+    except (WorkspaceError, ValueError) as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+
+    start = time.perf_counter()
+    ok = failed = 0
+    for res in ws.run(op, **kwargs):
+        if res.ok:
+            ok += 1
+        else:
+            failed += 1
+        if as_json:
+            click.echo(json.dumps(res.as_dict()))
+        elif res.ok:
+            click.echo(f"ok    {res.name:<30} {_ws_describe(op, res.data)}")
+        else:
+            lines = (res.error or "").splitlines() or [""]
+            first = next((line for line in lines if line.startswith(("fatal:", "error:"))),
+                         lines[-1])
+            click.echo(f"FAIL  {res.name:<30} {first}")
+    click.echo(f"{op}: {ok} ok, {failed} failed, {ok + failed} repos in "
+               f"{time.perf_counter() - start:.1f}s", err=True)
+    if failed:
+        sys.exit(1)
+
+
+@git_ws.command("status")
+@_ws_options
+def git_ws_status(manifest, workers, as_json):
+    """Branch, divergence and change counts for every repo."""
+    _ws_run("status", manifest, workers, as_json)
+
+
+@git_ws.command("pull")
+@_ws_options
+def git_ws_pull(manifest, workers, as_json):
+    """Fast-forward every repo from its upstream."""
+    _ws_run("pull", manifest, workers, as_json)
+
+
+@git_ws.command("commit")
+@_ws_options
+@click.option("--message", "-m", default="Update", help="Commit message")
+@click.option("--no-verify", is_flag=True, help="Skip the pre-commit and commit-msg hooks")
+def git_ws_commit(manifest, workers, as_json, message, no_verify):
+    """Commit all changes in every repo."""
+    _ws_run("commit", manifest, workers, as_json, message=message, no_verify=no_verify)
+
+
+@git_ws.command("clone")
+@_ws_options
+def git_ws_clone(manifest, workers, as_json):
+    """Clone every repo that is not present yet."""
+    _ws_run("clone", manifest, workers, as_json)
+
+
+#
+# SEARCH COMMANDS
+#
+@cli.command("index")
+@click.option("--path", "-p", help="Repo path (defaults to cwd)")
+@click.option("--rebuild", is_flag=True, help="Discard the index and rebuild it")
+def index_cmd(path, rebuild):
+    """Build or incrementally update the code search index."""
+    from .search import CodeIndex
+    try:
+        idx = CodeIndex(path)
+        stats = idx.update(rebuild=rebuild)
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(1)
+    click.echo(f"{stats['mode'].capitalize()} index: {stats['indexed']} file(s) indexed, "
+               f"{stats['files']} total in {stats['segments']} segment(s), "
+               f"{stats['seconds']:.2f}s")
+
+
+@cli.command("search")
+@click.argument("pattern")
+@click.option("--path", "-p", help="Repo path (defaults to cwd)")
+@click.option("--regex", "-E", is_flag=True, help="Treat PATTERN as a regular expression")
+@click.option("--ignore-case", "-i", is_flag=True, help="Case-insensitive match")
+@click.option("--files-only", "-l", is_flag=True, help="Only print matching file names")
+@click.option("--limit", "-n", default=0, help="Stop after this many results (0 = all)")
+@click.option("--update", "-u", is_flag=True, help="Update the index before searching")
+def search_cmd(pattern, path, regex, ignore_case, files_only, limit, update):
+    """Search indexed files for a substring or regex."""
+    import re
+    from .search import CodeIndex
+    try:
+        idx = CodeIndex(path)
+        if update:
+            idx.update()
+        hits = 0
+        for rel, line_no, line in idx.search(pattern, regex=regex, ignore_case=ignore_case,
+                                             files_only=files_only, limit=limit):
+            hits += 1
+            click.echo(rel if files_only else f"{rel}:{line_no}:{line}")
+    except re.error as e:
+        click.echo(f"Error: invalid regex: {e}", err=True)
+        sys.exit(2)
+    except Exception as e:
+        click.echo(f"Error: {e}", err=True)
+        sys.exit(2)
+    if not hits:
+        sys.exit(1)
+
+
 #
 # UPDATE COMMANDS
 #
@@ -304,6 +885,7 @@ def update():
 @update.command("pypi")
 def update_pypi():
     """Update via PyPI."""
+    from .updater import Updater
     up = Updater()
     try:
         up.update_via_pypi()
@@ -316,6 +898,7 @@ def update_pypi():
 @click.option("--dir", "-d", "target_dir", help="Directory to overwrite (defaults to install path)")
 def update_github(target_dir):
     """Update via GitHub Releases."""
+    from .updater import Updater
     up = Updater()
     try:
         up.update_via_github(target_dir)
@@ -327,6 +910,7 @@ def update_github(target_dir):
 @update.command("auto")
 def update_auto():
     """Auto-select update method (env MONACODE_UPDATE_METHOD)."""
+    from .updater import Updater, UpdateError
     up = Updater()
     try:
         up.choose_update()
@@ -1,60 +1,606 @@
 import os
 import sys
+import json
+import time
 import shutil
+import hashlib
+import tempfile
+import subprocess
 import importlib.util
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from git import Repo, GitCommandError
 
+from .store import LRUStore
+from .scaffold import TemplateIndex
+from .utils import _atomic_write, _file_lock
+
 
 PLUGIN_INTERFACE_VERSION = "1.0.0"
 
+# Plugin modules executed in this process: plugin.py path -> (code hash, module)
+_LOADED_PLUGINS: Dict[str, Tuple[str, Any]] = {}
+
+
+# Plugin runner loaded by a run_stream() pool worker
+_WORKER_PLUGIN: Any = None
+
+
+def _call_plugin(run: Callable[[Any], Any], record: Any) -> Dict[str, Any]:
+    try:
+        return {"result": run(record)}
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def _exact_json(value: Any, **kwargs: Any) -> Optional[str]:
+    """
+    JSON for `value`, or None if decoding it would not give `value` back.
+    """
+    try:
+        raw = json.dumps(value, **kwargs)
+    except (TypeError, ValueError):
+        return None
+    return raw if _same(json.loads(raw), value) else None
+
+
+def _same(decoded: Any, value: Any) -> bool:
+    # == alone lets 1 == True == 1.0 and a tuple compare equal to a list
+    if type(decoded) is not type(value):
+        return False
+    if isinstance(value, dict):
+        return decoded.keys() == value.keys() and all(_same(decoded[k], value[k]) for k in value)
+    if isinstance(value, list):
+        return len(decoded) == len(value) and all(map(_same, decoded, value))
+    return decoded == value
+
+
+def _worker_init(plugins_dir: str, name: str, use_cache: bool) -> None:
+    global _WORKER_PLUGIN
+    _WORKER_PLUGIN = PluginManager(plugins_dir).runner(name, use_cache)
+
+
+def _worker_run(batch: List[Any]) -> List[Dict[str, Any]]:
+    return [_call_plugin(_WORKER_PLUGIN, record) for record in batch]
+
+
+def _git(cwd: str, *args: str, stdin: Optional[bytes] = None,
+         config: Optional[List[str]] = None, env: Optional[Dict[str, str]] = None) -> bytes:
+    """
+    Run a git command in `cwd` and return raw stdout; raises
+    GitCommandError on a non-zero exit.
+    """
+    cmd = ["git"]
+    for item in config or []:
+        cmd += ["-c", item]
+    cmd += list(args)
+    proc = subprocess.run(cmd, cwd=cwd, input=stdin, stdout=subprocess.PIPE,
+                          stderr=subprocess.PIPE, env=dict(os.environ, **env) if env else None)
+    if proc.returncode != 0:
+        raise GitCommandError(cmd, proc.returncode, proc.stderr)
+    return proc.stdout
+
+
+def _nul_join(paths: List[str]) -> bytes:
+    return b"".join(p.encode("utf-8", "surrogateescape") + b"\0" for p in paths)
+
+
+def _modified_since(path: str, since: float) -> bool:
+    try:
+        return os.lstat(path).st_mtime >= since
+    except FileNotFoundError:
+        return True  # a deletion cannot be dated
+
+
+def _empty_stats() -> Dict[str, Any]:
+    return {"commits": 0, "added": 0, "deleted": 0, "first": None, "last": None,
+            "authors": {}, "paths": {}}
+
+
+def _merge_stats(into: Dict[str, Any], other: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fold the aggregates of a disjoint commit range into `into`.
+    """
+    for key in ("commits", "added", "deleted"):
+        into[key] += other[key]
+    firsts = [t for t in (into["first"], other["first"]) if t is not None]
+    lasts = [t for t in (into["last"], other["last"]) if t is not None]
+    into["first"] = min(firsts) if firsts else None
+    into["last"] = max(lasts) if lasts else None
+    for table in ("authors", "paths"):
+        for name, row in other[table].items():
+            mine = into[table].setdefault(name, {"commits": 0, "added": 0, "deleted": 0})
+            for key in ("commits", "added", "deleted"):
+                mine[key] += row[key]
+    return into
+
+
+def _describe_counts(counts: Dict[str, int]) -> str:
+    return ", ".join(f"{n} {kind}" for kind, n in counts.items() if n) or "empty template"
+
+
+def parse_status_v2(raw: bytes) -> List[Tuple[str, str, str]]:
+    """
+    Parse `git status --porcelain=v2 -z` into (kind, XY, path) tuples.
+    kind is "1" (changed), "2" (renamed/copied), "u" (unmerged), "?" or
+    "!"; XY is "??"/"!!" for the last two. A rename is followed by an "r"
+    tuple for its original path.
+    """
+    entries: List[Tuple[str, str, str]] = []
+    tokens = raw.split(b"\0")
+    i = 0
+    while i < len(tokens):
+        tok = tokens[i].decode("utf-8", "surrogateescape")
+        i += 1
+        if not tok:
+            continue
+        kind = tok[0]
+        if kind in "?!":
+            entries.append((kind, kind * 2, tok[2:]))
+        elif kind == "1":
+            parts = tok.split(" ", 8)
+            entries.append((kind, parts[1], parts[8]))
+        elif kind == "2":
+            parts = tok.split(" ", 9)
+            entries.append((kind, parts[1], parts[9]))
+            orig = tokens[i].decode("utf-8", "surrogateescape")
+            i += 1
+            entries.append(("r", parts[1], orig))
+        elif kind == "u":
+            parts = tok.split(" ", 10)
+            entries.append((kind, parts[1], parts[10]))
+    return entries
+
 
 class GitManager:
     """
     Repository scaffolding and plugin framework utilities.
     """
 
+    # Seconds before a mirror in the clone cache is fetched again
+    CACHE_REFRESH = 60
+
     def __init__(self, base_dir: Optional[str] = None):
         self.base_dir = Path(base_dir or os.getcwd())
+        self.cache_dir = Path(os.environ.get("MONACODE_GIT_CACHE")
+                              or Path.home() / ".monacode" / "git-cache")
 
     def init_repo(self, name: str, template_dir: Optional[str] = None) -> None:
         """
         Initialize a new git repo named `name` under base_dir.
         If template_dir is provided, copy files before git init.
         """
+        index = TemplateIndex.load(template_dir) if template_dir else None
+        target, counts = self._scaffold(name, index)
+        print(f"Repository initialized at {target}" + (f" ({_describe_counts(counts)})" if counts else ""))
+
+    def init_many(self,
+                  names: List[str],
+                  template_dir: Optional[str] = None,
+                  workers: int = 8) -> Iterator[Tuple[str, Optional[Path], Optional[str]]]:
+        """
+        Scaffold several repos in parallel from one template index,
+        yielding (name, path, error) as each finishes.
+        """
+        index = TemplateIndex.load(template_dir) if template_dir else None
+        with ThreadPoolExecutor(max_workers=max(1, workers),
+                                thread_name_prefix="monacode-init") as pool:
+            futures = {pool.submit(self._scaffold, name, index): name for name in names}
+            for fut in as_completed(futures):
+                try:
+                    target, _ = fut.result()
+                except Exception as e:
+                    yield futures[fut], None, str(e)
+                else:
+                    yield futures[fut], target, None
+
+    def _scaffold(self, name: str, index: Optional[TemplateIndex]) -> Tuple[Path, Dict[str, int]]:
         target = self.base_dir / name
         if target.exists():
             raise FileExistsError(f"Directory '{target}' already exists.")
         target.mkdir(parents=True)
-        if template_dir:
-            src = Path(template_dir)
-            shutil.copytree(src, target, dirs_exist_ok=True)
-        Repo.init(str(target))
-        print(f"Repository initialized at {target}")
+        counts: Dict[str, int] = {}
+        if index is not None:
+            counts = index.instantiate(target)
+        _git(str(target), "init", "--quiet")
+        if index is not None:
+            (target / ".git" / "monacode-template").write_text(f"{index.root}\n{index.digest()}\n")
+        return target, counts
 
-    def clone_repo(self, url: str, dest: Optional[str] = None) -> Repo:
+    def clone_repo(self, url: str, dest: Optional[str] = None, **options: Any) -> Repo:
         """
         Clone remote repo URL into dest (or into a folder named after the repo).
+        Keyword options are those of clone().
         """
-        dest_path = self.base_dir / (dest or Path(url).stem)
         try:
-            repo = Repo.clone_from(url, str(dest_path))
-            print(f"Cloned {url} to {dest_path}")
+            repo = self.clone(url, dest, **options)
+            print(f"Cloned {url} to {repo.working_tree_dir}")
             return repo
         except GitCommandError as e:
             print(f"Clone failed: {e}")
             sys.exit(1)
 
-    def commit_all(self, repo_path: Optional[str] = None, message: str = "Update") -> None:
+    def clone(self,
+              url: str,
+              dest: Optional[str] = None,
+              depth: Optional[int] = None,
+              filter_spec: Optional[str] = None,
+              sparse: Optional[List[str]] = None,
+              use_cache: bool = True,
+              dissociate: bool = False) -> Repo:
+        """
+        Like clone_repo, but raises GitCommandError instead of exiting.
+
+        With `use_cache`, objects are borrowed from a bare mirror of `url`
+        in the clone cache (see mirror()) via `--reference`, so only objects
+        the mirror lacks come over the wire. Pass `dissociate` to copy the
+        borrowed objects so the clone does not depend on the cache.
+        `depth` makes a shallow clone, `filter_spec` a partial one (e.g.
+        "blob:none"), and `sparse` checks out only those directories. A
+        shallow or partial clone uses an existing mirror but never creates
+        one, since that would fetch the full history it is meant to avoid.
+        """
+        dest_path = self.base_dir / (dest or Path(url).stem)
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        if (depth or filter_spec) and not (self._mirror_path(url) / "HEAD").exists():
+            use_cache = False
+        args = ["clone", "--quiet"]
+        if use_cache:
+            args += ["--reference", str(self.mirror(url))]
+            if dissociate:
+                args.append("--dissociate")
+        if depth:
+            args += ["--depth", str(depth)]
+        if filter_spec:
+            args.append(f"--filter={filter_spec}")
+        if sparse:
+            args.append("--no-checkout")
+        _git(str(dest_path.parent), *args, "--", url, str(dest_path))
+        if sparse:
+            _git(str(dest_path), "sparse-checkout", "set", "--cone", "--", *sparse)
+            _git(str(dest_path), "checkout", "--quiet")
+        return Repo(str(dest_path))
+
+    def mirror(self, url: str) -> Path:
+        """
+        Bare mirror of `url` in the clone cache, created on first use and
+        fetched incrementally when older than CACHE_REFRESH seconds. Garbage
+        collection is disabled in mirrors so objects borrowed by existing
+        clones are never pruned.
+        """
+        path = self._mirror_path(url)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with _file_lock(self.cache_dir / f"{path.name}.lock"):
+            stamp = path / "FETCH_HEAD"
+            if not (path / "HEAD").exists():
+                shutil.rmtree(str(path), ignore_errors=True)
+                tmp = Path(tempfile.mkdtemp(dir=str(self.cache_dir), prefix=".mirror-"))
+                try:
+                    _git(str(self.cache_dir), "clone", "--quiet", "--mirror", "--", url, str(tmp))
+                    _git(str(tmp), "config", "gc.auto", "0")
+                    stamp = tmp / "FETCH_HEAD"
+                    stamp.touch()
+                    os.replace(str(tmp), str(path))
+                except BaseException:
+                    shutil.rmtree(str(tmp), ignore_errors=True)
+                    raise
+            elif not stamp.exists() or time.time() - stamp.stat().st_mtime > self.CACHE_REFRESH:
+                _git(str(path), "fetch", "--quiet", "--prune", "origin")
+                stamp.touch()
+        return path
+
+    def _mirror_path(self, url: str) -> Path:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+        return self.cache_dir / f"{Path(url.rstrip('/')).stem}-{key}.git"
+
+    STAGE_BATCH = 5000
+
+    def changed_paths(self,
+                      repo_path: Optional[str] = None,
+                      paths: Optional[List[str]] = None,
+                      since: Optional[float] = None,
+                      fsmonitor: bool = False) -> Tuple[List[str], List[str]]:
+        """
+        Paths with changes, from one `git status --porcelain=v2 -z` run
+        (with the untracked cache, and fsmonitor if requested), limited to
+        `paths` pathspecs. Returns (unstaged, all): `unstaged` need a
+        `git add`, `all` also includes changes already in the index.
+        With `since` (epoch seconds), files last modified earlier are
+        skipped; deletions cannot be dated and are always kept. A rename or
+        copy is kept or skipped as a whole, dated by its new path.
+        """
+        root = str(self.base_dir if repo_path is None else Path(repo_path))
+        config = ["core.untrackedCache=true", "status.relativePaths=false"]
+        if fsmonitor:
+            config.append("core.fsmonitor=true")
+        args = ["status", "--porcelain=v2", "-z", "--untracked-files=all", "--ignore-submodules=dirty"]
+        if paths:
+            args += ["--"] + list(paths)
+        raw = _git(root, *args, config=config)
+        top = _git(root, "rev-parse", "--show-toplevel").decode().strip()
+
+        unstaged: List[str] = []
+        changed: List[str] = []
+        keep = True
+        for kind, xy, path in parse_status_v2(raw):
+            if kind == "!":
+                continue
+            if kind == "r":
+                # original side of the preceding rename/copy, already staged
+                if keep:
+                    changed.append(path)
+                continue
+            keep = since is None or _modified_since(os.path.join(top, path), since)
+            if not keep:
+                continue
+            changed.append(path)
+            if kind in "?u" or xy[1] != ".":
+                unstaged.append(path)
+        return unstaged, changed
+
+    def _stage(self, top: str, paths: List[str], env: Optional[Dict[str, str]] = None) -> None:
+        """
+        Stage exactly `paths` (adds, modifications and deletions) in batches.
+        `update-index` takes literal paths, so unlike `git add <pathspec>...`
+        its cost does not grow with pathspecs x index entries.
+        """
+        for i in range(0, len(paths), self.STAGE_BATCH):
+            _git(top, "update-index", "--add", "--remove", "-z", "--stdin",
+                 stdin=_nul_join(paths[i:i + self.STAGE_BATCH]), env=env)
+
+    def commit_all(self,
+                   repo_path: Optional[str] = None,
+                   message: str = "Update",
+                   paths: Optional[List[str]] = None,
+                   since: Optional[float] = None,
+                   fsmonitor: bool = False,
+                   no_verify: bool = False) -> Optional[str]:
         """
         Stage and commit all changes with a given commit message.
+
+        Only paths reported by `git status` are staged, so the cost follows
+        the number of changed files rather than the size of the tree.
+        `paths` and `since` narrow the commit to those pathspecs / recently
+        modified files; changes staged outside that scope stay staged but
+        are left out of the commit. The pre-commit and commit-msg hooks run
+        unless `no_verify` is set. Returns the new commit sha, or None if
+        there was nothing to commit.
         """
-        repo = Repo(str(self.base_dir if repo_path is None else Path(repo_path)))
-        repo.git.add("--all")
-        repo.index.commit(message)
-        print(f"Committed all changes in {repo.working_tree_dir}")
+        root = str(self.base_dir if repo_path is None else Path(repo_path))
+        sha, count = self.commit_changes(root, message, paths, since, fsmonitor, no_verify)
+        if sha is None:
+            print(f"Nothing to commit in {root}")
+        else:
+            print(f"Committed {count} changed path(s) in {root}")
+        return sha
+
+    def commit_changes(self,
+                       repo_path: str,
+                       message: str = "Update",
+                       paths: Optional[List[str]] = None,
+                       since: Optional[float] = None,
+                       fsmonitor: bool = False,
+                       no_verify: bool = False) -> Tuple[Optional[str], int]:
+        """
+        commit_all without the console output: returns (sha or None,
+        number of changed paths committed).
+        """
+        top = _git(repo_path, "rev-parse", "--show-toplevel").decode().strip()
+        unstaged, changed = self.changed_paths(top, paths, since, fsmonitor)
+        if not changed:
+            return None, 0
+
+        self._stage(top, unstaged)
+        args = ["commit", "--quiet", "-F", "-"] + (["--no-verify"] if no_verify else [])
+        if paths is None and since is None:
+            _git(top, *args, stdin=message.encode("utf-8"))
+        else:
+            self._commit_only(top, changed, args, message)
+        return _git(top, "rev-parse", "HEAD").decode().strip(), len(changed)
+
+    def _commit_only(self, top: str, changed: List[str], args: List[str], message: str) -> None:
+        """
+        Commit HEAD plus `changed` only, like `git commit --only`: the tree
+        is built in a temporary index that `git commit` (and its hooks)
+        then runs against.
+        """
+        git_dir = _git(top, "rev-parse", "--absolute-git-dir").decode().strip()
+        try:
+            parent: Optional[str] = _git(top, "rev-parse", "--verify", "-q", "HEAD").decode().strip()
+        except GitCommandError:
+            parent = None
+        fd, tmp_index = tempfile.mkstemp(dir=git_dir, prefix="monacode-index-")
+        os.close(fd)
+        try:
+            env = {"GIT_INDEX_FILE": tmp_index}
+            _git(top, "read-tree", parent or "--empty", env=env)
+            self._stage(top, changed, env=env)
+            _git(top, *args, stdin=message.encode("utf-8"), env=env)
+        finally:
+            os.unlink(tmp_index)
+
+    def status(self, repo_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Branch, upstream divergence and change counts from a single
+        `git status --porcelain=v2 --branch -z` run.
+        """
+        root = str(self.base_dir if repo_path is None else Path(repo_path))
+        raw = _git(root, "status", "--porcelain=v2", "--branch", "-z", "--untracked-files=normal",
+                   config=["core.untrackedCache=true"])
+        info: Dict[str, Any] = {"branch": None, "upstream": None, "ahead": 0, "behind": 0,
+                                "staged": 0, "unstaged": 0, "untracked": 0, "conflicts": 0}
+        for tok in raw.split(b"\0"):
+            if tok.startswith(b"# branch.head "):
+                info["branch"] = tok[14:].decode()
+            elif tok.startswith(b"# branch.upstream "):
+                info["upstream"] = tok[18:].decode()
+            elif tok.startswith(b"# branch.ab "):
+                ahead, behind = tok[12:].decode().split()
+                info["ahead"], info["behind"] = int(ahead), -int(behind)
+        for kind, xy, _ in parse_status_v2(raw):
+            if kind == "?":
+                info["untracked"] += 1
+            elif kind == "u":
+                info["conflicts"] += 1
+            elif kind in "12":
+                info["staged"] += xy[0] != "."
+                info["unstaged"] += xy[1] != "."
+        return info
+
+    def pull(self, repo_path: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Fast-forward-only pull; returns (old sha, new sha).
+        """
+        root = str(self.base_dir if repo_path is None else Path(repo_path))
+        old = _git(root, "rev-parse", "HEAD").decode().strip()
+        _git(root, "pull", "--ff-only", "--quiet")
+        return old, _git(root, "rev-parse", "HEAD").decode().strip()
+
+    def toplevel(self, repo_path: Optional[str] = None) -> Path:
+        root = str(self.base_dir if repo_path is None else Path(repo_path))
+        return Path(_git(root, "rev-parse", "--show-toplevel").decode().strip())
+
+    def git_dir(self, repo_path: Optional[str] = None) -> Path:
+        root = str(self.base_dir if repo_path is None else Path(repo_path))
+        return Path(_git(root, "rev-parse", "--absolute-git-dir").decode().strip())
+
+    def head(self, repo_path: Optional[str] = None) -> Optional[str]:
+        """
+        Sha of HEAD, or None on an unborn branch.
+        """
+        root = str(self.base_dir if repo_path is None else Path(repo_path))
+        try:
+            return _git(root, "rev-parse", "--verify", "-q", "HEAD").decode().strip()
+        except GitCommandError:
+            return None
+
+    def list_files(self, repo_path: Optional[str] = None) -> List[str]:
+        """
+        Tracked plus untracked, non-ignored files, relative to the top level.
+        """
+        top = str(self.toplevel(repo_path))
+        raw = _git(top, "ls-files", "-z", "--cached", "--others", "--exclude-standard")
+        return sorted({p.decode("utf-8", "surrogateescape") for p in raw.split(b"\0") if p})
+
+    def diff_paths(self, repo_path: Optional[str], since: str, until: str = "HEAD") -> List[str]:
+        """
+        Paths that differ between two revisions (renames as delete + add).
+        """
+        top = str(self.toplevel(repo_path))
+        raw = _git(top, "diff", "--name-only", "-z", "--no-renames", since, until, "--")
+        return [p.decode("utf-8", "surrogateescape") for p in raw.split(b"\0") if p]
+
+    def log_stats(self,
+                  repo_path: Optional[str] = None,
+                  rev: str = "HEAD",
+                  base: Optional[str] = None,
+                  paths: Optional[List[str]] = None,
+                  use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Churn and activity over the commits reachable from `rev` but not
+        `base`, optionally limited to `paths`: totals plus per-author and
+        per-path {commits, added, deleted}.
+
+        `git log --numstat -z` is parsed as a stream, so no per-commit
+        objects are built. Aggregates are cached in .git/monacode-stats per
+        (base, paths) together with the tip they cover; when the new tip
+        descends from the cached one only the new commits are read.
+        """
+        root = str(self.base_dir if repo_path is None else Path(repo_path))
+        tip = _git(root, "rev-parse", "--verify", f"{rev}^{{commit}}").decode().strip()
+        base_sha = (_git(root, "rev-parse", "--verify", f"{base}^{{commit}}").decode().strip()
+                    if base else None)
+        key = hashlib.sha256(json.dumps([base_sha, sorted(paths or [])]).encode()).hexdigest()[:16]
+        cache = self.git_dir(root) / "monacode-stats" / f"{key}.json"
+
+        cached = None
+        if use_cache:
+            try:
+                cached = json.loads(cache.read_text())
+            except (OSError, ValueError):
+                cached = None
+        if cached and cached.get("tip") == tip:
+            stats = cached["stats"]
+        else:
+            exclude = [f"^{base_sha}"] if base_sha else []
+            stats = None
+            if cached:
+                old = cached["tip"]
+                try:
+                    _git(root, "merge-base", "--is-ancestor", old, tip)
+                except GitCommandError:
+                    old = None  # history was rewritten; start over
+                if old:
+                    delta = self._scan_log(root, [tip, f"^{old}"] + exclude, paths)
+                    stats = _merge_stats(cached["stats"], delta)
+            if stats is None:
+                stats = self._scan_log(root, [tip] + exclude, paths)
+            if use_cache:
+                cache.parent.mkdir(parents=True, exist_ok=True)
+                _atomic_write(cache, json.dumps({"tip": tip, "base": base_sha, "paths": paths or [],
+                                                 "stats": stats}).encode("utf-8"))
+        return dict(stats, tip=tip, base=base_sha)
+
+    @staticmethod
+    def _scan_log(root: str, revs: List[str], paths: Optional[List[str]]) -> Dict[str, Any]:
+        """
+        Aggregate `git log --numstat -z` output read in fixed-size chunks.
+        """
+        cmd = ["git", "log", "--numstat", "-z", "--no-renames",
+               "--format=%x1e%H%x1f%at%x1f%aN <%aE>"] + revs + ["--"] + list(paths or [])
+        stats = _empty_stats()
+        authors, files = stats["authors"], stats["paths"]
+        author: Dict[str, int] = {}
+        errors = tempfile.TemporaryFile()
+        proc = subprocess.Popen(cmd, cwd=root, stdout=subprocess.PIPE, stderr=errors)
+        try:
+            rest = b""
+            while True:
+                chunk = proc.stdout.read(1 << 16)  # type: ignore[union-attr]
+                if not chunk:
+                    break
+                tokens = (rest + chunk).split(b"\0")
+                rest = tokens.pop()
+                for tok in tokens:
+                    tok = tok.lstrip(b"\n")
+                    if tok.startswith(b"\x1e"):
+                        _, ts, name = tok[1:].decode("utf-8", "replace").split("\x1f", 2)
+                        when = int(ts)
+                        stats["commits"] += 1
+                        stats["first"] = when if stats["first"] is None else min(stats["first"], when)
+                        stats["last"] = when if stats["last"] is None else max(stats["last"], when)
+                        author = authors.setdefault(name, {"commits": 0, "added": 0, "deleted": 0})
+                        author["commits"] += 1
+                    elif b"\t" in tok:
+                        added_s, deleted_s, path_b = tok.split(b"\t", 2)
+                        added = int(added_s) if added_s != b"-" else 0  # "-" marks binary
+                        deleted = int(deleted_s) if deleted_s != b"-" else 0
+                        path = path_b.decode("utf-8", "surrogateescape")
+                        row = files.get(path)
+                        if row is None:
+                            row = files[path] = {"commits": 0, "added": 0, "deleted": 0}
+                        row["commits"] += 1
+                        row["added"] += added
+                        row["deleted"] += deleted
+                        author["added"] += added
+                        author["deleted"] += deleted
+                        stats["added"] += added
+                        stats["deleted"] += deleted
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+            proc.stdout.close()  # type: ignore[union-attr]
+        with errors:
+            if proc.returncode != 0:
+                errors.seek(0)
+                raise GitCommandError(cmd, proc.returncode, errors.read())
+        return stats
 
     def current_branch(self, repo_path: Optional[str] = None) -> str:
         """
@@ -72,9 +618,15 @@ class PluginManager:
       - metadata.json to describe it
     """
 
+    REGISTRY_FILE = "registry.json"
+    MEMO_FILE = "plugin_results.db"
+
     def __init__(self, plugins_dir: Optional[str] = None):
         self.plugins_dir = Path(plugins_dir or (Path.home() / ".monacode" / "plugins"))
         self.plugins_dir.mkdir(parents=True, exist_ok=True)
+        self.registry_path = self.plugins_dir / self.REGISTRY_FILE
+        self.memo_path = self.plugins_dir.parent / "cache" / self.MEMO_FILE
+        self._memo: Optional[LRUStore] = None
 
     def generate_plugin_template(self, name: str) -> None:
         """
@@ -111,44 +663,230 @@ def run(input_data):
         """
         Return all plugin folder names in plugins_dir.
         """
-        return [p.name for p in self.plugins_dir.iterdir() if p.is_dir()]
+        return list(self.registry())
+
+    def registry(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Indexed metadata for every plugin: `metadata`, `interface_version`
+        and `code_hash`. Entries are re-read only when the plugin's files
+        change (by mtime/size), and the index is persisted to registry.json.
+        Nothing is imported.
+        """
+        index = self._load_registry()
+        changed = False
+        names = sorted(p.name for p in self.plugins_dir.iterdir() if p.is_dir())
+        for name in names:
+            changed |= self._refresh_entry(index, name)
+        for gone in set(index) - set(names):
+            del index[gone]
+            changed = True
+        if changed:
+            self._save_registry(index)
+        return {name: index[name] for name in names}
+
+    def plugin_info(self, name: str) -> Dict[str, Any]:
+        """
+        Registry entry for one plugin, refreshing just that entry.
+        """
+        if not (self.plugins_dir / name).is_dir():
+            raise FileNotFoundError(f"Plugin '{name}' not found.")
+        index = self._load_registry()
+        if self._refresh_entry(index, name):
+            self._save_registry(index)
+        return index[name]
+
+    def _load_registry(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            return json.loads(self.registry_path.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def _save_registry(self, index: Dict[str, Dict[str, Any]]) -> None:
+        fd, tmp = tempfile.mkstemp(dir=str(self.plugins_dir), prefix=".registry-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp, str(self.registry_path))
+
+    @staticmethod
+    def _stamp(path: Path) -> Optional[List[int]]:
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    def _refresh_entry(self, index: Dict[str, Dict[str, Any]], name: str) -> bool:
+        """
+        Re-index `name` if its files changed; returns True if it did.
+        """
+        plugin_path = self.plugins_dir / name
+        stamp = [self._stamp(plugin_path / "plugin.py"), self._stamp(plugin_path / "metadata.json")]
+        entry = index.get(name)
+        if entry and entry.get("stamp") == stamp:
+            return False
+        meta: Dict[str, Any] = {}
+        error = None
+        try:
+            meta = json.loads((plugin_path / "metadata.json").read_text())
+        except FileNotFoundError:
+            error = "missing metadata.json"
+        except ValueError as e:
+            error = f"invalid metadata.json: {e}"
+        try:
+            code_hash = hashlib.sha256((plugin_path / "plugin.py").read_bytes()).hexdigest()
+        except FileNotFoundError:
+            code_hash = None
+            error = error or "missing plugin.py"
+        index[name] = {
+            "stamp": stamp,
+            "metadata": meta,
+            "interface_version": meta.get("interface_version"),
+            "code_hash": code_hash,
+            "error": error,
+        }
+        return True
 
     def validate_plugin(self, name: str) -> bool:
         """
         Check plugin metadata and interface version compatibility.
         Returns True if valid, else raises.
         """
+        self._load_module(name)
+        return True
+
+    def _check_metadata(self, name: str) -> Dict[str, Any]:
         plugin_path = self.plugins_dir / name
-        meta_path = plugin_path / "metadata.json"
-        if not meta_path.exists():
+        if not (plugin_path / "metadata.json").exists():
             raise FileNotFoundError(f"No metadata.json for plugin '{name}'.")
-        import json
-        meta = json.loads(meta_path.read_text())
-        if meta.get("interface_version") != PLUGIN_INTERFACE_VERSION:
+        info = self.plugin_info(name)
+        if info["interface_version"] != PLUGIN_INTERFACE_VERSION:
             raise RuntimeError(
-                f"Plugin '{name}' uses interface {meta.get('interface_version')}, "
+                f"Plugin '{name}' uses interface {info['interface_version']}, "
                 f"requires {PLUGIN_INTERFACE_VERSION}."
             )
-        # Check plugin.py defines INTERFACE_VERSION and run()
-        module_path = plugin_path / "plugin.py"
-        if not module_path.exists():
+        if not (plugin_path / "plugin.py").exists():
             raise FileNotFoundError(f"No plugin.py in '{name}'.")
-        spec = importlib.util.spec_from_file_location(name, str(module_path))
+        return info
+
+    def _load_module(self, name: str):
+        """
+        Execute plugin.py at most once per code version in this process.
+        The module is registered in sys.modules as `monacode_plugins.<name>`.
+        """
+        info = self._check_metadata(name)
+        module_path = self.plugins_dir / name / "plugin.py"
+        cached = _LOADED_PLUGINS.get(str(module_path))
+        if cached and cached[0] == info["code_hash"]:
+            return cached[1]
+        mod_name = f"monacode_plugins.{name}"
+        spec = importlib.util.spec_from_file_location(mod_name, str(module_path))
         mod = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(mod)  # type: ignore
-        if getattr(mod, "INTERFACE_VERSION", None) != PLUGIN_INTERFACE_VERSION:
-            raise RuntimeError(f"Plugin '{name}' INTERFACE_VERSION mismatch.")
-        if not callable(getattr(mod, "run", None)):
-            raise RuntimeError(f"Plugin '{name}' has no callable run().")
-        return True
+        sys.modules[mod_name] = mod
+        try:
+            spec.loader.exec_module(mod)  # type: ignore
+            # Check plugin.py defines INTERFACE_VERSION and run()
+            if getattr(mod, "INTERFACE_VERSION", None) != PLUGIN_INTERFACE_VERSION:
+                raise RuntimeError(f"Plugin '{name}' INTERFACE_VERSION mismatch.")
+            if not callable(getattr(mod, "run", None)):
+                raise RuntimeError(f"Plugin '{name}' has no callable run().")
+        except BaseException:
+            sys.modules.pop(mod_name, None)
+            raise
+        _LOADED_PLUGINS[str(module_path)] = (info["code_hash"], mod)
+        return mod
 
     def load_plugin(self, name: str):
         """
         Dynamically import and return the plugin module.
         """
-        self.validate_plugin(name)
-        path = self.plugins_dir / name / "plugin.py"
-        spec = importlib.util.spec_from_file_location(name, str(path))
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)  # type: ignore
-        return module
+        return self._load_module(name)
+
+    def memo(self) -> LRUStore:
+        """
+        Result store for `cacheable` plugins, bounded by
+        MONACODE_PLUGIN_CACHE_BYTES (default 256 MiB).
+        """
+        if self._memo is None:
+            max_bytes = int(os.environ.get("MONACODE_PLUGIN_CACHE_BYTES", str(256 * 1024 * 1024)))
+            self._memo = LRUStore(self.memo_path, max_bytes=max_bytes)
+        return self._memo
+
+    def runner(self, name: str, use_cache: bool = True) -> Callable[[Any], Any]:
+        """
+        The plugin's run(), memoized if metadata.json declares
+        `"cacheable": true`. Results are keyed by code hash, interface
+        version and the canonical JSON of the input, so editing plugin.py
+        invalidates them; stale entries age out of the LRU store. Inputs or
+        results that JSON cannot hold exactly (non-string keys, tuples,
+        NaN, custom types) bypass the cache, so a hit always equals a miss.
+        """
+        mod = self._load_module(name)
+        info = self.plugin_info(name)
+        if not (use_cache and info["metadata"].get("cacheable")):
+            return mod.run
+        store = self.memo()
+        prefix = f"{name}\0{info['code_hash']}\0{info['interface_version']}\0"
+
+        def run(data: Any) -> Any:
+            canonical = _exact_json(data, sort_keys=True, separators=(",", ":"))
+            if canonical is None:
+                return mod.run(data)
+            key = hashlib.sha256((prefix + canonical).encode("utf-8")).hexdigest()
+            hit = store.get(key)
+            if hit is not None:
+                return hit["r"]
+            result = mod.run(data)
+            if _exact_json(result) is not None:
+                store.set(key, {"r": result})
+            return result
+
+        return run
+
+    def run(self, name: str, data: Any, use_cache: bool = True) -> Any:
+        """
+        Run a plugin once, through the result cache if it is cacheable.
+        """
+        return self.runner(name, use_cache)(data)
+
+    def run_stream(self,
+                   name: str,
+                   records: Iterable[Any],
+                   workers: int = 1,
+                   max_inflight: Optional[int] = None,
+                   batch_size: int = 64,
+                   use_cache: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Feed `records` through the plugin's run(), yielding {"result": ...}
+        or {"error": ...} per record, in input order.
+
+        With workers > 1, batches of records go to a process pool whose
+        workers each load the plugin once. Input is consumed lazily and at
+        most `max_inflight` records (default workers * batch_size * 4) are
+        buffered, so memory stays flat on arbitrarily large inputs.
+        """
+        if workers <= 1:
+            run = self.runner(name, use_cache)
+            for record in records:
+                yield _call_plugin(run, record)
+            return
+
+        self._check_metadata(name)
+        max_batches = max(1, (max_inflight or workers * batch_size * 4) // batch_size)
+        it = iter(records)
+        window: deque = deque()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_worker_init,
+                                 initargs=(str(self.plugins_dir), name, use_cache)) as pool:
+            try:
+                while True:
+                    batch = list(islice(it, batch_size))
+                    if batch:
+                        window.append(pool.submit(_worker_run, batch))
+                    if window and (len(window) >= max_batches or not batch):
+                        yield from window.popleft().result()
+                    if not batch and not window:
+                        return
+            except BrokenProcessPool as e:
+                raise RuntimeError(f"Plugin '{name}' failed to load in a worker process.") from e
+            finally:
+                for fut in window:
+                    fut.cancel()
@@ -1,62 +1,400 @@
 import os
 import json
 import time
+import asyncio
 import hashlib
+import functools
+import importlib
+import threading
+import weakref
+from collections import deque
 from pathlib import Path
-from typing import Any, Dict, Optional
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-import requests
-import openai
-import anthropic
-from huggingface_hub import InferenceClient
-from google.cloud import aiplatform
-from google.oauth2 import service_account
-import deepseek_sdk  # hypothetical official import
-import perplexity  # hypothetical official import
+try:
+    import fcntl
+except ImportError:  # Windows: coalescing stays in-process
+    fcntl = None  # type: ignore[assignment]
 
-from .utils import EnvManager, VaultManager
+from .ratelimit import EngineLimiter
+from .store import LRUStore
+from .utils import ConfigLoader, EnvManager, VaultManager, _file_lock
+
+
+class LLMError(Exception):
+    pass
+
+
+# Engine registry: name -> (description, SDK modules imported on first use).
+# Nothing here is imported until the engine is actually called, so commands
+# that never touch an LLM pay no SDK import cost.
+ENGINES: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "openai": ("OpenAI ChatCompletion", ("openai",)),
+    "anthropic": ("Anthropic Claude", ("anthropic",)),
+    "huggingface": ("Hugging Face text-generation", ("huggingface_hub",)),
+    "vertex": ("Google Vertex AI", ("google.cloud.aiplatform", "google.oauth2.service_account")),
+    "deepseek": ("DeepSeek semantic search LLM", ("deepseek_sdk",)),  # hypothetical official SDK
+    "perplexity": ("Perplexity.ai conversational search", ("perplexity",)),  # hypothetical official SDK
+}
+
+# Engines registered at runtime (register_engine): name -> callable(prompt, **opts)
+_CUSTOM_ENGINES: Dict[str, Callable[..., Any]] = {}
+
+
+def register_engine(name: str, fn: Callable[..., Any], description: str = "") -> None:
+    """
+    Add an engine backed by a plain callable `fn(prompt, **opts)`, e.g. a
+    local model or a stub in tests. It can be used anywhere a built-in
+    engine name can, including in hedged routes ("stub-a|stub-b").
+    """
+    ENGINES[name] = (description or f"Custom engine {name}", ())
+    _CUSTOM_ENGINES[name] = fn
+
+
+def _sdk(module: str):
+    """
+    Import an engine SDK on demand; raises LLMError if it is not installed.
+    """
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        raise LLMError(f"SDK '{module}' is not installed: {e}") from e
+
+
+def _estimate_tokens(prompt: str, params: Dict[str, Any]) -> int:
+    """
+    Rough token cost of a request for TPM budgeting: ~4 characters per
+    prompt token plus the requested completion length, if any.
+    """
+    limit = params.get("max_tokens") or params.get("max_tokens_to_sample") or 0
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        limit = 0
+    return len(prompt) // 4 + 1 + limit
+
+
+def _parse_ttl(raw: str) -> Optional[int]:
+    """
+    LLM_CACHE_TTL in seconds; "none" (or empty) means entries never expire.
+    """
+    raw = raw.strip().lower()
+    return None if raw in ("", "none") else int(raw)
 
 
 class CacheManager:
     """
-    Simple file‐based JSON cache for LLM responses.
-    Each entry: { key: { ts: <epoch>, result: <any> } }
+    Indexed on-disk cache for LLM responses (SQLite, see `LRUStore`).
+    Lookups and writes touch one entry; least-recently-used entries are
+    evicted past `max_entries` / `max_bytes`, and expired entries are
+    compacted in the background. A legacy `llm_cache.json` is imported
+    once and renamed out of the way.
+
+    `ttl=0` disables caching; `ttl=None` keeps entries until evicted.
     """
 
-    def __init__(self, ttl: int = 3600):
+    def __init__(self, ttl: Optional[int] = 3600, max_entries: int = 50_000,
+                 max_bytes: int = 256 * 1024 * 1024):
         self.ttl = ttl
-        cache_dir = Path.home() / ".monacode" / "cache"
-        cache_dir.mkdir(parents=True, exist_ok=True)
-        self.cache_file = cache_dir / "llm_cache.json"
-        if not self.cache_file.exists():
-            self.cache_file.write_text(json.dumps({}))
-
-    def _load(self) -> Dict[str, Any]:
-        return json.loads(self.cache_file.read_text())
+        self.cache_dir = Path.home() / ".monacode" / "cache"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.store = LRUStore(self.cache_dir / "llm_cache.db", ttl=ttl,
+                              max_entries=max_entries, max_bytes=max_bytes)
+        self._migrate_json(self.cache_dir / "llm_cache.json")
 
-    def _save(self, data: Dict[str, Any]):
-        self.cache_file.write_text(json.dumps(data, indent=2))
+    def _migrate_json(self, legacy: Path):
+        """
+        Import entries from the old single-file JSON cache, then rename it.
+        Concurrent processes serialize on a lock; the loser finds it gone.
+        """
+        if not legacy.exists():
+            return
+        with _file_lock(legacy.with_suffix(".json.lock")):
+            try:
+                text = legacy.read_text()
+            except FileNotFoundError:
+                return
+            try:
+                data = json.loads(text or "{}")
+            except ValueError:
+                data = {}
+            now = time.time()
+            self.store.set_many(
+                (k, v["result"], v["ts"]) for k, v in data.items()
+                if isinstance(v, dict) and "result" in v
+                and (self.ttl is None or now - v.get("ts", 0) <= self.ttl)
+            )
+            legacy.replace(legacy.with_suffix(".json.migrated"))
 
     def make_key(self, engine: str, prompt: str, params: Dict[str, Any]) -> str:
         raw = json.dumps({"e": engine, "p": prompt, "k": params}, sort_keys=True)
         return hashlib.sha256(raw.encode()).hexdigest()
 
     def get(self, key: str) -> Optional[Any]:
-        data = self._load()
-        entry = data.get(key)
-        if not entry:
-            return None
-        if time.time() - entry["ts"] > self.ttl:
-            # expired
-            del data[key]
-            self._save(data)
+        if self.ttl == 0:
             return None
-        return entry["result"]
+        return self.store.get(key)
 
     def set(self, key: str, result: Any):
-        data = self._load()
-        data[key] = {"ts": time.time(), "result": result}
-        self._save(data)
+        if self.ttl == 0:
+            return
+        self.store.set(key, result)
+
+    def close(self) -> None:
+        self.store.close()
+
+
+class _Call:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent work on the same key. In-process, the first
+    caller runs `fn` and later callers wait for its result (or error).
+    Across processes the leader holds an exclusive flock on
+    `<lock_dir>/<key>.lock`, so `fn` should re-check the cache first:
+    a process that waited on the lock will usually find the answer there.
+    """
+
+    def __init__(self, lock_dir: Path):
+        self.lock_dir = lock_dir
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        self._calls: Dict[str, _Call] = {}
+        self._flights: Dict[Tuple[int, str], _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            with self.file_lock(key):
+                call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+        return call.result
+
+    async def ado(self, key: str, fn: Callable[[], Any], run_blocking: Callable[..., Any]) -> Any:
+        """
+        Async do(): the work runs in a task of its own that every caller
+        awaits through asyncio.shield, so cancelling one caller (even the
+        first) leaves the others waiting; the task is cancelled only when
+        no caller is left. The file lock is taken through `run_blocking`
+        so the event loop never blocks on it.
+        """
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+        flight = self._flights.get(slot)
+        if flight is None:
+            flight = self._flights[slot] = _Flight(loop.create_task(self._alead(key, fn, run_blocking)))
+
+            def done(task, flight=flight):
+                if self._flights.get(slot) is flight:
+                    del self._flights[slot]
+                task.cancelled() or task.exception()
+
+            flight.task.add_done_callback(done)
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                flight.task.cancel()
+
+    async def _alead(self, key: str, fn: Callable[[], Any], run_blocking: Callable[..., Any]) -> Any:
+        acquire = asyncio.ensure_future(run_blocking(self._acquire, key))
+        try:
+            fd = await asyncio.shield(acquire)
+        except asyncio.CancelledError:
+            # the executor thread may still get the lock; release it then
+            acquire.add_done_callback(
+                lambda f: f.cancelled() or f.exception() or self._release(key, f.result()))
+            raise
+        try:
+            return await fn()
+        finally:
+            await run_blocking(self._release, key, fd)
+
+    @contextmanager
+    def file_lock(self, key: str):
+        fd = self._acquire(key)
+        try:
+            yield
+        finally:
+            self._release(key, fd)
+
+    def _acquire(self, key: str) -> Optional[int]:
+        if fcntl is None:
+            return None
+        path = self.lock_dir / f"{key}.lock"
+        while True:
+            fd = os.open(str(path), os.O_CREAT | os.O_RDWR, 0o600)
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            # the previous holder unlinks the file on release; make sure we
+            # locked the file that is still at `path`, not an orphan
+            try:
+                if os.stat(str(path)).st_ino == os.fstat(fd).st_ino:
+                    return fd
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+
+    def _release(self, key: str, fd: Optional[int]) -> None:
+        if fd is None:
+            return
+        try:
+            os.unlink(str(self.lock_dir / f"{key}.lock"))
+        except FileNotFoundError:
+            pass
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+class LatencyTracker:
+    """
+    Rolling window of successful call latencies per engine, used to pick
+    the hedge deadline for routed requests.
+    """
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, engine: str, seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(engine, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, engine: str, pct: float, min_samples: int = 20) -> Optional[float]:
+        """
+        The `pct`-th percentile latency, or None until `min_samples` are seen.
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(engine, ()))
+        if len(samples) < min_samples:
+            return None
+        idx = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[idx]
+
+
+class ClientPool:
+    """
+    Engine clients keyed by (engine, credentials). Each client is built on
+    first use and reused for the lifetime of the pool, so its HTTP/gRPC
+    connections stay alive across calls. Credentials are only kept as a
+    fingerprint in the key.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, str], Any] = {}
+        self._loops: Dict[Tuple[str, str], Any] = {}
+        self._stale: List[Any] = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(engine: str, credentials: Tuple[Any, ...]) -> Tuple[str, str]:
+        return engine, hashlib.sha256(repr(credentials).encode()).hexdigest()
+
+    def get(self, engine: str, credentials: Tuple[Any, ...], factory: Callable[[], Any]) -> Any:
+        key = self._key(engine, credentials)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = factory()
+                    self._clients[key] = client
+        return client
+
+    def get_async(self, engine: str, credentials: Tuple[Any, ...],
+                  factory: Callable[[], Any]) -> Any:
+        """
+        get() for clients bound to the running event loop: one per loop,
+        rebuilt if a later loop happens to reuse a dead loop's id.
+        """
+        loop = asyncio.get_running_loop()
+        key = self._key(engine, credentials + (id(loop),))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None or self._loops[key]() is not loop:
+                if client is not None:
+                    self._stale.append(client)  # still closed by close()
+                client = factory()
+                self._clients[key] = client
+                self._loops[key] = weakref.ref(loop)
+        return client
+
+    def close(self) -> list:
+        """
+        Close every pooled client. Async clients return their close
+        coroutines, which the caller should await (see LLMManager.aclose).
+        """
+        with self._lock:
+            clients, self._clients = list(self._clients.values()) + self._stale, {}
+            self._loops, self._stale = {}, []
+        pending = []
+        for client in clients:
+            close = getattr(client, "close", None)
+            if callable(close):
+                try:
+                    res = close()
+                except Exception:
+                    continue
+                if asyncio.iscoroutine(res):
+                    pending.append(res)
+        return pending
+
+
+def _http_session(pool_size: int):
+    """
+    requests.Session with a keep-alive connection pool sized for concurrency.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _aio_session(pool_size: int):
+    """
+    aiohttp.ClientSession with a keep-alive connector sized for concurrency.
+    It is bound to the running event loop, so build one per loop.
+    """
+    aiohttp = _sdk("aiohttp")
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=pool_size))
 
 
 class LLMManager:
@@ -68,21 +406,66 @@ class LLMManager:
     def __init__(self, default_engine: Optional[str] = None):
         self.env = EnvManager()
         self.vault = VaultManager()
-        self.cache = CacheManager(ttl=int(self.env.get("LLM_CACHE_TTL", "3600")))
+        self.cache = CacheManager(
+            ttl=_parse_ttl(self.env.get("LLM_CACHE_TTL", "3600")),
+            max_entries=int(self.env.get("LLM_CACHE_MAX_ENTRIES", "50000")),
+            max_bytes=int(self.env.get("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+        )
         self.default_engine = default_engine or self.env.get("LLM_DEFAULT", "openai")
 
-        # Initialize clients
-        openai.api_key = self.env.get("OPENAI_API_KEY", "")
-        self.anthropic_client = anthropic.Client(self.env.get("ANTHROPIC_API_KEY", ""))
-        self.hf_client = InferenceClient(token=self.env.get("HUGGINGFACE_API_TOKEN", ""))
-        # Vertex AI
-        gcp_key = self.env.get("GCP_SERVICE_ACCOUNT_JSON")
-        if gcp_key and Path(gcp_key).exists():
-            creds = service_account.Credentials.from_service_account_file(gcp_key)
-            aiplatform.init(credentials=creds, project=self.env.get("GOOGLE_PROJECT_ID", ""), location=self.env.get("GOOGLE_LOCATION", "us-central1"))
-        # DeepSeek & Perplexity use direct API keys via env
-        self.deepseek_key = self.env.get("DEEPSEEK_API_KEY", "")
-        self.perplexity_key = self.env.get("PERPLEXITY_API_KEY", "")
+        # Clients are built on first use of their engine and then reused
+        self.clients = ClientPool()
+        self.pool_size = int(self.env.get("LLM_POOL_SIZE", "32"))
+        # Async support: blocking SDK calls and cache I/O run off the event loop
+        self._blocking: Optional[ThreadPoolExecutor] = None
+        self._cache_io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="monacode-cache")
+        # Per-engine rate limiters, built from config on first use
+        self._limiters: Dict[str, EngineLimiter] = {}
+        self._limiters_lock = threading.Lock()
+        # Concurrent misses on the same cache key share one backend call
+        self.flight = SingleFlight(self.cache.cache_dir / "locks")
+        # Observed latencies drive the hedge deadline of routed requests
+        self.latency = LatencyTracker(int(self.env.get("LLM_HEDGE_WINDOW", "200")))
+        self._cfg: Optional[Dict[str, Any]] = None
+        self._secrets: Dict[str, str] = {}
+
+    def close(self) -> None:
+        """
+        Release pooled engine clients, their connections, worker threads
+        and the response cache.
+        """
+        for coro in self.clients.close():
+            coro.close()  # no loop to run it on; the connections die with their loop
+        self._shutdown_executors()
+
+    async def aclose(self) -> None:
+        """
+        Async close(): also awaits shutdown of async engine clients.
+        """
+        for coro in self.clients.close():
+            try:
+                await coro
+            except Exception:
+                pass
+        self._shutdown_executors()
+
+    def _shutdown_executors(self) -> None:
+        if self._blocking is not None:
+            self._blocking.shutdown(wait=False)
+        self._cache_io.shutdown(wait=True)
+        self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
 
     def generate(self,
                  prompt: str,
@@ -91,6 +474,12 @@ class LLMManager:
         """
         Main entry: generate text from chosen engine.
         Caches identical calls.
+
+        `engine` may also be a route, "primary|secondary[|...]" or the name
+        of a route under llm.routes in config.yml: the request goes to the
+        primary, is hedged to the next engine if no answer arrives within
+        the primary's observed latency percentile (LLM_HEDGE_PERCENTILE),
+        and fails over to the next engine on errors.
         """
         engine = engine or self.default_engine
         key = self.cache.make_key(engine, prompt, kwargs)
@@ -98,56 +487,575 @@ class LLMManager:
         if cached is not None:
             return cached
 
-        fn = getattr(self, f"_gen_{engine}", None)
+        engines = self._route(engine)
+
+        def compute():
+            # another process may have filled the cache while we waited
+            hit = self.cache.get(key)
+            if hit is not None:
+                return hit
+            if len(engines) == 1:
+                result = self._call_engine(engines[0], prompt, kwargs)
+            else:
+                result = self._hedged(engines, prompt, kwargs)
+            self.cache.set(key, result)
+            return result
+
+        return self.flight.do(key, compute)
+
+    def generate_stream(self,
+                        prompt: str,
+                        engine: Optional[str] = None,
+                        **kwargs) -> Iterator[Any]:
+        """
+        Yield the completion in chunks as the engine produces them.
+        Engines without streaming support yield the full result once.
+        The assembled result is cached under the same key as generate().
+        """
+        engine = engine or self.default_engine
+        key = self.cache.make_key(engine, prompt, kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        engines = self._route(engine)
+        if len(engines) > 1:
+            # routes race whole answers; hedging a stream is not supported
+            yield self.generate(prompt, engine=engine, **kwargs)
+            return
+
+        target = engines[0]
+        limiter = self._limiter(target)
+        tokens = _estimate_tokens(prompt, kwargs)
+        stream = getattr(self, f"_stream_{target}", None)
+        if stream is None:
+            result = self._call_engine(target, prompt, kwargs)
+            self.cache.set(key, result)
+            yield result
+            return
+
+        parts = []
+        for chunk in limiter.iterate(lambda: stream(prompt, **kwargs), tokens):
+            if chunk:
+                parts.append(chunk)
+                yield chunk
+        self.cache.set(key, "".join(parts))
+
+    def generate_many(self,
+                      requests: Iterable[Union[str, Dict[str, Any]]],
+                      engine: Optional[str] = None,
+                      workers: int = 8,
+                      ordered: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Run many prompts concurrently with up to `workers` calls in flight
+        per engine. Each request is a prompt string or a dict with `prompt`
+        and optional `id`, `engine` and `params`. Requests are read lazily
+        and cache hits are answered without dispatch.
+
+        Yields one record per request -- {"id", "engine", "result"} or
+        {"id", "engine", "error"}, with "cached": True on hits -- in
+        completion order, or input order when `ordered` is set.
+        """
+        pools: Dict[str, ThreadPoolExecutor] = {}
+        window = max(1, workers) * 4
+        pending: Dict[Any, Tuple[int, Dict[str, Any]]] = {}
+        done: Dict[int, Dict[str, Any]] = {}
+        next_out = 0
+
+        def run(prompt, eng, params):
+            return self.generate(prompt, engine=eng, **params)
+
+        def drain(block: bool) -> Iterator[Dict[str, Any]]:
+            nonlocal next_out
+            if pending:
+                finished, _ = wait(list(pending), timeout=None if block else 0,
+                                   return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    idx, rec = pending.pop(fut)
+                    try:
+                        rec["result"] = fut.result()
+                    except Exception as e:
+                        rec["error"] = str(e)
+                    done[idx] = rec
+            if ordered:
+                while next_out in done:
+                    yield done.pop(next_out)
+                    next_out += 1
+            else:
+                for idx in list(done):
+                    yield done.pop(idx)
+
+        try:
+            for idx, req in enumerate(requests):
+                if isinstance(req, str):
+                    req = {"prompt": req}
+                eng = req.get("engine") or engine or self.default_engine
+                params = req.get("params") or {}
+                rec = {"id": req.get("id", idx), "engine": eng}
+                cached = self.cache.get(self.cache.make_key(eng, req.get("prompt", ""), params))
+                if cached is not None:
+                    rec.update(result=cached, cached=True)
+                    done[idx] = rec
+                elif not self._is_routable(eng) or "prompt" not in req:
+                    rec["error"] = "Missing prompt" if self._is_routable(eng) else f"Unsupported LLM engine: {eng}"
+                    done[idx] = rec
+                else:
+                    if eng not in pools:
+                        pools[eng] = ThreadPoolExecutor(max_workers=workers,
+                                                        thread_name_prefix=f"monacode-{eng}")
+                    fut = pools[eng].submit(run, req["prompt"], eng, params)
+                    pending[fut] = (idx, rec)
+                yield from drain(block=False)
+                while len(pending) + len(done) >= window and pending:
+                    yield from drain(block=True)
+            while pending or done:
+                yield from drain(block=True)
+        finally:
+            for fut in pending:
+                fut.cancel()
+            for pool in pools.values():
+                pool.shutdown(wait=False)
+
+    async def agenerate(self,
+                        prompt: str,
+                        engine: Optional[str] = None,
+                        **kwargs) -> Any:
+        """
+        Async generate(): uses the engine's async client where the SDK has
+        one, otherwise runs the blocking call on a bounded executor
+        (LLM_ASYNC_WORKERS threads). Cache reads and writes never block
+        the event loop.
+        """
+        engine = engine or self.default_engine
+        key = self.cache.make_key(engine, prompt, kwargs)
+        cached = await self._acache(self.cache.get, key)
+        if cached is not None:
+            return cached
+
+        engines = self._route(engine)
+
+        async def compute():
+            hit = await self._acache(self.cache.get, key)
+            if hit is not None:
+                return hit
+            if len(engines) == 1:
+                result = await self._acall_engine(engines[0], prompt, kwargs)
+            else:
+                result = await self._ahedged(engines, prompt, kwargs)
+            await self._acache(self.cache.set, key, result)
+            return result
+
+        return await self.flight.ado(key, compute, self._in_executor)
+
+    async def agenerate_stream(self,
+                               prompt: str,
+                               engine: Optional[str] = None,
+                               **kwargs) -> AsyncIterator[Any]:
+        """
+        Async generate_stream(): yields chunks from the engine's async
+        stream, or pumps its blocking stream through the executor; engines
+        without streaming yield one chunk. Completed streams are cached.
+        """
+        engine = engine or self.default_engine
+        key = self.cache.make_key(engine, prompt, kwargs)
+        cached = await self._acache(self.cache.get, key)
+        if cached is not None:
+            yield cached
+            return
+
+        engines = self._route(engine)
+        if len(engines) > 1:
+            yield await self.agenerate(prompt, engine=engine, **kwargs)
+            return
+
+        target = engines[0]
+        astream = getattr(self, f"_astream_{target}", None)
+        stream = getattr(self, f"_stream_{target}", None)
+        if astream is not None:
+            make = lambda: astream(prompt, **kwargs)  # noqa: E731
+        elif stream is not None:
+            make = lambda: self._pump(stream(prompt, **kwargs))  # noqa: E731
+        else:
+            result = await self.agenerate(prompt, engine=engine, **kwargs)
+            yield result
+            return
+
+        parts = []
+        async for chunk in self._limiter(target).aiterate(make, _estimate_tokens(prompt, kwargs)):
+            if chunk:
+                parts.append(chunk)
+                yield chunk
+        await self._acache(self.cache.set, key, "".join(parts))
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._blocking is None:
+            self._blocking = ThreadPoolExecutor(
+                max_workers=int(self.env.get("LLM_ASYNC_WORKERS", "16")),
+                thread_name_prefix="monacode-llm",
+            )
+        return self._blocking
+
+    async def _in_executor(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor(), functools.partial(fn, *args, **kwargs))
+
+    async def _acache(self, fn: Callable[..., Any], *args) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._cache_io, fn, *args)
+
+    async def _pump(self, it: Iterator[Any]) -> AsyncIterator[Any]:
+        """
+        Drive a blocking iterator from the executor, one item at a time.
+        """
+        done = object()
+        while True:
+            item = await self._in_executor(next, it, done)
+            if item is done:
+                return
+            yield item
+
+    def _call_engine(self, engine: str, prompt: str, kwargs: Dict[str, Any]) -> Any:
+        """
+        One rate-limited backend call, recording its latency on success.
+        """
+        fn = self._engine_fn(engine)
+
+        def timed():
+            start = time.monotonic()
+            result = fn(prompt, **kwargs)
+            self.latency.record(engine, time.monotonic() - start)
+            return result
+
+        return self._limiter(engine).call(timed, _estimate_tokens(prompt, kwargs))
+
+    async def _acall_engine(self, engine: str, prompt: str, kwargs: Dict[str, Any]) -> Any:
+        gen = self._engine_fn(engine)
+        agen = getattr(self, f"_agen_{engine}", None)
+        if agen is None:
+            agen = functools.partial(self._in_executor, gen)
+
+        async def timed():
+            start = time.monotonic()
+            result = await agen(prompt, **kwargs)
+            self.latency.record(engine, time.monotonic() - start)
+            return result
+
+        return await self._limiter(engine).acall(timed, _estimate_tokens(prompt, kwargs))
+
+    def _hedge_delay(self, engine: str) -> float:
+        """
+        How long to wait on `engine` before hedging to the next one.
+        """
+        hedge = (self._config().get("llm") or {}).get("hedge") or {}
+        pct = float(self.env.get("LLM_HEDGE_PERCENTILE") or hedge.get("percentile", 95))
+        fallback = float(self.env.get("LLM_HEDGE_DELAY") or hedge.get("delay", 2.0))
+        observed = self.latency.percentile(engine, pct, int(hedge.get("min_samples", 20)))
+        return fallback if observed is None else observed
+
+    def _hedged(self, engines: List[str], prompt: str, kwargs: Dict[str, Any]) -> Any:
+        """
+        Race `engines` in order: start the next one when the newest has not
+        answered within its hedge delay, or as soon as a call fails. The
+        first answer wins; calls still queued are cancelled and running
+        ones are abandoned (blocking SDK calls cannot be interrupted).
+        """
+        pool = self._executor()
+        queue = list(engines)
+        running: Dict[Any, str] = {}
+        errors: List[str] = []
+
+        def launch():
+            eng = queue.pop(0)
+            running[pool.submit(self._call_engine, eng, prompt, kwargs)] = eng
+            return self._hedge_delay(eng)
+
+        timeout = launch()
+        while running:
+            finished, _ = wait(list(running), timeout=timeout if queue else None,
+                               return_when=FIRST_COMPLETED)
+            if not finished:
+                timeout = launch()
+                continue
+            for fut in finished:
+                eng = running.pop(fut)
+                try:
+                    result = fut.result()
+                except Exception as e:
+                    errors.append(f"{eng}: {e}")
+                    if queue:
+                        # a failure hedges at once; the wait restarts for the new call
+                        timeout = launch()
+                    continue
+                for other in running:
+                    other.cancel()
+                return result
+        raise LLMError("All engines failed: " + "; ".join(errors))
+
+    async def _ahedged(self, engines: List[str], prompt: str, kwargs: Dict[str, Any]) -> Any:
+        """
+        Async _hedged(); the losing calls are cancelled outright.
+        """
+        queue = list(engines)
+        running: Dict["asyncio.Task[Any]", str] = {}
+        errors: List[str] = []
+
+        def launch():
+            eng = queue.pop(0)
+            running[asyncio.ensure_future(self._acall_engine(eng, prompt, kwargs))] = eng
+            return self._hedge_delay(eng)
+
+        timeout = launch()
+        try:
+            while running:
+                finished, _ = await asyncio.wait(list(running), timeout=timeout if queue else None,
+                                                 return_when=asyncio.FIRST_COMPLETED)
+                if not finished:
+                    timeout = launch()
+                    continue
+                for task in finished:
+                    eng = running.pop(task)
+                    try:
+                        return task.result()
+                    except Exception as e:
+                        errors.append(f"{eng}: {e}")
+                        if queue:
+                            timeout = launch()
+        finally:
+            for task in running:
+                task.cancel()
+        raise LLMError("All engines failed: " + "; ".join(errors))
+
+    def _secret(self, name: str) -> str:
+        """
+        API credential from the environment, else from the vault when an
+        unlock agent holds its key (never prompts). Memoized per manager.
+        """
+        if name not in self._secrets:
+            self._secrets[name] = self.env.get(name) or self.vault.lookup(name) or ""
+        return self._secrets[name]
+
+    def _config(self) -> Dict[str, Any]:
+        if self._cfg is None:
+            self._cfg = ConfigLoader().effective()
+        return self._cfg
+
+    def _route(self, engine: str) -> List[str]:
+        """
+        Engines behind `engine`: itself, a "a|b" route, or a named route
+        from llm.routes in config.yml. Raises ValueError for unknown names.
+        """
+        if "|" not in engine and engine not in ENGINES:
+            routes = (self._config().get("llm") or {}).get("routes") or {}
+            route = routes.get(engine)
+            if route:
+                engine = route if isinstance(route, str) else "|".join(route)
+        engines = [e.strip() for e in engine.split("|") if e.strip()]
+        for e in engines or [engine]:
+            self._engine_fn(e)
+        return engines
+
+    def _is_routable(self, engine: str) -> bool:
+        try:
+            self._route(engine)
+        except ValueError:
+            return False
+        return True
+
+    def _limiter(self, engine: str) -> EngineLimiter:
+        limiter = self._limiters.get(engine)
+        if limiter is None:
+            with self._limiters_lock:
+                limiter = self._limiters.get(engine)
+                if limiter is None:
+                    limiter = EngineLimiter.from_settings(self._limit_settings(engine))
+                    self._limiters[engine] = limiter
+        return limiter
+
+    def _limit_settings(self, engine: str) -> Dict[str, Any]:
+        """
+        Rate limits for `engine` from config.yml (llm.limits.<engine>:
+        rpm, tpm, max_concurrency, max_retries, backoff_base, backoff_max),
+        overridden by LLM_<ENGINE>_<SETTING> environment variables.
+        """
+        cfg = self._config()
+        settings = dict(((cfg.get("llm") or {}).get("limits") or {}).get(engine) or {})
+        for name in ("rpm", "tpm", "max_concurrency", "max_retries", "backoff_base", "backoff_max"):
+            val = self.env.get(f"LLM_{engine.upper()}_{name.upper()}")
+            if val:
+                settings[name] = val
+        return settings
+
+    def _engine_fn(self, engine: str) -> Callable[..., Any]:
+        if engine in _CUSTOM_ENGINES:
+            return _CUSTOM_ENGINES[engine]
+        fn = getattr(self, f"_gen_{engine}", None) if engine in ENGINES else None
         if not fn:
             raise ValueError(f"Unsupported LLM engine: {engine}")
+        return fn
 
-        result = fn(prompt, **kwargs)
-        self.cache.set(key, result)
-        return result
+    def _openai(self):
+        openai = _sdk("openai")
+        api_key = self._secret("OPENAI_API_KEY")
+        openai.requestssession = self.clients.get(
+            "openai", (api_key,), lambda: _http_session(self.pool_size))
+        return openai, api_key
 
     def _gen_openai(self, prompt: str, model: str = "gpt-3.5-turbo", **opts):
+        openai, api_key = self._openai()
+        payload = {"model": model, "messages": [{"role": "user", "content": prompt}], **opts}
+        resp = openai.ChatCompletion.create(api_key=api_key, **payload)
+        return resp.choices[0].message.content
+
+    def _stream_openai(self, prompt: str, model: str = "gpt-3.5-turbo", **opts):
+        openai, api_key = self._openai()
+        payload = {"model": model, "messages": [{"role": "user", "content": prompt}], **opts}
+        for chunk in openai.ChatCompletion.create(api_key=api_key, stream=True, **payload):
+            yield chunk.choices[0].delta.get("content")
+
+    @contextmanager
+    def _openai_aiosession(self, openai):
+        """
+        Bind this loop's pooled aiohttp session to openai for one request;
+        without it the SDK opens and closes a session per call.
+        """
+        session = self.clients.get_async("openai-aiohttp", (), lambda: _aio_session(self.pool_size))
+        token = openai.aiosession.set(session)
+        try:
+            yield
+        finally:
+            openai.aiosession.reset(token)
+
+    async def _agen_openai(self, prompt: str, model: str = "gpt-3.5-turbo", **opts):
+        openai, api_key = self._openai()
         payload = {"model": model, "messages": [{"role": "user", "content": prompt}], **opts}
-        resp = openai.ChatCompletion.create(**payload)
+        with self._openai_aiosession(openai):
+            resp = await openai.ChatCompletion.acreate(api_key=api_key, **payload)
         return resp.choices[0].message.content
 
+    async def _astream_openai(self, prompt: str, model: str = "gpt-3.5-turbo", **opts):
+        openai, api_key = self._openai()
+        payload = {"model": model, "messages": [{"role": "user", "content": prompt}], **opts}
+        with self._openai_aiosession(openai):
+            stream = await openai.ChatCompletion.acreate(api_key=api_key, stream=True, **payload)
+        async for chunk in stream:
+            yield chunk.choices[0].delta.get("content")
+
+    def _anthropic(self):
+        anthropic = _sdk("anthropic")
+        api_key = self._secret("ANTHROPIC_API_KEY")
+        return anthropic, self.clients.get("anthropic", (api_key,), lambda: anthropic.Client(api_key))
+
     def _gen_anthropic(self, prompt: str, model: str = "claude-2", **opts):
+        anthropic, client = self._anthropic()
         combined = f"{anthropic.HUMAN_PROMPT} {prompt}{anthropic.AI_PROMPT}"
-        resp = self.anthropic_client.completions.create(model=model, prompt=combined, **opts)
+        resp = client.completions.create(model=model, prompt=combined, **opts)
         return resp.completion
 
+    def _stream_anthropic(self, prompt: str, model: str = "claude-2", **opts):
+        anthropic, client = self._anthropic()
+        combined = f"{anthropic.HUMAN_PROMPT} {prompt}{anthropic.AI_PROMPT}"
+        for event in client.completions.create(model=model, prompt=combined, stream=True, **opts):
+            yield event.completion
+
+    def _anthropic_async(self):
+        # async clients hold connections bound to the running event loop
+        anthropic = _sdk("anthropic")
+        api_key = self._secret("ANTHROPIC_API_KEY")
+        return anthropic, self.clients.get_async("anthropic-async", (api_key,),
+                                                 lambda: anthropic.AsyncClient(api_key=api_key))
+
+    async def _agen_anthropic(self, prompt: str, model: str = "claude-2", **opts):
+        anthropic, client = self._anthropic_async()
+        combined = f"{anthropic.HUMAN_PROMPT} {prompt}{anthropic.AI_PROMPT}"
+        resp = await client.completions.create(model=model, prompt=combined, **opts)
+        return resp.completion
+
+    async def _astream_anthropic(self, prompt: str, model: str = "claude-2", **opts):
+        anthropic, client = self._anthropic_async()
+        combined = f"{anthropic.HUMAN_PROMPT} {prompt}{anthropic.AI_PROMPT}"
+        async for event in await client.completions.create(model=model, prompt=combined, stream=True, **opts):
+            yield event.completion
+
+    def _huggingface(self):
+        hub = _sdk("huggingface_hub")
+        token = self._secret("HUGGINGFACE_API_TOKEN")
+        return self.clients.get("huggingface", (token,), lambda: hub.InferenceClient(token=token))
+
     def _gen_huggingface(self, prompt: str, model: str = "gpt2", **opts):
-        resp = self.hf_client.text_generation(model=model, inputs=prompt, **opts)
+        resp = self._huggingface().text_generation(model=model, inputs=prompt, **opts)
         return resp.generated_text
 
+    def _stream_huggingface(self, prompt: str, model: str = "gpt2", **opts):
+        # with stream=True (and details off) the client yields token strings
+        yield from self._huggingface().text_generation(model=model, inputs=prompt, stream=True, **opts)
+
+    def _huggingface_async(self):
+        hub = _sdk("huggingface_hub")
+        token = self._secret("HUGGINGFACE_API_TOKEN")
+        return self.clients.get_async("huggingface-async", (token,),
+                                      lambda: hub.AsyncInferenceClient(token=token))
+
+    async def _agen_huggingface(self, prompt: str, model: str = "gpt2", **opts):
+        resp = await self._huggingface_async().text_generation(model=model, inputs=prompt, **opts)
+        return resp.generated_text
+
+    async def _astream_huggingface(self, prompt: str, model: str = "gpt2", **opts):
+        stream = await self._huggingface_async().text_generation(model=model, inputs=prompt, stream=True, **opts)
+        async for token in stream:
+            yield token
+
+    def _vertex(self):
+        """
+        Vertex AI prediction client (one gRPC channel per credentials/location).
+        """
+        aiplatform = _sdk("google.cloud.aiplatform")
+        gcp_key = self.env.get("GCP_SERVICE_ACCOUNT_JSON")
+        project = self.env.get("GOOGLE_PROJECT_ID", "")
+        location = self.env.get("GOOGLE_LOCATION", "us-central1")
+
+        def build():
+            creds = None
+            if gcp_key and Path(gcp_key).exists():
+                service_account = _sdk("google.oauth2.service_account")
+                creds = service_account.Credentials.from_service_account_file(gcp_key)
+                aiplatform.init(credentials=creds, project=project, location=location)
+            return aiplatform.gapic.PredictionServiceClient(
+                credentials=creds,
+                client_options={"api_endpoint": f"{location}-aiplatform.googleapis.com"},
+            )
+
+        return self.clients.get("vertex", (gcp_key, project, location), build)
+
     def _gen_vertex(self, prompt: str, endpoint: Optional[str] = None, model: Optional[str] = None, **opts):
+        client = self._vertex()
         endpoint = endpoint or self.env.get("GOOGLE_ENDPOINT_ID")
-        client = aiplatform.gapic.PredictionServiceClient()
-        name = client.endpoint_path(self.env.get("GOOGLE_PROJECT_ID"), self.env.get("GOOGLE_LOCATION"), endpoint)
+        name = client.endpoint_path(self.env.get("GOOGLE_PROJECT_ID"), self.env.get("GOOGLE_LOCATION", "us-central1"), endpoint)
         payload = {"instances": [{"content": prompt}]}
         response = client.predict(name=name, payload=payload, **opts)
         # assume first prediction text field
         return response.predictions[0].get("content") or response.predictions[0]
 
+    def _deepseek(self):
+        deepseek_sdk = _sdk("deepseek_sdk")
+        api_key = self._secret("DEEPSEEK_API_KEY")
+        return self.clients.get("deepseek", (api_key,), lambda: deepseek_sdk.Client(api_key=api_key))
+
     def _gen_deepseek(self, prompt: str, **opts):
-        ds = deepseek_sdk.Client(api_key=self.deepseek_key)
-        resp = ds.query(prompt, **opts)
+        resp = self._deepseek().query(prompt, **opts)
         return resp.text
 
+    def _perplexity(self):
+        perplexity = _sdk("perplexity")
+        api_key = self._secret("PERPLEXITY_API_KEY")
+        return self.clients.get("perplexity", (api_key,), lambda: perplexity.Client(api_key))
+
     def _gen_perplexity(self, prompt: str, **opts):
-        client = perplexity.Client(self.perplexity_key)
-        resp = client.ask(prompt, **opts)
+        resp = self._perplexity().ask(prompt, **opts)
         return resp.answer
 
     def list_engines(self) -> Dict[str, str]:
         """
         Returns available engine names and brief descriptions.
         """
-        return {
-            "openai": "OpenAI ChatCompletion",
-            "anthropic": "Anthropic Claude",
-            "huggingface": "Hugging Face text-generation",
-            "vertex": "Google Vertex AI",
-            "deepseek": "DeepSeek semantic search LLM",
-            "perplexity": "Perplexity.ai conversational search",
-        }
+        return {name: desc for name, (desc, _) in ENGINES.items()}
@@ -0,0 +1,165 @@
+import time
+import queue
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+# End-of-stream marker passed between stage threads
+_DONE = object()
+
+
+class PipelineError(Exception):
+    pass
+
+
+class _Failure:
+    """
+    An exception raised by a stage, carried downstream in place of a record.
+    """
+
+    def __init__(self, stage: str, exc: BaseException):
+        self.stage = stage
+        self.exc = exc
+
+
+class StageStats:
+    """
+    Call count and cumulative run() time for one stage.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.seconds = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        avg = self.seconds / self.calls if self.calls else 0.0
+        return {"stage": self.name, "calls": self.calls,
+                "seconds": round(self.seconds, 6), "avg_ms": round(avg * 1000, 3)}
+
+
+class Pipeline:
+    """
+    Chain of plugins run in one process. Each stage's run() output is passed
+    as-is to the next stage's run(), with no serialization between hops.
+
+    `run()` pushes a single payload through the stages in turn; `stream()`
+    runs every stage in its own thread, connected by bounded queues, so
+    stages that wait on I/O or subprocesses overlap across records.
+    """
+
+    def __init__(self, stages: List[str], plugins_dir: Optional[str] = None,
+                 queue_size: int = 64):
+        from .git import PluginManager
+
+        if not stages:
+            raise PipelineError("A pipeline needs at least one stage.")
+        self.pm = PluginManager(plugins_dir)
+        self.stages = list(stages)
+        self.queue_size = max(1, queue_size)
+        self.stats = [StageStats(name) for name in self.stages]
+        self._runs = [self.pm.runner(name) for name in self.stages]
+
+    @classmethod
+    def from_config(cls, name: str, plugins_dir: Optional[str] = None) -> "Pipeline":
+        """
+        Build the pipeline defined at `plugins.pipelines.<name>`, either a
+        list of plugin names or a mapping with `stages` and `queue_size`.
+        """
+        from .utils import ConfigLoader
+
+        spec = ConfigLoader().get(f"plugins.pipelines.{name}")
+        if isinstance(spec, list):
+            spec = {"stages": spec}
+        if not isinstance(spec, dict) or not spec.get("stages"):
+            raise PipelineError(f"No pipeline '{name}' in config (plugins.pipelines.{name}).")
+        return cls([str(s) for s in spec["stages"]], plugins_dir,
+                   queue_size=int(spec.get("queue_size", 64)))
+
+    def _call(self, i: int, data: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return self._runs[i](data)
+        finally:
+            st = self.stats[i]
+            st.calls += 1
+            st.seconds += time.perf_counter() - start
+
+    def run(self, data: Any) -> Any:
+        """
+        Push one payload through every stage; raises PipelineError naming
+        the failing stage.
+        """
+        for i, name in enumerate(self.stages):
+            try:
+                data = self._call(i, data)
+            except Exception as e:
+                raise PipelineError(f"Stage '{name}' failed: {type(e).__name__}: {e}") from e
+        return data
+
+    def stream(self, records: Iterable[Any]) -> Iterator[Any]:
+        """
+        Yield the pipeline output for each record, in input order. A stage
+        error stops the pipeline and is raised as PipelineError.
+        """
+        stop = threading.Event()
+        queues = [queue.Queue(self.queue_size) for _ in range(len(self.stages) + 1)]
+
+        def put(q: queue.Queue, item: Any) -> bool:
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def feed():
+            try:
+                for record in records:
+                    if not put(queues[0], record):
+                        return
+            except Exception as e:
+                put(queues[0], _Failure("<input>", e))
+            put(queues[0], _DONE)
+
+        def stage(i: int):
+            src, dst = queues[i], queues[i + 1]
+            while not stop.is_set():
+                try:
+                    item = src.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is not _DONE and not isinstance(item, _Failure):
+                    try:
+                        item = self._call(i, item)
+                    except Exception as e:
+                        item = _Failure(self.stages[i], e)
+                if not put(dst, item) or item is _DONE:
+                    return
+
+        threads = [threading.Thread(target=feed, name="monacode-pipe-input", daemon=True)]
+        threads += [threading.Thread(target=stage, args=(i,), name=f"monacode-pipe-{name}",
+                                     daemon=True)
+                    for i, name in enumerate(self.stages)]
+        for t in threads:
+            t.start()
+        try:
+            while True:
+                item = queues[-1].get()
+                if item is _DONE:
+                    return
+                if isinstance(item, _Failure):
+                    raise PipelineError(
+                        f"Stage '{item.stage}' failed: {type(item.exc).__name__}: {item.exc}"
+                    ) from item.exc
+                yield item
+        finally:
+            stop.set()
+            # the input thread may be blocked reading its source; it is a
+            # daemon and exits at its next put()
+            for t in threads[1:]:
+                t.join()
+
+    def timings(self) -> List[Dict[str, Any]]:
+        return [st.as_dict() for st in self.stats]
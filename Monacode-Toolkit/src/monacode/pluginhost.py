@@ -0,0 +1,168 @@
+import os
+import sys
+import json
+import socket
+import threading
+import socketserver
+from pathlib import Path
+from typing import Any, Dict, IO, Optional
+
+
+SOCKET_NAME = "host.sock"
+
+# JSON-RPC 2.0 error codes
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+PLUGIN_ERROR = -32000
+
+
+class HostError(Exception):
+    pass
+
+
+def default_socket(plugins_dir: Optional[str] = None) -> Path:
+    """
+    Host socket path; MONACODE_PLUGIN_HOST overrides the default
+    `<plugins_dir>/host.sock`.
+    """
+    override = os.environ.get("MONACODE_PLUGIN_HOST")
+    if override:
+        return Path(override)
+    return Path(plugins_dir or (Path.home() / ".monacode" / "plugins")) / SOCKET_NAME
+
+
+class PluginHost:
+    """
+    Long-lived plugin runner. Plugin modules stay loaded between requests
+    and are re-executed only when their code changes (PluginManager tracks
+    the code hash). Speaks newline-delimited JSON-RPC 2.0:
+
+      {"jsonrpc": "2.0", "id": 1, "method": "run", "params": {"name": "x", "data": {...}}}
+
+    Methods: `run`, `list`, `ping`.
+    """
+
+    def __init__(self, plugins_dir: Optional[str] = None):
+        from .git import PluginManager
+
+        self.pm = PluginManager(plugins_dir)
+        self._load_lock = threading.Lock()
+
+    def handle(self, request: Any) -> Dict[str, Any]:
+        if not isinstance(request, dict):
+            # batches are not supported; scalars are not requests
+            return _error(None, INVALID_REQUEST, "Invalid Request: expected a JSON object")
+        rid = request.get("id")
+        method = request.get("method")
+        params = request.get("params") or {}
+        if not isinstance(params, dict):
+            return _error(rid, INVALID_PARAMS, "params must be an object")
+        try:
+            if method == "run":
+                if "name" not in params:
+                    return _error(rid, INVALID_PARAMS, "params.name is required")
+                with self._load_lock:
+                    run = self.pm.runner(params["name"])
+                result = run(params.get("data", {}))
+            elif method == "list":
+                result = self.pm.registry()
+            elif method == "ping":
+                result = {"pid": os.getpid()}
+            else:
+                return _error(rid, METHOD_NOT_FOUND, f"Unknown method: {method}")
+        except Exception as e:
+            return _error(rid, PLUGIN_ERROR, f"{type(e).__name__}: {e}")
+        return {"jsonrpc": "2.0", "id": rid, "result": result}
+
+    def handle_line(self, line: bytes) -> bytes:
+        """
+        Reply to one request line. Never raises, so a bad line cannot end
+        serve_stdio() or a socket connection.
+        """
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            reply = _error(None, PARSE_ERROR, str(e))
+        else:
+            try:
+                reply = self.handle(request)
+                return json.dumps(reply, default=str).encode("utf-8") + b"\n"
+            except Exception as e:
+                rid = request.get("id") if isinstance(request, dict) else None
+                reply = _error(rid, INTERNAL_ERROR, f"{type(e).__name__}: {e}")
+        return json.dumps(reply).encode("utf-8") + b"\n"
+
+    def serve_stdio(self, stdin: IO[bytes] = None, stdout: IO[bytes] = None) -> None:
+        """
+        Serve requests from stdin until EOF. Anything plugins print is sent
+        to stderr so it cannot corrupt the protocol stream.
+        """
+        stdin = stdin or sys.stdin.buffer
+        stdout = stdout or sys.stdout.buffer
+        sys.stdout = sys.stderr
+        for line in stdin:
+            if line.strip():
+                stdout.write(self.handle_line(line))
+                stdout.flush()
+
+    def serve_socket(self, path: Path) -> None:
+        """
+        Serve requests on a 0600 Unix socket; each connection may send any
+        number of requests.
+        """
+        host = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if line.strip():
+                        self.wfile.write(host.handle_line(line))
+                        self.wfile.flush()
+
+        if path.exists():
+            path.unlink()
+        old = os.umask(0o177)
+        try:
+            server = socketserver.ThreadingUnixStreamServer(str(path), Handler)
+        finally:
+            os.umask(old)
+        server.daemon_threads = True
+        try:
+            server.serve_forever()
+        finally:
+            server.server_close()
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _error(rid: Any, code: int, message: str) -> Dict[str, Any]:
+    return {"jsonrpc": "2.0", "id": rid, "error": {"code": code, "message": message}}
+
+
+def call(method: str, params: Dict[str, Any], path: Path, timeout: float = 30.0) -> Any:
+    """
+    One JSON-RPC call to a running host; raises HostError on failure.
+    """
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(timeout)
+            conn.connect(str(path))
+            conn.sendall(json.dumps({"jsonrpc": "2.0", "id": 1, "method": method,
+                                     "params": params}).encode("utf-8") + b"\n")
+            line = conn.makefile("rb").readline()
+    except OSError as e:
+        raise HostError(f"Plugin host not reachable at {path}: {e}") from e
+    if not line:
+        raise HostError(f"Plugin host at {path} closed the connection without replying.")
+    try:
+        reply = json.loads(line)
+    except ValueError as e:
+        raise HostError(f"Invalid reply from plugin host at {path}: {e}") from e
+    if "error" in reply:
+        raise HostError(reply["error"]["message"])
+    return reply["result"]
@@ -0,0 +1,272 @@
+import time
+import random
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, Optional
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `per_minute` tokens per minute.
+    `reserve()` takes tokens immediately (the balance may go negative) and
+    returns how long the caller must wait before using them, so the same
+    bucket serves threads and coroutines alike.
+    """
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst or per_minute)
+        self.tokens = self.capacity
+        self.stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, n: float = 1.0) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            self.tokens -= min(n, self.capacity)
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD concurrency limit: grows by roughly one slot per `limit`
+    successful calls, halves on a throttling response (429/5xx).
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(self.max_limit)
+        self.inflight = 0
+        self._cond = threading.Condition()
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self.inflight < int(self.limit):
+                self.inflight += 1
+                return True
+            return False
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.inflight >= int(self.limit):
+                self._cond.wait()
+            self.inflight += 1
+
+    async def aacquire(self) -> None:
+        delay = 0.005
+        while not self.try_acquire():
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+
+    def release(self, throttled: bool = False, success: bool = True) -> None:
+        with self._cond:
+            self.inflight -= 1
+            if throttled:
+                self.limit = max(float(self.min_limit), self.limit / 2)
+            elif success:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+def status_of(exc: BaseException) -> Optional[int]:
+    """
+    Best-effort HTTP status from an SDK exception.
+    """
+    for attr in ("status_code", "http_status", "status", "code"):
+        val = getattr(exc, attr, None)
+        if isinstance(val, int):
+            return val
+    resp = getattr(exc, "response", None)
+    val = getattr(resp, "status_code", None)
+    return val if isinstance(val, int) else None
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """
+    Seconds requested by a Retry-After header on the exception, if any.
+    """
+    headers = getattr(exc, "headers", None) or getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class EngineLimiter:
+    """
+    Per-engine request (RPM) and token (TPM) buckets, AIMD concurrency and
+    jittered exponential backoff on 429/5xx, honoring Retry-After.
+    A limit of 0 disables that bucket.
+    """
+
+    def __init__(self,
+                 rpm: float = 0,
+                 tpm: float = 0,
+                 max_concurrency: int = 16,
+                 max_retries: int = 5,
+                 backoff_base: float = 0.5,
+                 backoff_max: float = 30.0):
+        self.rpm = TokenBucket(rpm) if rpm else None
+        self.tpm = TokenBucket(tpm) if tpm else None
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "EngineLimiter":
+        return cls(
+            rpm=float(settings.get("rpm", 0)),
+            tpm=float(settings.get("tpm", 0)),
+            max_concurrency=int(settings.get("max_concurrency", 16)),
+            max_retries=int(settings.get("max_retries", 5)),
+            backoff_base=float(settings.get("backoff_base", 0.5)),
+            backoff_max=float(settings.get("backoff_max", 30.0)),
+        )
+
+    def _wait(self, tokens: int) -> float:
+        wait = self.rpm.reserve(1) if self.rpm else 0.0
+        if self.tpm:
+            wait = max(wait, self.tpm.reserve(tokens))
+        return wait
+
+    def _retry_delay(self, exc: BaseException, attempt: int) -> Optional[float]:
+        """
+        Backoff before the next attempt, or None if `exc` is not retryable.
+        """
+        status = status_of(exc)
+        if status is None or not (status == 429 or status >= 500) or attempt >= self.max_retries:
+            return None
+        requested = retry_after(exc)
+        if requested is not None:
+            return requested + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def call(self, fn: Callable[[], Any], tokens: int = 0) -> Any:
+        attempt = 0
+        while True:
+            time.sleep(self._wait(tokens))
+            self.concurrency.acquire()
+            # the slot is released on every exit, including KeyboardInterrupt
+            ok = throttled = False
+            try:
+                result = fn()
+                ok = True
+                return result
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                throttled = delay is not None
+                if delay is None:
+                    raise
+            finally:
+                self.concurrency.release(throttled=throttled, success=ok)
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(self, fn: Callable[[], Awaitable[Any]], tokens: int = 0) -> Any:
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._wait(tokens))
+            await self.concurrency.aacquire()
+            # the slot is released on every exit, including cancellation
+            ok = throttled = False
+            try:
+                result = await fn()
+                ok = True
+                return result
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                throttled = delay is not None
+                if delay is None:
+                    raise
+            finally:
+                self.concurrency.release(throttled=throttled, success=ok)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def iterate(self, make: Callable[[], Iterator[Any]], tokens: int = 0) -> Iterator[Any]:
+        """
+        Rate-limited stream; retried only if it fails before the first
+        chunk. Holds a concurrency slot until the stream is exhausted or
+        closed.
+        """
+        attempt = 0
+        while True:
+            time.sleep(self._wait(tokens))
+            self.concurrency.acquire()
+            held = ok = throttled = False
+            try:
+                it = make()
+                first = next(it)
+                held = True
+            except StopIteration:
+                ok = True
+                return
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                throttled = delay is not None
+                if delay is None:
+                    raise
+            finally:
+                if not held:
+                    self.concurrency.release(throttled=throttled, success=ok)
+            if held:
+                break
+            time.sleep(delay)
+            attempt += 1
+        ok = False
+        try:
+            yield first
+            yield from it
+            ok = True
+        finally:
+            self.concurrency.release(success=ok)
+
+    async def aiterate(self, make: Callable[[], AsyncIterator[Any]], tokens: int = 0) -> AsyncIterator[Any]:
+        attempt = 0
+        while True:
+            await asyncio.sleep(self._wait(tokens))
+            await self.concurrency.aacquire()
+            held = ok = throttled = False
+            try:
+                it = make()
+                first = await it.__anext__()
+                held = True
+            except StopAsyncIteration:
+                ok = True
+                return
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                throttled = delay is not None
+                if delay is None:
+                    raise
+            finally:
+                if not held:
+                    self.concurrency.release(throttled=throttled, success=ok)
+            if held:
+                break
+            await asyncio.sleep(delay)
+            attempt += 1
+        ok = False
+        try:
+            yield first
+            async for chunk in it:
+                yield chunk
+            ok = True
+        finally:
+            self.concurrency.release(success=ok)
@@ -0,0 +1,185 @@
+import os
+import stat
+import json
+import errno
+import shutil
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore
+
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# Errors meaning "this filesystem pair cannot reflink", not "this file failed"
+_NO_REFLINK = {errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY, errno.ENOSYS}
+
+# (source device, destination device) -> whether FICLONE works between them
+_REFLINK_SUPPORT: Dict[Tuple[int, int], bool] = {}
+
+
+def reflink(src: str, dst: str) -> bool:
+    """
+    Create `dst` as a copy-on-write clone of `src` (FICLONE). Returns False,
+    leaving no `dst` behind, if the filesystem cannot share extents.
+    """
+    if fcntl is None:
+        return False
+    with open(src, "rb") as fsrc:
+        fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            fcntl.ioctl(fd, FICLONE, fsrc.fileno())
+        except OSError as e:
+            os.close(fd)
+            os.unlink(dst)
+            if e.errno in _NO_REFLINK:
+                return False
+            raise
+        os.close(fd)
+    return True
+
+
+def _sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class TemplateIndex:
+    """
+    Manifest of a template directory: every directory, file and symlink
+    with its mode, size, mtime and (for files) sha256. The manifest is kept
+    in ~/.monacode/cache/templates and refreshed by a stat-only walk, so a
+    file is re-hashed only when its size or mtime changes.
+
+    `instantiate()` materializes the template with the cheapest mechanism
+    available per file: a reflink (copy-on-write clone), then a hardlink
+    for read-only files, then a regular copy.
+    """
+
+    VERSION = 1
+
+    def __init__(self, root: Path, entries: List[Dict[str, Any]]):
+        self.root = root
+        self.entries = entries
+
+    @classmethod
+    def cache_path(cls, root: Path) -> Path:
+        key = hashlib.sha256(str(root).encode("utf-8")).hexdigest()[:16]
+        return Path.home() / ".monacode" / "cache" / "templates" / f"{root.name}-{key}.json"
+
+    @classmethod
+    def load(cls, template: str) -> "TemplateIndex":
+        root = Path(template).resolve()
+        if not root.is_dir():
+            raise FileNotFoundError(f"Template directory '{template}' not found.")
+        cache = cls.cache_path(root)
+        previous: Dict[str, Dict[str, Any]] = {}
+        try:
+            data = json.loads(cache.read_text())
+            if data.get("version") == cls.VERSION:
+                previous = {e["path"]: e for e in data["entries"]}
+        except (OSError, ValueError, KeyError):
+            pass
+
+        entries = cls._scan(root, previous)
+        if entries != list(previous.values()):
+            cache.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=str(cache.parent), prefix=".tmp-")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"version": cls.VERSION, "root": str(root), "entries": entries}, f)
+            os.replace(tmp, str(cache))
+        return cls(root, entries)
+
+    @staticmethod
+    def _scan(root: Path, previous: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        entries: List[Dict[str, Any]] = []
+        stack = [""]
+        while stack:
+            rel_dir = stack.pop()
+            with os.scandir(os.path.join(str(root), rel_dir)) as it:
+                items = sorted(it, key=lambda d: d.name)
+            for item in items:
+                rel = os.path.join(rel_dir, item.name) if rel_dir else item.name
+                st = item.stat(follow_symlinks=False)
+                entry: Dict[str, Any] = {"path": rel, "mode": stat.S_IMODE(st.st_mode)}
+                if item.is_symlink():
+                    entry.update(type="symlink", target=os.readlink(item.path))
+                elif item.is_dir(follow_symlinks=False):
+                    entry["type"] = "dir"
+                    stack.append(rel)
+                else:
+                    entry.update(type="file", size=st.st_size, mtime_ns=st.st_mtime_ns)
+                    old = previous.get(rel)
+                    if (old and old.get("size") == st.st_size
+                            and old.get("mtime_ns") == st.st_mtime_ns and old.get("sha256")):
+                        entry["sha256"] = old["sha256"]
+                    else:
+                        entry["sha256"] = _sha256(item.path)
+                entries.append(entry)
+        return entries
+
+    def digest(self) -> str:
+        """
+        Content hash of the whole template (paths, modes and file hashes).
+        """
+        h = hashlib.sha256()
+        for e in sorted(self.entries, key=lambda e: e["path"]):
+            h.update(json.dumps([e["path"], e["type"], e["mode"], e.get("sha256"),
+                                 e.get("target")]).encode("utf-8"))
+        return h.hexdigest()
+
+    def instantiate(self, dest: Path) -> Dict[str, int]:
+        """
+        Materialize the template under `dest` (which may already exist);
+        returns how many files were reflinked, hardlinked and copied.
+        """
+        counts = {"reflink": 0, "hardlink": 0, "copy": 0, "symlink": 0}
+        dest.mkdir(parents=True, exist_ok=True)
+        pair = (os.stat(str(self.root)).st_dev, os.stat(str(dest)).st_dev)
+        dirs = []
+        for e in self.entries:
+            target = os.path.join(str(dest), e["path"])
+            if e["type"] == "dir":
+                os.makedirs(target, exist_ok=True)
+                dirs.append((target, e["mode"]))
+            elif e["type"] == "symlink":
+                if os.path.lexists(target):
+                    os.unlink(target)
+                os.symlink(e["target"], target)
+                counts["symlink"] += 1
+            else:
+                counts[self._place(os.path.join(str(self.root), e["path"]), target, e, pair)] += 1
+        # apply directory modes last so read-only directories can be filled
+        for target, mode in reversed(dirs):
+            os.chmod(target, mode)
+        return counts
+
+    @staticmethod
+    def _place(src: str, dst: str, entry: Dict[str, Any], pair: Tuple[int, int]) -> str:
+        if os.path.lexists(dst):
+            os.unlink(dst)
+        if _REFLINK_SUPPORT.get(pair, True):
+            ok = reflink(src, dst)
+            _REFLINK_SUPPORT[pair] = ok
+            if ok:
+                os.chmod(dst, entry["mode"])
+                os.utime(dst, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+                return "reflink"
+        # sharing an inode is only safe when nobody is expected to write to it
+        if not entry["mode"] & 0o222 and pair[0] == pair[1]:
+            try:
+                os.link(src, dst)
+                return "hardlink"
+            except OSError:
+                pass
+        shutil.copy2(src, dst, follow_symlinks=False)
+        return "copy"
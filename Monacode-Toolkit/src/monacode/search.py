@@ -0,0 +1,433 @@
+import os
+import re
+import json
+import mmap
+import time
+import struct
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    import re._parser as sre_parse  # Python 3.11+
+    from re._constants import LITERAL, SUBPATTERN
+except ImportError:  # pragma: no cover - older interpreters
+    import sre_parse  # type: ignore
+    from sre_constants import LITERAL, SUBPATTERN  # type: ignore
+
+from .git import GitManager
+from .utils import _atomic_write, _file_lock
+
+
+MAGIC = b"MCTI"
+# magic, version, docs, trigrams, docs offset, table offset, postings offset
+_HEADER = struct.Struct("<4sIIIQQQ")
+# trigram, postings offset, postings count
+_ENTRY = struct.Struct("<IQI")
+_OFFSET = struct.Struct("<Q")
+
+
+class SearchError(Exception):
+    pass
+
+
+def _trigrams(data: bytes) -> Set[bytes]:
+    # byte slices are cheaper to hash than ints; segments convert them once
+    data = data.lower()
+    return {data[i:i + 3] for i in range(len(data) - 2)}
+
+
+def _read_source(path: str, max_bytes: int) -> Optional[bytes]:
+    """
+    File contents, or None if missing, too large or binary-looking.
+    """
+    try:
+        if not os.path.isfile(path) or os.path.getsize(path) > max_bytes:
+            return None
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if b"\0" in data[:8192]:
+        return None
+    return data
+
+
+def _build_segment(seg_path: str, top: str, rels: List[str], max_bytes: int) -> int:
+    """
+    Index `rels` (sorted) into one segment file; returns the number of
+    documents written. Runs in pool workers during full builds.
+    """
+    docs = []
+    for rel in rels:
+        data = _read_source(os.path.join(top, rel), max_bytes)
+        if data is not None:
+            docs.append((rel, _trigrams(data)))
+    if docs:
+        Segment.write(Path(seg_path), docs)
+    return len(docs)
+
+
+def _query_trigrams(literals: Iterable[str], ignore_case: bool) -> Set[int]:
+    tris: Set[int] = set()
+    for lit in literals:
+        raw = lit.encode("utf-8")
+        if ignore_case and not raw.isascii():
+            continue  # the index only folds ASCII case
+        tris.update(int.from_bytes(t, "big") for t in _trigrams(raw))
+    return tris
+
+
+def required_literals(pattern: str, ignore_case: bool = False) -> List[str]:
+    """
+    Literal runs every match of `pattern` must contain: maximal sequences
+    of plain characters at the top level (or inside plain groups). Anything
+    optional, repeated or alternated ends a run, so the result is always a
+    safe filter, never a requirement the regex does not have.
+
+    Runs matched case-insensitively (`ignore_case`, an inline `(?i)` or a
+    `(?i:...)` group) are dropped unless ASCII: the index folds only ASCII
+    case.
+    """
+    runs: List[str] = []
+
+    def walk(seq: Any, icase: bool) -> None:
+        run: List[str] = []
+
+        def flush() -> None:
+            text = "".join(run)
+            if not (icase and not text.isascii()):
+                runs.append(text)
+            run.clear()
+
+        for op, arg in seq:
+            if op is LITERAL:
+                run.append(chr(arg))
+                continue
+            if run:
+                flush()
+            if op is SUBPATTERN:
+                walk(arg[-1], icase or bool(arg[1] & re.I))
+        if run:
+            flush()
+
+    try:
+        parsed = sre_parse.parse(pattern)
+        state = getattr(parsed, "state", None) or parsed.pattern
+        walk(parsed, ignore_case or bool(state.flags & re.I))
+    except Exception:
+        return []
+    return [r for r in runs if len(r) >= 3]
+
+
+class Segment:
+    """
+    One immutable, memory-mapped index file: the sorted paths it covers and
+    a sorted trigram table pointing into uint32 posting lists. Nothing is
+    read into memory beyond the pages a query touches.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fh = open(str(path), "rb")
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.ndocs, self.ntri, self.docs_off, self.tri_off, self.post_off = \
+            _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != 1:
+            raise SearchError(f"Corrupt index segment {path}")
+        self._blob = self.docs_off + _OFFSET.size * (self.ndocs + 1)
+
+    @staticmethod
+    def write(path: Path, docs: List[Tuple[str, Set[bytes]]]) -> None:
+        """
+        Write a segment for (path, trigrams) pairs; paths must be sorted.
+        """
+        by_tri: Dict[bytes, List[int]] = {}
+        for doc_id, (_, tris) in enumerate(docs):
+            for t in tris:
+                lst = by_tri.get(t)
+                if lst is None:
+                    by_tri[t] = lst = []
+                lst.append(doc_id)
+        postings = {int.from_bytes(t, "big"): array("I", lst) for t, lst in by_tri.items()}
+        del by_tri
+
+        blob = bytearray()
+        offsets = array("Q")
+        for name, _ in docs:
+            offsets.append(len(blob))
+            blob += name.encode("utf-8", "surrogateescape")
+        offsets.append(len(blob))
+
+        docs_off = _HEADER.size
+        tri_off = docs_off + len(offsets) * 8 + len(blob)
+        tri_off += -tri_off % 8
+        post_off = tri_off + len(postings) * _ENTRY.size
+
+        table = bytearray()
+        body = bytearray()
+        for t in sorted(postings):
+            lst = postings[t]
+            table += _ENTRY.pack(t, post_off + len(body), len(lst))
+            body += lst.tobytes()
+
+        tmp = path.with_suffix(".tmp")
+        with open(str(tmp), "wb") as f:
+            f.write(_HEADER.pack(MAGIC, 1, len(docs), len(postings), docs_off, tri_off, post_off))
+            f.write(offsets.tobytes())
+            f.write(blob)
+            f.write(b"\0" * (tri_off - docs_off - len(offsets) * 8 - len(blob)))
+            f.write(table)
+            f.write(body)
+        os.replace(str(tmp), str(path))
+
+    def doc_path(self, doc: int) -> str:
+        start, = _OFFSET.unpack_from(self._mm, self.docs_off + doc * 8)
+        end, = _OFFSET.unpack_from(self._mm, self.docs_off + doc * 8 + 8)
+        return self._mm[self._blob + start:self._blob + end].decode("utf-8", "surrogateescape")
+
+    def find(self, path: str) -> Optional[int]:
+        """
+        Doc id of `path` (binary search over the sorted path table).
+        """
+        lo, hi = 0, self.ndocs
+        while lo < hi:
+            mid = (lo + hi) // 2
+            name = self.doc_path(mid)
+            if name < path:
+                lo = mid + 1
+            elif name > path:
+                hi = mid
+            else:
+                return mid
+        return None
+
+    def postings(self, tri: int) -> memoryview:
+        lo, hi = 0, self.ntri
+        while lo < hi:
+            mid = (lo + hi) // 2
+            t, off, count = _ENTRY.unpack_from(self._mm, self.tri_off + mid * _ENTRY.size)
+            if t < tri:
+                lo = mid + 1
+            elif t > tri:
+                hi = mid
+            else:
+                return memoryview(self._mm)[off:off + count * 4].cast("I")
+        return memoryview(b"").cast("I")
+
+    def candidates(self, tris: Set[int]) -> Iterable[int]:
+        """
+        Doc ids containing every trigram in `tris` (all docs if empty).
+        """
+        if not tris:
+            return range(self.ndocs)
+        lists = sorted((self.postings(t) for t in tris), key=len)
+        result = set(lists[0])
+        for lst in lists[1:]:
+            if not result:
+                break
+            result.intersection_update(lst)
+        return sorted(result)
+
+    def close(self) -> None:
+        self._mm.close()
+        self._fh.close()
+
+
+class CodeIndex:
+    """
+    Persistent trigram index of a repository's files, stored in
+    `.git/monacode-index` as immutable memory-mapped segments plus a
+    manifest with per-segment tombstones.
+
+    `update()` re-indexes only paths that changed since the last run,
+    according to git: `git diff` against the last indexed commit, the
+    current `git status`, and files that were dirty last time. Changed
+    files go into a new segment; when segments or tombstones pile up the
+    index is rebuilt. Files that look binary or exceed MAX_FILE_BYTES are
+    not indexed.
+    """
+
+    MAX_FILE_BYTES = 1 << 20
+    SEGMENT_DOCS = 5000
+    MAX_SEGMENTS = 12
+    MAX_DELETED_RATIO = 0.25
+
+    def __init__(self, repo_path: Optional[str] = None):
+        self.gm = GitManager(repo_path)
+        self.top = self.gm.toplevel()
+        self.dir = self.gm.git_dir() / "monacode-index"
+        self.manifest_path = self.dir / "manifest.json"
+        self._segments: Dict[str, Segment] = {}
+
+    def _load_manifest(self) -> Optional[Dict[str, Any]]:
+        try:
+            data = json.loads(self.manifest_path.read_text())
+        except (OSError, ValueError):
+            return None
+        return data if data.get("version") == 1 else None
+
+    def _read(self, rel: str) -> Optional[bytes]:
+        return _read_source(str(self.top / rel), self.MAX_FILE_BYTES)
+
+    def _write_segments(self, paths: Iterable[str], manifest: Dict[str, Any],
+                        base: bool = False) -> int:
+        """
+        Index `paths` into new segments of up to SEGMENT_DOCS files. A full
+        build (`base`) spreads segments over a process pool.
+        """
+        rels = sorted(set(paths))
+        chunks = [rels[i:i + self.SEGMENT_DOCS] for i in range(0, len(rels), self.SEGMENT_DOCS)]
+        jobs = []
+        for chunk in chunks:
+            seg_id = f"seg-{manifest['next_id']:06d}"
+            manifest["next_id"] += 1
+            jobs.append((seg_id, chunk))
+
+        args = [(str(self.dir / f"{seg_id}.idx"), str(self.top), chunk, self.MAX_FILE_BYTES)
+                for seg_id, chunk in jobs]
+        workers = min(len(jobs), os.cpu_count() or 1)
+        if base and workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                counts = list(pool.map(_build_segment, *zip(*args)))
+        else:
+            counts = [_build_segment(*a) for a in args]
+
+        for (seg_id, _), n in zip(jobs, counts):
+            if n:
+                manifest["segments"].append({"id": seg_id, "docs": n, "deleted": [], "base": base})
+        return sum(counts)
+
+    def update(self, rebuild: bool = False) -> Dict[str, Any]:
+        """
+        Bring the index up to date; returns what was done.
+        """
+        start = time.perf_counter()
+        self.dir.mkdir(parents=True, exist_ok=True)
+        with _file_lock(self.dir / ".lock"):
+            manifest = None if rebuild else self._load_manifest()
+            head = self.gm.head(str(self.top))
+            _, dirty = self.gm.changed_paths(str(self.top))
+            mode = "incremental"
+            changed: Set[str] = set()
+            if manifest is not None:
+                changed = set(manifest["dirty"]) | set(dirty)
+                if manifest["commit"] != head:
+                    try:
+                        if manifest["commit"] and head:
+                            changed |= set(self.gm.diff_paths(str(self.top), manifest["commit"], head))
+                        else:
+                            manifest = None
+                    except Exception:
+                        manifest = None  # last indexed commit is gone (rebased away, gc'd)
+
+            if manifest is not None:
+                for seg in manifest["segments"]:
+                    reader = self._segment(seg["id"])
+                    deleted = set(seg["deleted"])
+                    for rel in changed:
+                        doc = reader.find(rel)
+                        if doc is not None:
+                            deleted.add(doc)
+                    seg["deleted"] = sorted(deleted)
+                indexed = self._write_segments(changed, manifest)
+                total = sum(s["docs"] for s in manifest["segments"])
+                dead = sum(len(s["deleted"]) for s in manifest["segments"])
+                extra = sum(1 for s in manifest["segments"] if not s.get("base"))
+                if extra > self.MAX_SEGMENTS or dead > total * self.MAX_DELETED_RATIO:
+                    manifest = None
+
+            if manifest is None:
+                mode = "full"
+                manifest = {"version": 1, "segments": [], "next_id": 0}
+                old = self._load_manifest()
+                if old:
+                    manifest["next_id"] = old["next_id"]
+                indexed = self._write_segments(self.gm.list_files(str(self.top)), manifest,
+                                               base=True)
+
+            manifest["commit"] = head
+            manifest["dirty"] = sorted(dirty)
+            _atomic_write(self.manifest_path, json.dumps(manifest).encode("utf-8"))
+            self._prune(manifest)
+        return {"mode": mode, "indexed": indexed, "segments": len(manifest["segments"]),
+                "files": sum(s["docs"] - len(s["deleted"]) for s in manifest["segments"]),
+                "seconds": time.perf_counter() - start}
+
+    def _prune(self, manifest: Dict[str, Any]) -> None:
+        live = {f"{s['id']}.idx" for s in manifest["segments"]}
+        for path in self.dir.glob("seg-*.idx"):
+            if path.name not in live:
+                seg = self._segments.pop(path.stem, None)
+                if seg:
+                    seg.close()
+                path.unlink()
+
+    def _segment(self, seg_id: str) -> Segment:
+        seg = self._segments.get(seg_id)
+        if seg is None:
+            seg = self._segments[seg_id] = Segment(self.dir / f"{seg_id}.idx")
+        return seg
+
+    def search(self,
+               pattern: str,
+               regex: bool = False,
+               ignore_case: bool = False,
+               files_only: bool = False,
+               limit: int = 0) -> Iterator[Tuple[str, int, str]]:
+        """
+        Yield (path, line number, line) for each matching line, or
+        (path, 0, "") per matching file with `files_only`. Candidates come
+        from the trigram index; each is confirmed against the file on disk.
+        """
+        rx = re.compile(pattern if regex else re.escape(pattern), re.I if ignore_case else 0)
+        tris = _query_trigrams(required_literals(pattern, ignore_case) if regex else [pattern],
+                               ignore_case)
+        # map the manifest's segments under a shared lock: once mapped they
+        # stay readable even if a concurrent update() prunes their files
+        manifest = None
+        if self.dir.is_dir():
+            with _file_lock(self.dir / ".lock", shared=True):
+                manifest = self._load_manifest()
+                if manifest is not None:
+                    readers = [self._segment(seg["id"]) for seg in manifest["segments"]]
+        if manifest is None:
+            raise SearchError(f"No index for {self.top}; run `monacode index` first.")
+
+        found = 0
+        for seg, reader in zip(manifest["segments"], readers):
+            deleted = set(seg["deleted"])
+            for doc in reader.candidates(tris):
+                if doc in deleted:
+                    continue
+                rel = reader.doc_path(doc)
+                data = self._read(rel)
+                if data is None:
+                    continue
+                text = data.decode("utf-8", "replace")
+                for line_no, line in _matching_lines(rx, text):
+                    yield rel, (0 if files_only else line_no), ("" if files_only else line)
+                    found += 1
+                    if limit and found >= limit:
+                        return
+                    if files_only:
+                        break
+
+    def close(self) -> None:
+        for seg in self._segments.values():
+            seg.close()
+        self._segments.clear()
+
+
+def _matching_lines(rx: "re.Pattern", text: str) -> Iterator[Tuple[int, str]]:
+    line_no, pos, last_line = 1, 0, 0
+    for m in rx.finditer(text):
+        line_no += text.count("\n", pos, m.start())
+        pos = m.start()
+        if line_no == last_line:
+            continue
+        last_line = line_no
+        start = text.rfind("\n", 0, m.start()) + 1
+        end = text.find("\n", m.start())
+        yield line_no, text[start:end if end != -1 else len(text)]
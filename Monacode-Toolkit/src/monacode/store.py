@@ -0,0 +1,206 @@
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key   TEXT PRIMARY KEY,
+    ts    REAL NOT NULL,
+    atime REAL NOT NULL,
+    size  INTEGER NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_atime ON entries (atime);
+CREATE INDEX IF NOT EXISTS entries_ts ON entries (ts);
+CREATE TABLE IF NOT EXISTS stats (
+    id      INTEGER PRIMARY KEY CHECK (id = 0),
+    entries INTEGER NOT NULL,
+    bytes   INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO stats (id, entries, bytes) VALUES (0, 0, 0);
+CREATE TRIGGER IF NOT EXISTS entries_ins AFTER INSERT ON entries BEGIN
+    UPDATE stats SET entries = entries + 1, bytes = bytes + new.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_del AFTER DELETE ON entries BEGIN
+    UPDATE stats SET entries = entries - 1, bytes = bytes - old.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_upd AFTER UPDATE OF size ON entries BEGIN
+    UPDATE stats SET bytes = bytes - old.size + new.size WHERE id = 0;
+END;
+"""
+
+
+class LRUStore:
+    """
+    Indexed on-disk key/value store backed by SQLite in WAL mode.
+    Values are JSON-serialized. Lookups and writes touch a single row;
+    entry count and byte totals are maintained by triggers so eviction
+    never needs a table scan.
+
+    Eviction is least-recently-used, bounded by `max_entries` and
+    `max_bytes` (0 disables a bound). With a `ttl` (None means entries
+    never expire), expired rows are dropped on read and compacted
+    periodically by a background thread, stopped by `close()`.
+    """
+
+    def __init__(self,
+                 path: Path,
+                 ttl: Optional[float] = None,
+                 max_entries: int = 0,
+                 max_bytes: int = 0,
+                 compact_interval: float = 300.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+        self._compactor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        if ttl is not None and compact_interval > 0:
+            self._start_compactor(compact_interval)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False,
+                               isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _expired(self, ts: float, now: float) -> bool:
+        return self.ttl is not None and now - ts > self.ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return the stored value, or None if missing or expired.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ts, value FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if self._expired(row[0], now):
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE entries SET atime = ? WHERE key = ?", (now, key))
+        return json.loads(row[1])
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Insert or replace a single entry, then evict if over budget.
+        """
+        now = time.time()
+        raw = json.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO entries (key, ts, atime, size, value) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET ts = excluded.ts, atime = excluded.atime, "
+                "size = excluded.size, value = excluded.value",
+                (key, now, now, len(raw), raw),
+            )
+            self._evict(keep=key)
+
+    def set_many(self, items: Iterable[Tuple[str, Any, float]]) -> None:
+        """
+        Bulk insert (key, value, ts) triples in one transaction.
+        """
+        rows = []
+        for key, value, ts in items:
+            raw = json.dumps(value)
+            rows.append((key, ts, ts, len(raw), raw))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO entries (key, ts, atime, size, value) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET ts = excluded.ts, atime = excluded.atime, "
+                    "size = excluded.size, value = excluded.value",
+                    rows,
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT entries, bytes FROM stats WHERE id = 0"
+            ).fetchone()
+        return {"entries": entries, "bytes": size}
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        """
+        Drop least-recently-used rows until both budgets are met, sparing
+        `keep` (the entry just written). Caller must hold the lock.
+        """
+        if not (self.max_entries or self.max_bytes):
+            return
+        entries, size = self._conn.execute(
+            "SELECT entries, bytes FROM stats WHERE id = 0"
+        ).fetchone()
+        excess_entries = max(0, entries - self.max_entries) if self.max_entries else 0
+        excess_bytes = max(0, size - self.max_bytes) if self.max_bytes else 0
+        if not (excess_entries or excess_bytes):
+            return
+        victims = []
+        rows = self._conn.execute("SELECT key, size FROM entries ORDER BY atime")
+        for k, sz in rows:
+            if excess_entries <= 0 and excess_bytes <= 0:
+                break
+            if k == keep:
+                continue
+            victims.append((k,))
+            excess_entries -= 1
+            excess_bytes -= sz
+        rows.close()
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+
+    def compact(self) -> int:
+        """
+        Delete all expired rows; returns the number removed.
+        """
+        if self.ttl is None:
+            return 0
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM entries WHERE ts < ?", (time.time() - self.ttl,)
+            )
+            return cur.rowcount
+
+    def _start_compactor(self, interval: float) -> None:
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    self.compact()
+                except sqlite3.Error:
+                    # another process holds the write lock; retry next round
+                    pass
+
+        self._compactor = threading.Thread(target=loop, name="monacode-cache-compactor",
+                                           daemon=True)
+        self._compactor.start()
+
+    def close(self) -> None:
+        """
+        Stop the compactor thread and close the connection.
+        """
+        self._stop.set()
+        if self._compactor is not None and self._compactor is not threading.current_thread():
+            self._compactor.join()
+        with self._lock:
+            self._conn.close()
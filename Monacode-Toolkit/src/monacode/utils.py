@@ -1,20 +1,84 @@
+import io
 import os
+import copy
+import hmac
 import json
 import yaml
 import base64
 import getpass
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
-from dotenv import load_dotenv, set_key, find_dotenv
-from cryptography.fernet import Fernet
+try:
+    import fcntl
+except ImportError:  # Windows: vault writers are not serialized
+    fcntl = None  # type: ignore[assignment]
+
+from dotenv import dotenv_values
+from dotenv.parser import parse_stream
+from cryptography.fernet import Fernet, InvalidToken
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 
 
+@contextmanager
+def _file_lock(path: Path, shared: bool = False):
+    """
+    Exclusive (or `shared`) advisory lock on `path` (no-op where fcntl is
+    unavailable).
+    """
+    with open(path, "a+b") as fh:
+        if fcntl is not None:
+            fcntl.flock(fh.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    """
+    Write `data` to a sibling temp file and rename it over `path`.
+    """
+    fd, tmp = tempfile.mkstemp(dir=str(path.parent), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, str(path))
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def format_env_line(key: str, value: str) -> str:
+    """
+    Render KEY='value' the way python-dotenv's set_key quotes values.
+    """
+    return "{}='{}'".format(key, value.replace("'", "\\'"))
+
+
+# Process-wide parsed .env snapshots: path -> (mtime_ns, size, values)
+_ENV_SNAPSHOTS: Dict[str, Tuple[int, int, Dict[str, str]]] = {}
+# Values this process copied into os.environ from a .env file
+_ENV_APPLIED: Dict[str, str] = {}
+_ENV_LOCK = threading.Lock()
+
+
 class EnvManager:
     """
     Load, read, write environment variables from a .env file under ~/.monacode/.
+    The parsed file is cached per process and re-read only when its mtime
+    or size changes.
     """
 
     def __init__(self, env_filename: str = ".env"):
@@ -28,7 +92,38 @@ class EnvManager:
                 self.env_path.write_text(example.read_text())
             else:
                 self.env_path.write_text("")
-        load_dotenv(dotenv_path=self.env_path)
+        self._apply(self._snapshot())
+
+    def _snapshot(self) -> Dict[str, str]:
+        """
+        Parsed .env contents, reusing the cached parse while the file is unchanged.
+        """
+        path = str(self.env_path)
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return {}
+        with _ENV_LOCK:
+            cached = _ENV_SNAPSHOTS.get(path)
+            if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                return cached[2]
+        values = {k: v for k, v in dotenv_values(path).items() if v is not None}
+        with _ENV_LOCK:
+            _ENV_SNAPSHOTS[path] = (st.st_mtime_ns, st.st_size, values)
+        return values
+
+    @staticmethod
+    def _apply(values: Dict[str, str], override: bool = False) -> None:
+        """
+        Export values into os.environ without clobbering variables the
+        user set outside the .env file (unless `override`).
+        """
+        with _ENV_LOCK:
+            for k, v in values.items():
+                current = os.environ.get(k)
+                if override or current is None or current == _ENV_APPLIED.get(k):
+                    os.environ[k] = v
+                    _ENV_APPLIED[k] = v
 
     def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
         """
@@ -40,44 +135,214 @@ class EnvManager:
         """
         Persist an environment variable into the .env file.
         """
-        set_key(str(self.env_path), key, value)
+        self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, str]) -> None:
+        """
+        Persist several variables with a single atomic rewrite of the .env
+        file, preserving comments and the order of existing keys.
+        """
+        if not items:
+            return
+        with _file_lock(self.home / (self.env_path.name + ".lock")):
+            text = self.env_path.read_text() if self.env_path.exists() else ""
+            out = []
+            written = set()
+            for binding in parse_stream(io.StringIO(text)):
+                if binding.key in items:
+                    if binding.key not in written:
+                        original = binding.original.string
+                        # the parser folds preceding blank lines into the binding
+                        indent = len(original) - len(original.lstrip())
+                        lead = original[:original.rfind("\n", 0, indent) + 1]
+                        tail = "\n" if original.endswith("\n") else ""
+                        out.append(lead + format_env_line(binding.key, items[binding.key]) + tail)
+                        written.add(binding.key)
+                    continue
+                out.append(binding.original.string)
+            if out and not out[-1].endswith("\n"):
+                out.append("\n")
+            out.extend(format_env_line(k, v) + "\n" for k, v in items.items() if k not in written)
+            _atomic_write(self.env_path, "".join(out).encode("utf-8"))
+        self._apply(dict(items), override=True)
 
     def all(self) -> Dict[str, str]:
         """
         Return all loaded environment variables (only those in .env).
         """
-        data = {}
-        for line in self.env_path.read_text().splitlines():
-            if "=" in line and not line.startswith("#"):
-                k, v = line.split("=", 1)
-                data[k.strip()] = v.strip()
-        return data
+        return dict(self._snapshot())
+
+
+# Prefer the LibYAML C bindings when PyYAML was built with them
+_YAMLLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+_YAMLDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# Process-wide parsed config files: path -> (mtime_ns, size, data)
+_CONFIG_FILES: Dict[str, Tuple[int, int, Any]] = {}
+# Process-wide merged config: layer fingerprint -> data
+_CONFIG_MERGED: Dict[Tuple[Any, ...], Dict[str, Any]] = {}
+
+
+def _deep_merge(base: Dict[str, Any], over: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(base)
+    for k, v in over.items():
+        if isinstance(v, dict) and isinstance(out.get(k), dict):
+            out[k] = _deep_merge(out[k], v)
+        else:
+            out[k] = v
+    return out
 
 
 class ConfigLoader:
     """
-    Simple YAML config loader. Looks for config.yml under ~/.monacode/.
+    YAML config loader. Looks for config.yml under ~/.monacode/.
+
+    `load`/`save` work on that user file. `effective`/`get` merge three
+    layers, later ones winning: the system file (/etc/monacode/config.yml,
+    or MONACODE_SYSTEM_CONFIG), the user file, and the nearest project
+    `.monacode.yml` at or above the working directory.
+
+    Parsed files are cached per process and as JSON snapshots under
+    ~/.monacode/cache/config, validated by mtime/size and then content
+    hash, so warm loads skip YAML parsing entirely.
     """
 
+    SYSTEM_PATH = "/etc/monacode/config.yml"
+    PROJECT_FILE = ".monacode.yml"
+
     def __init__(self, filename: str = "config.yml"):
         self.home = Path.home() / ".monacode"
         self.filepath = self.home / filename
+        self.snapshot_dir = self.home / "cache" / "config"
 
     def load(self) -> Dict[str, Any]:
         """
         Load YAML into a dict; returns empty dict if missing.
         """
-        if not self.filepath.exists():
-            return {}
-        with open(self.filepath, "r", encoding="utf-8") as f:
-            return yaml.safe_load(f) or {}
+        return copy.deepcopy(self._read(self.filepath))
 
     def save(self, data: Dict[str, Any]) -> None:
         """
         Overwrite config file with provided dict.
         """
-        with open(self.filepath, "w", encoding="utf-8") as f:
-            yaml.safe_dump(data, f)
+        self.home.mkdir(parents=True, exist_ok=True)
+        text = yaml.dump(data, Dumper=_YAMLDumper)
+        _atomic_write(self.filepath, text.encode("utf-8"))
+        # mtime granularity may hide a same-size rewrite; drop both caches
+        _CONFIG_FILES.pop(str(self.filepath), None)
+        try:
+            self._snapshot_path(self.filepath).unlink()
+        except FileNotFoundError:
+            pass
+
+    def layers(self) -> List[Path]:
+        """
+        Config files in merge order (lowest precedence first).
+        """
+        paths = [Path(os.environ.get("MONACODE_SYSTEM_CONFIG", self.SYSTEM_PATH)), self.filepath]
+        cwd = Path.cwd()
+        for d in (cwd, *cwd.parents):
+            candidate = d / self.PROJECT_FILE
+            if candidate.is_file():
+                paths.append(candidate)
+                break
+        return paths
+
+    def effective(self) -> Dict[str, Any]:
+        """
+        Merged system < user < project config, computed once per process
+        for a given set of file versions.
+        """
+        parts = []
+        fingerprint = []
+        for path in self.layers():
+            data = self._read(path)
+            fingerprint.append((str(path), _CONFIG_FILES.get(str(path), (0, 0))[:2]))
+            parts.append(data)
+        key = tuple(fingerprint)
+        merged = _CONFIG_MERGED.get(key)
+        if merged is None:
+            merged = {}
+            for data in parts:
+                if isinstance(data, dict):
+                    merged = _deep_merge(merged, data)
+            _CONFIG_MERGED.clear()
+            _CONFIG_MERGED[key] = merged
+        return copy.deepcopy(merged)
+
+    def get(self, dotted: str, default: Any = None) -> Any:
+        """
+        Look up `a.b.c` in the effective config.
+        """
+        node: Any = self.effective()
+        for part in dotted.split("."):
+            if not isinstance(node, dict) or part not in node:
+                return default
+            node = node[part]
+        return node
+
+    def set(self, dotted: str, value: Any) -> None:
+        """
+        Set `a.b.c` in the user config file, creating mappings as needed.
+        """
+        data = self.load()
+        node = data
+        parts = dotted.split(".")
+        for part in parts[:-1]:
+            if not isinstance(node.get(part), dict):
+                node[part] = {}
+            node = node[part]
+        node[parts[-1]] = value
+        self.save(data)
+
+    def _read(self, path: Path) -> Any:
+        """
+        Parsed contents of one YAML file ({} if missing), via the process
+        cache, then the on-disk JSON snapshot, then the YAML parser.
+        """
+        try:
+            st = os.stat(str(path))
+        except OSError:
+            return {}
+        cached = _CONFIG_FILES.get(str(path))
+        if cached and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached[2]
+
+        snap_path = self._snapshot_path(path)
+        snap = None
+        try:
+            snap = json.loads(snap_path.read_text())
+        except (OSError, ValueError):
+            pass
+        if snap and (snap.get("mtime_ns"), snap.get("size")) == (st.st_mtime_ns, st.st_size):
+            data = snap["data"]
+        else:
+            raw = path.read_bytes()
+            digest = hashlib.sha256(raw).hexdigest()
+            if snap and snap.get("sha256") == digest:
+                data = snap["data"]
+            else:
+                data = yaml.load(raw, Loader=_YAMLLoader) or {}
+            self._write_snapshot(snap_path, st, digest, data)
+        _CONFIG_FILES[str(path)] = (st.st_mtime_ns, st.st_size, data)
+        return data
+
+    def _snapshot_path(self, path: Path) -> Path:
+        return self.snapshot_dir / (hashlib.sha1(str(path).encode("utf-8")).hexdigest() + ".json")
+
+    def _write_snapshot(self, snap_path: Path, st: os.stat_result, digest: str, data: Any) -> None:
+        try:
+            payload = json.dumps({"mtime_ns": st.st_mtime_ns, "size": st.st_size,
+                                  "sha256": digest, "data": data})
+        except (TypeError, ValueError):
+            return  # YAML types JSON cannot hold (dates, sets): no snapshot
+        if json.loads(payload)["data"] != data:
+            return  # JSON would coerce it (int/bool keys become strings): no snapshot
+        try:
+            snap_path.parent.mkdir(parents=True, exist_ok=True)
+            _atomic_write(snap_path, payload.encode("utf-8"))
+        except OSError:
+            pass
 
 
 class VaultError(Exception):
@@ -87,18 +352,35 @@ class VaultError(Exception):
 class VaultManager:
     """
     Encrypted secret vault using password-derived Fernet key.
-    Stores `salt.bin` and `vault.dat` under ~/.monacode/vault/.
+    Stores `salt.bin` and the v2 store under ~/.monacode/vault/:
+
+      v2/check.dat        token used to verify the password
+      v2/index.log        one encrypted line per key name (append-only)
+      v2/entries/<id>     one encrypted {"k": name, "v": value} per secret
+
+    Entry ids are keyed HMACs of the secret name, so reading or writing one
+    secret touches one file, and listing names never decrypts a value; an
+    entry whose embedded name does not match is rejected. The store is
+    created by the first write, and writers serialize on an advisory lock.
+    A v1 `vault.dat` blob is migrated on first open.
     """
 
     SALT_FILE = "salt.bin"
     DATA_FILE = "vault.dat"
+    STORE_DIR = "v2"
     ITERATIONS = 390_000
+    CHECK_PLAINTEXT = b"monacode-vault-v2"
 
     def __init__(self):
         self.home = Path.home() / ".monacode" / "vault"
         self.home.mkdir(parents=True, exist_ok=True)
         self.salt_path = self.home / self.SALT_FILE
         self.data_path = self.home / self.DATA_FILE
+        self.store_dir = self.home / self.STORE_DIR
+        self.entries_dir = self.store_dir / "entries"
+        self.check_path = self.store_dir / "check.dat"
+        self.index_path = self.store_dir / "index.log"
+        self.lock_path = self.home / ".lock"
 
     def _derive_key(self, password: bytes, salt: bytes) -> bytes:
         """
@@ -125,18 +407,97 @@ class VaultManager:
 
         return self.salt_path.read_bytes()
 
-    def _get_fernet(self, password: Optional[str] = None) -> Fernet:
+    def _get_key(self, password: Optional[str] = None) -> bytes:
         """
-        Build a Fernet instance from password; prompts if none provided.
+        Fernet key from password. Without one, use the key held by a
+        running unlock agent, and only then prompt.
         """
+        if not password:
+            from .agent import agent_key
+
+            key = agent_key(self.home)
+            if key:
+                return key
         pwd = password.encode("utf-8") if password else getpass.getpass("Vault password: ").encode("utf-8")
-        salt = self._load_salt()
-        key = self._derive_key(pwd, salt)
-        return Fernet(key)
+        return self._derive_key(pwd, self._load_salt())
+
+    def unlock(self, password: Optional[str] = None, idle_timeout: float = 900) -> int:
+        """
+        Derive the key once, verify it against the vault, and hand it to a
+        background agent for `idle_timeout` seconds. Returns the agent pid.
+        """
+        from .agent import spawn_agent
+
+        pwd = password.encode("utf-8") if password else getpass.getpass("Vault password: ").encode("utf-8")
+        key = self._derive_key(pwd, self._load_salt())
+        if not self.check_path.exists() and not self.data_path.exists():
+            raise VaultError("Vault is empty: add a secret before unlocking it.")
+        self._open(key)  # raises VaultError on a wrong password
+        return spawn_agent(key, self.home, idle_timeout)
+
+    def lock(self) -> bool:
+        """
+        Stop the unlock agent; returns False if none was running.
+        """
+        from .agent import stop_agent
+
+        return stop_agent(self.home)
+
+    def lookup(self, key: str) -> Optional[str]:
+        """
+        Non-interactive get: the secret if the vault is unlocked and has it.
+        """
+        from .agent import agent_key
+
+        fkey = agent_key(self.home)
+        if fkey is None:
+            return None
+        try:
+            fernet, id_key = self._open(fkey)
+            return self._read_entry(fernet, id_key, key)
+        except VaultError:
+            return None
+
+    def _open(self, key: bytes, create: bool = False) -> Tuple[Fernet, bytes]:
+        """
+        Verify `key` against the store and return the Fernet plus the HMAC
+        key used for entry ids. A v1 vault is migrated; an empty store is
+        created only when `create` is set (write paths), so reads of a
+        missing vault find nothing instead of fixing its password.
+        """
+        fernet = Fernet(key)
+        id_key = hashlib.sha256(b"monacode-vault-index" + base64.urlsafe_b64decode(key)).digest()
+        if not self.check_path.exists():
+            if not create and not self.data_path.exists():
+                return fernet, id_key
+            with _file_lock(self.lock_path):
+                if not self.check_path.exists():
+                    self._init_store(fernet, id_key)
+        try:
+            if fernet.decrypt(self.check_path.read_bytes()) != self.CHECK_PLAINTEXT:
+                raise InvalidToken()
+        except InvalidToken as e:
+            raise VaultError("Failed to decrypt vault: possibly wrong password.") from e
+        return fernet, id_key
+
+    def _init_store(self, fernet: Fernet, id_key: bytes) -> None:
+        """
+        Create an empty v2 store, importing a v1 `vault.dat` if present.
+        Caller must hold the lock.
+        """
+        legacy = self._load_store(fernet)
+        self.entries_dir.mkdir(parents=True, exist_ok=True)
+        if legacy:
+            self._append_index(fernet, list(legacy))
+            for name, secret in legacy.items():
+                _atomic_write(self._entry_path(id_key, name), self._seal(fernet, name, secret))
+        _atomic_write(self.check_path, fernet.encrypt(self.CHECK_PLAINTEXT))
+        if self.data_path.exists():
+            self.data_path.replace(self.data_path.with_name(self.DATA_FILE + ".v1"))
 
     def _load_store(self, fernet: Fernet) -> Dict[str, str]:
         """
-        Decrypt and parse JSON store. Returns empty dict if no data file.
+        Decrypt and parse the v1 JSON blob. Returns empty dict if no data file.
         """
         if not self.data_path.exists():
             return {}
@@ -148,42 +509,119 @@ class VaultManager:
         except Exception as e:
             raise VaultError("Failed to decrypt vault: possibly wrong password.") from e
 
-    def _save_store(self, fernet: Fernet, store: Dict[str, str]) -> None:
+    def _entry_path(self, id_key: bytes, name: str) -> Path:
+        digest = hmac.new(id_key, name.encode("utf-8"), hashlib.sha256).hexdigest()
+        return self.entries_dir / digest
+
+    def _append_index(self, fernet: Fernet, names: List[str]) -> None:
+        lines = b"".join(fernet.encrypt(json.dumps({"k": n}).encode("utf-8")) + b"\n" for n in names)
+        with open(self.index_path, "ab") as f:
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    @staticmethod
+    def _seal(fernet: Fernet, name: str, secret: str) -> bytes:
+        return fernet.encrypt(json.dumps({"k": name, "v": secret}).encode("utf-8"))
+
+    def _read_entry(self, fernet: Fernet, id_key: bytes, name: str) -> Optional[str]:
+        try:
+            token = self._entry_path(id_key, name).read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            record = json.loads(fernet.decrypt(token))
+        except (InvalidToken, ValueError) as e:
+            raise VaultError(f"Failed to decrypt vault entry '{name}'.") from e
+        if not isinstance(record, dict) or record.get("k") != name:
+            raise VaultError(f"Vault entry for '{name}' belongs to another key; the store was modified.")
+        return record["v"]
+
+    def _write_entries(self, fernet: Fernet, id_key: bytes, items: Dict[str, str]) -> None:
         """
-        Serialize store to JSON, encrypt, and write to disk.
+        Upsert secrets under the lock: new names are appended to the index
+        first, then each value is replaced atomically.
         """
-        plaintext = json.dumps(store, indent=2).encode("utf-8")
-        token = fernet.encrypt(plaintext)
-        with open(self.data_path, "wb") as f:
-            f.write(token)
+        with _file_lock(self.lock_path):
+            new = [n for n in items if not self._entry_path(id_key, n).exists()]
+            if new:
+                self._append_index(fernet, new)
+            for name, secret in items.items():
+                _atomic_write(self._entry_path(id_key, name), self._seal(fernet, name, secret))
+
+    def _names(self, fernet: Fernet) -> List[str]:
+        if not self.index_path.exists():
+            return []
+        names: Dict[str, None] = {}
+        for line in self.index_path.read_bytes().splitlines():
+            if line:
+                try:
+                    names[json.loads(fernet.decrypt(line))["k"]] = None
+                except (InvalidToken, ValueError, KeyError) as e:
+                    raise VaultError("Failed to decrypt vault index.") from e
+        return list(names)
 
     def add_secret(self, key: str, secret: str, password: Optional[str] = None) -> None:
         """
         Insert or update a secret in the vault.
         """
-        fernet = self._get_fernet(password)
-        store = self._load_store(fernet)
-        store[key] = secret
-        self._save_store(fernet, store)
+        fernet, id_key = self._open(self._get_key(password), create=True)
+        self._write_entries(fernet, id_key, {key: secret})
         print(f"Secret '{key}' saved.")
 
     def get_secret(self, key: str, password: Optional[str] = None) -> str:
         """
         Retrieve a secret by key; raises if missing.
         """
-        fernet = self._get_fernet(password)
-        store = self._load_store(fernet)
-        try:
-            return store[key]
-        except KeyError:
+        fernet, id_key = self._open(self._get_key(password))
+        secret = self._read_entry(fernet, id_key, key)
+        if secret is None:
             raise VaultError(f"Secret '{key}' not found in vault.")
+        return secret
+
+    def add_many(self, items: Dict[str, str], password: Optional[str] = None) -> None:
+        """
+        Insert or update several secrets with one key derivation and one
+        locked write.
+        """
+        fernet, id_key = self._open(self._get_key(password), create=True)
+        self._write_entries(fernet, id_key, dict(items))
+        print(f"{len(items)} secret(s) saved.")
+
+    def get_many(self, keys: List[str], password: Optional[str] = None) -> Dict[str, str]:
+        """
+        Retrieve several secrets with one key derivation; raises if any
+        is missing.
+        """
+        fernet, id_key = self._open(self._get_key(password))
+        found: Dict[str, str] = {}
+        missing = []
+        for key in keys:
+            secret = self._read_entry(fernet, id_key, key)
+            if secret is None:
+                missing.append(key)
+            else:
+                found[key] = secret
+        if missing:
+            raise VaultError(f"Secret(s) not found in vault: {', '.join(missing)}")
+        return found
+
+    def export_secrets(self, password: Optional[str] = None) -> Dict[str, str]:
+        """
+        Return every secret in the vault, keyed by name.
+        """
+        fernet, id_key = self._open(self._get_key(password))
+        result = {}
+        for name in self._names(fernet):
+            secret = self._read_entry(fernet, id_key, name)
+            if secret is not None:
+                result[name] = secret
+        return result
 
     def list_keys(self, password: Optional[str] = None) -> None:
         """
         Print all stored secret keys.
         """
-        fernet = self._get_fernet(password)
-        store = self._load_store(fernet)
-        for k in store:
+        fernet, _ = self._open(self._get_key(password))
+        for k in self._names(fernet):
             print(k)
-
@@ -0,0 +1,142 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import yaml
+
+from .git import GitManager
+
+
+OPERATIONS = ("status", "pull", "commit", "clone")
+
+
+class WorkspaceError(Exception):
+    pass
+
+
+def _error_text(exc: Exception) -> str:
+    """
+    git's own stderr for a failed command, else the exception message.
+    """
+    detail = getattr(exc, "stderr", None) or str(exc)
+    if isinstance(detail, bytes):
+        detail = detail.decode("utf-8", "replace")
+    detail = detail.strip()
+    if detail.startswith("stderr: '"):  # GitPython quotes it
+        detail = detail[len("stderr: '"):].rstrip("'")
+    return detail.strip()
+
+
+class RepoResult:
+    """
+    Outcome of one operation on one repository.
+    """
+
+    def __init__(self, name: str, path: Path, ok: bool, data: Any = None,
+                 error: Optional[str] = None, seconds: float = 0.0):
+        self.name = name
+        self.path = path
+        self.ok = ok
+        self.data = data
+        self.error = error
+        self.seconds = seconds
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"name": self.name, "path": str(self.path), "ok": self.ok,
+                "data": self.data, "error": self.error, "seconds": round(self.seconds, 3)}
+
+
+class Workspace:
+    """
+    A set of repositories described by a YAML manifest:
+
+      root: ~/src            # optional, relative to the manifest
+      repos:
+        - name: billing
+          url: git@github.com:acme/billing.git
+          path: services/billing   # optional, defaults to name
+        - git@github.com:acme/auth.git
+
+    Operations run on a bounded thread pool (git does the work in
+    subprocesses) and results are yielded per repository as they finish;
+    a failing repository does not stop the others.
+    """
+
+    def __init__(self, repos: List[Dict[str, Any]], root: Path, workers: int = 16):
+        self.repos = repos
+        self.root = root
+        self.workers = max(1, workers)
+        self.gm = GitManager(str(root))
+
+    @classmethod
+    def load(cls, manifest: str, workers: int = 16) -> "Workspace":
+        path = Path(manifest).expanduser()
+        try:
+            with open(path) as f:
+                data = yaml.load(f, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader)) or {}
+        except OSError as e:
+            raise WorkspaceError(f"Cannot read workspace manifest {path}: {e}") from e
+        if isinstance(data, list):
+            data = {"repos": data}
+        root = Path(os.path.expanduser(str(data.get("root", "."))))
+        if not root.is_absolute():
+            root = path.resolve().parent / root
+
+        repos = []
+        for item in data.get("repos") or []:
+            if isinstance(item, str):
+                item = {"url": item}
+            if not isinstance(item, dict) or not (item.get("url") or item.get("path")):
+                raise WorkspaceError(f"Invalid repo entry in {path}: {item!r}")
+            name = item.get("name") or Path(str(item.get("url") or item["path"])).stem
+            repos.append({"name": name, "url": item.get("url"),
+                          "path": str(item.get("path") or name)})
+        return cls(repos, root, workers)
+
+    def run(self, op: str, **kwargs: Any) -> Iterator[RepoResult]:
+        """
+        Run `op` on every repository, yielding results in completion order.
+        """
+        if op not in OPERATIONS:
+            raise WorkspaceError(f"Unknown workspace operation: {op}")
+        fn: Callable[..., Any] = getattr(self, f"_{op}")
+        with ThreadPoolExecutor(max_workers=self.workers,
+                                thread_name_prefix="monacode-ws") as pool:
+            futures = {pool.submit(self._timed, fn, repo, kwargs): repo for repo in self.repos}
+            for fut in as_completed(futures):
+                yield fut.result()
+
+    def _timed(self, fn: Callable[..., Any], repo: Dict[str, Any],
+               kwargs: Dict[str, Any]) -> RepoResult:
+        path = self.root / repo["path"]
+        start = time.perf_counter()
+        try:
+            if fn != self._clone and not path.is_dir():
+                raise WorkspaceError("not cloned yet (run `monacode git ws clone`)")
+            data = fn(repo, path, **kwargs)
+        except Exception as e:
+            return RepoResult(repo["name"], path, False, error=_error_text(e),
+                              seconds=time.perf_counter() - start)
+        return RepoResult(repo["name"], path, True, data, seconds=time.perf_counter() - start)
+
+    def _status(self, repo: Dict[str, Any], path: Path) -> Dict[str, Any]:
+        return self.gm.status(str(path))
+
+    def _pull(self, repo: Dict[str, Any], path: Path) -> Dict[str, Any]:
+        old, new = self.gm.pull(str(path))
+        return {"from": old[:12], "to": new[:12], "updated": old != new}
+
+    def _commit(self, repo: Dict[str, Any], path: Path, message: str = "Update",
+                no_verify: bool = False) -> Dict[str, Any]:
+        sha, count = self.gm.commit_changes(str(path), message, no_verify=no_verify)
+        return {"sha": sha[:12] if sha else None, "paths": count}
+
+    def _clone(self, repo: Dict[str, Any], path: Path) -> Dict[str, Any]:
+        if (path / ".git").exists():
+            return {"cloned": False}
+        if not repo.get("url"):
+            raise WorkspaceError("no url to clone from")
+        self.gm.clone(repo["url"], repo["path"])
+        return {"cloned": True}
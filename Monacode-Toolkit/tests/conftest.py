@@ -0,0 +1,13 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def home(tmp_path, monkeypatch):
+    """
+    Point ~ at a scratch directory so caches, vaults and config stay in the test.
+    """
+    path = tmp_path / "home"
+    path.mkdir()
+    monkeypatch.setenv("HOME", str(path))
+    monkeypatch.delenv("MONACODE_GIT_CACHE", raising=False)
+    return path
@@ -0,0 +1,26 @@
+from click.testing import CliRunner
+
+from monacode.cli import cli
+from monacode.utils import ConfigLoader
+
+
+def test_config_save_keeps_strings_verbatim():
+    runner = CliRunner()
+    for value in ("no", "0755", "1e3", "~", "[a]"):
+        result = runner.invoke(cli, ["config", "save", "opt.value", value])
+        assert result.exit_code == 0, result.output
+        assert ConfigLoader().get("opt.value") == value
+
+
+def test_config_save_yaml_opt_in():
+    runner = CliRunner()
+    result = runner.invoke(cli, ["config", "save", "--yaml", "llm.timeout", "30"])
+    assert result.exit_code == 0
+    assert "llm.timeout=30" in result.output
+    assert ConfigLoader().get("llm.timeout") == 30
+
+    runner.invoke(cli, ["config", "save", "--yaml", "llm.routes.fast", "[a, b]"])
+    assert ConfigLoader().get("llm.routes.fast") == ["a", "b"]
+
+    result = runner.invoke(cli, ["config", "save", "--yaml", "x", "[unclosed"])
+    assert result.exit_code == 1
@@ -0,0 +1,38 @@
+import pytest
+
+from monacode import utils
+from monacode.utils import ConfigLoader
+
+
+@pytest.fixture
+def config(home, monkeypatch):
+    monkeypatch.setenv("MONACODE_SYSTEM_CONFIG", str(home / "no-system.yml"))
+    monkeypatch.chdir(home)
+    loader = ConfigLoader()
+    loader.home.mkdir(parents=True, exist_ok=True)
+    return loader
+
+
+def cold(loader):
+    """
+    Load with the process cache dropped, as a new process would.
+    """
+    utils._CONFIG_FILES.clear()
+    utils._CONFIG_MERGED.clear()
+    return loader.effective()
+
+
+def test_non_string_keys_load_the_same_cold_and_warm(config):
+    config.filepath.write_text("true: {a: 1}\nports:\n  8080: web\nname: x\n")
+    first = cold(config)
+    assert first == {True: {"a": 1}, "ports": {8080: "web"}, "name": "x"}
+    assert cold(config) == first
+    assert not list(config.snapshot_dir.glob("*.json"))
+
+
+def test_string_keys_are_served_from_the_snapshot(config, monkeypatch):
+    config.filepath.write_text("llm:\n  timeout: 30\n  routes: {fast: [a, b]}\n")
+    first = cold(config)
+    assert list(config.snapshot_dir.glob("*.json"))
+    monkeypatch.setattr(utils.yaml, "load", None)  # a warm load must not parse
+    assert cold(config) == first == {"llm": {"timeout": 30, "routes": {"fast": ["a", "b"]}}}
@@ -0,0 +1,34 @@
+import os
+
+import pytest
+from dotenv import dotenv_values
+
+from monacode.utils import EnvManager
+
+KEYS = ("A", "B", "DUP", "NEW", "QUOTED")
+
+
+@pytest.fixture
+def env_file(home, monkeypatch):
+    for key in KEYS:
+        monkeypatch.delenv(key, raising=False)
+    path = home / ".monacode" / ".env"
+    path.parent.mkdir()
+    path.write_text("# settings\nA=1\n\nexport B='two'  # inline\nDUP=x\nDUP=y\nC=keep")
+    return path
+
+
+def test_set_many_rewrites_in_place(env_file):
+    EnvManager().set_many({"B": "2", "DUP": "z", "NEW": "n", "A": "one"})
+    assert env_file.read_text() == (
+        "# settings\nA='one'\n\nB='2'\nDUP='z'\nC=keep\nNEW='n'\n"
+    )
+    assert os.environ["NEW"] == "n" and os.environ["B"] == "2"
+
+
+@pytest.mark.parametrize("value", ["it's", "a b # c", "$HOME", "two\nlines", 'say "hi"', ""])
+def test_set_many_quotes_values_that_read_back(env_file, value):
+    EnvManager().set_many({"QUOTED": value, "A": value})
+    assert dotenv_values(str(env_file)) == {"A": value, "B": "two", "DUP": "y", "C": "keep",
+                                            "QUOTED": value}
+    assert EnvManager().all()["QUOTED"] == value
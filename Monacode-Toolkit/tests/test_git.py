@@ -0,0 +1,141 @@
+import os
+import time
+import subprocess
+
+import pytest
+
+from monacode.git import GitCommandError, GitManager
+
+
+@pytest.fixture(autouse=True)
+def identity(monkeypatch):
+    for who in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{who}_NAME", "test")
+        monkeypatch.setenv(f"GIT_{who}_EMAIL", "test@example.com")
+
+
+def git(repo, *args):
+    return subprocess.run(["git", *args], cwd=str(repo), check=True,
+                          stdout=subprocess.PIPE).stdout.decode().strip()
+
+
+@pytest.fixture
+def repo(tmp_path):
+    path = tmp_path / "repo"
+    path.mkdir()
+    git(path, "init", "-q")
+    (path / "a.txt").write_text("a\n")
+    git(path, "add", "a.txt")
+    git(path, "commit", "-q", "-m", "init")
+    return path
+
+
+def hook(repo, name, body):
+    path = repo / ".git" / "hooks" / name
+    path.write_text("#!/bin/sh\n" + body)
+    path.chmod(0o755)
+
+
+@pytest.mark.parametrize("scoped", [False, True])
+def test_commit_runs_hooks(repo, scoped):
+    gm = GitManager()
+    paths = ["b.txt"] if scoped else None
+    (repo / "b.txt").write_text("b\n")
+    hook(repo, "pre-commit", "exit 1\n")
+    with pytest.raises(GitCommandError):
+        gm.commit_changes(str(repo), "blocked", paths=paths)
+    assert git(repo, "log", "--format=%s") == "init"
+
+    sha, count = gm.commit_changes(str(repo), "skipped", paths=paths, no_verify=True)
+    assert sha and count == 1
+
+    hook(repo, "pre-commit", "exit 0\n")
+    hook(repo, "commit-msg", 'echo "Signed-off-by: hook" >> "$1"\n')
+    (repo / "b.txt").write_text("b2\n")
+    gm.commit_changes(str(repo), "checked", paths=paths)
+    assert "Signed-off-by: hook" in git(repo, "log", "-1", "--format=%B")
+
+
+def test_scoped_commit_leaves_other_changes(repo):
+    (repo / "a.txt").write_text("a2\n")
+    (repo / "b.txt").write_text("b\n")
+    sha, count = GitManager().commit_changes(str(repo), "only b", paths=["b.txt"])
+    assert git(repo, "show", "--name-only", "--format=", sha) == "b.txt"
+    assert git(repo, "status", "--porcelain") == "M a.txt"
+
+
+def test_since_keeps_renames_whole(repo):
+    old = time.time() - 3600
+    os.utime(str(repo / "a.txt"), (old, old))
+    git(repo, "mv", "a.txt", "moved.txt")
+    gm = GitManager()
+
+    unstaged, changed = gm.changed_paths(str(repo), since=time.time() - 60)
+    assert changed == []
+    assert gm.commit_changes(str(repo), "nothing", since=time.time() - 60) == (None, 0)
+
+    unstaged, changed = gm.changed_paths(str(repo), since=old - 60)
+    assert sorted(changed) == ["a.txt", "moved.txt"]
+    sha, count = gm.commit_changes(str(repo), "rename", since=old - 60)
+    assert git(repo, "show", "-M", "--name-status", "--format=", sha).startswith("R100")
+    assert git(repo, "status", "--porcelain") == ""
+
+
+def test_clone_into_missing_base_dir(repo, tmp_path):
+    gm = GitManager(str(tmp_path / "new" / "root"))
+    gm.clone(repo.as_uri(), "nested/copy")
+    assert (tmp_path / "new" / "root" / "nested" / "copy" / "a.txt").read_text() == "a\n"
+    assert list(gm.cache_dir.glob("*.git"))
+
+
+def test_workspace_clones_into_new_root(repo, tmp_path):
+    from monacode.workspace import Workspace
+
+    manifest = tmp_path / "repos.yml"
+    manifest.write_text(f"root: fresh\nrepos:\n  - name: r\n    url: {repo.as_uri()}\n")
+    results = list(Workspace.load(str(manifest)).run("clone"))
+    assert [r.ok for r in results] == [True], results[0].error
+    assert (tmp_path / "fresh" / "r" / ".git").is_dir()
+
+
+@pytest.mark.parametrize("options", [{"depth": 1}, {"filter_spec": "blob:none"}])
+def test_shallow_or_partial_clone_does_not_build_a_mirror(repo, tmp_path, options):
+    git(repo, "config", "uploadpack.allowFilter", "true")
+    gm = GitManager(str(tmp_path / "clones"))
+    gm.clone(repo.as_uri(), "c", **options)
+    assert not list(gm.cache_dir.glob("*.git"))
+    assert (tmp_path / "clones" / "c" / "a.txt").exists()
+
+    gm.mirror(repo.as_uri())
+    gm.clone(repo.as_uri(), "d", **options)
+    assert (tmp_path / "clones" / "d" / ".git" / "objects" / "info" / "alternates").exists()
+
+
+def test_log_stats_handles_renames_binaries_and_spaces(repo):
+    (repo / "my file.txt").write_text("1\n2\n3\n")
+    (repo / "blob.bin").write_bytes(b"\0\1\2" * 100)
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "add")
+    (repo / "new dir").mkdir()
+    git(repo, "mv", "my file.txt", "new dir/renamed é.txt")
+    (repo / "blob.bin").write_bytes(b"\3\0" * 50)
+    git(repo, "commit", "-q", "-am", "move")
+
+    gm = GitManager()
+    stats = gm.log_stats(str(repo))
+    assert stats["commits"] == 3
+    assert stats["paths"] == {
+        "a.txt": {"commits": 1, "added": 1, "deleted": 0},
+        "my file.txt": {"commits": 2, "added": 3, "deleted": 3},
+        "new dir/renamed é.txt": {"commits": 1, "added": 3, "deleted": 0},
+        "blob.bin": {"commits": 2, "added": 0, "deleted": 0},
+    }
+    assert (stats["added"], stats["deleted"]) == (7, 3)
+    assert stats["authors"] == {"test <test@example.com>": {"commits": 3, "added": 7, "deleted": 3}}
+
+    (repo / "new dir" / "renamed é.txt").write_text("1\n")
+    git(repo, "commit", "-q", "-am", "trim")
+    warm = gm.log_stats(str(repo))  # extends the cached aggregate
+    assert warm == gm.log_stats(str(repo), use_cache=False)
+    assert warm["paths"]["new dir/renamed é.txt"] == {"commits": 2, "added": 3, "deleted": 2}
+    assert gm.log_stats(str(repo), paths=["new dir"])["commits"] == 2
@@ -0,0 +1,280 @@
+import sys
+import types
+import time
+import asyncio
+import threading
+import contextvars
+
+import pytest
+
+from monacode import llm
+from monacode.llm import LLMManager
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    m = LLMManager()
+    yield m
+    m.close()
+
+
+@pytest.fixture
+def fake_openai(monkeypatch):
+    """
+    openai 0.27 surface used by the async path, recording the aiohttp
+    session bound for each request.
+    """
+    seen = []
+
+    class Session:
+        closed = False
+
+        def __init__(self, connector=None):
+            self.connector = connector
+
+        async def close(self):
+            self.closed = True
+
+    aiohttp = types.ModuleType("aiohttp")
+    aiohttp.ClientSession = Session
+    aiohttp.TCPConnector = lambda limit: ("connector", limit)
+
+    openai = types.ModuleType("openai")
+    openai.aiosession = contextvars.ContextVar("aiohttp-session", default=None)
+
+    class ChatCompletion:
+        @staticmethod
+        async def acreate(**kwargs):
+            seen.append(openai.aiosession.get())
+            msg = types.SimpleNamespace(content=kwargs["messages"][0]["content"].upper())
+            return types.SimpleNamespace(choices=[types.SimpleNamespace(message=msg)])
+
+    openai.ChatCompletion = ChatCompletion
+    monkeypatch.setitem(sys.modules, "aiohttp", aiohttp)
+    monkeypatch.setitem(sys.modules, "openai", openai)
+    return openai, seen
+
+
+def test_openai_async_reuses_session_per_loop(manager, fake_openai):
+    openai, seen = fake_openai
+
+    async def calls():
+        first = await manager._agen_openai("a")
+        second = await manager._agen_openai("b")
+        return first, second
+
+    assert asyncio.run(calls()) == ("A", "B")
+    assert seen[0] is not None and seen[0] is seen[1]
+    assert openai.aiosession.get() is None  # not left bound after the call
+
+    asyncio.run(manager._agen_openai("c"))
+    assert seen[2] is not seen[0]
+    asyncio.run(manager.aclose())
+    assert all(s.closed for s in seen)
+
+
+def _in_executor(fn, *args):
+    return asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+def test_singleflight_survives_leader_cancellation(tmp_path):
+    flight = llm.SingleFlight(tmp_path / "locks")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        leader = asyncio.ensure_future(flight.ado("k", work, _in_executor))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(flight.ado("k", work, _in_executor))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(main()) == "done"
+    assert calls == [1]
+    assert not flight._flights
+    assert not list((tmp_path / "locks").iterdir())
+
+
+def test_singleflight_cancels_work_without_waiters(tmp_path):
+    flight = llm.SingleFlight(tmp_path / "locks")
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def main():
+        caller = asyncio.ensure_future(flight.ado("k", work, _in_executor))
+        await asyncio.sleep(0.05)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+    assert cancelled == [1]
+    assert not flight._flights
+    assert not list((tmp_path / "locks").iterdir())
+
+
+@pytest.fixture
+def routed(manager, monkeypatch):
+    """
+    Stub engines behind named routes; "chunky" streams, "plain" does not.
+    """
+    monkeypatch.setattr(llm, "ENGINES", dict(llm.ENGINES))
+    monkeypatch.setattr(llm, "_CUSTOM_ENGINES", {})
+    llm.register_engine("plain", lambda prompt, **opts: f"plain:{prompt}")
+    llm.register_engine("chunky", lambda prompt, **opts: f"chunky:{prompt}")
+    monkeypatch.setattr(manager, "_stream_chunky",
+                        lambda prompt, **opts: iter(["chunky:", prompt]), raising=False)
+    manager._cfg = {"llm": {"routes": {"solo": ["chunky"], "flat": "plain",
+                                       "pair": ["plain", "chunky"]}}}
+    return manager
+
+
+def test_generate_stream_resolves_named_routes(routed):
+    assert list(routed.generate_stream("a", engine="solo")) == ["chunky:", "a"]
+    assert list(routed.generate_stream("b", engine="flat")) == ["plain:b"]
+    assert list(routed.generate_stream("c", engine="pair")) == ["plain:c"]
+    # the assembled stream is cached under the route name
+    assert list(routed.generate_stream("a", engine="solo")) == ["chunky:a"]
+
+
+def test_agenerate_stream_resolves_named_routes(routed):
+    async def collect(prompt, engine):
+        return [chunk async for chunk in routed.agenerate_stream(prompt, engine=engine)]
+
+    assert asyncio.run(collect("a", "solo")) == ["chunky:", "a"]
+    assert asyncio.run(collect("b", "flat")) == ["plain:b"]
+
+
+@pytest.fixture
+def hedged(manager, monkeypatch):
+    """
+    Stub engines for hedged routes: "slow" blocks until the test ends,
+    "fast" answers at once, "bad" always fails.
+    """
+    gate = threading.Event()
+    calls = []
+    monkeypatch.setattr(llm, "ENGINES", dict(llm.ENGINES))
+    monkeypatch.setattr(llm, "_CUSTOM_ENGINES", {})
+
+    def engine(name, fn):
+        def run(prompt, **opts):
+            calls.append((name, time.monotonic()))
+            return fn(prompt)
+        llm.register_engine(name, run)
+
+    engine("slow", lambda p: gate.wait(10) and f"slow:{p}")
+    engine("fast", lambda p: f"fast:{p}")
+    engine("bad", lambda p: (_ for _ in ()).throw(RuntimeError("boom")))
+    manager._cfg = {"llm": {"hedge": {"delay": 0.5}}}
+    manager.calls = calls
+    yield manager
+    gate.set()
+
+
+def test_hedge_after_deadline(hedged):
+    start = time.monotonic()
+    assert hedged.generate("a", engine="slow|fast") == "fast:a"
+    assert 0.4 < time.monotonic() - start < 2
+    assert [name for name, _ in hedged.calls] == ["slow", "fast"]
+
+
+def test_failover_is_immediate(hedged):
+    start = time.monotonic()
+    assert hedged.generate("a", engine="bad|fast") == "fast:a"
+    assert time.monotonic() - start < 0.4
+
+
+def test_failure_while_another_runs_hedges_at_once(hedged):
+    hedged._cfg["llm"]["hedge"]["delay"] = 0.3
+    start = time.monotonic()
+    assert hedged.generate("a", engine="slow|bad|fast") == "fast:a"
+    # bad starts at the first deadline and fails; fast follows without a second one
+    assert time.monotonic() - start < 0.55
+    assert [name for name, _ in hedged.calls] == ["slow", "bad", "fast"]
+
+
+def test_all_engines_fail(hedged):
+    hedged._cfg["llm"]["hedge"]["delay"] = 0.05
+    with pytest.raises(llm.LLMError, match="bad: boom"):
+        hedged.generate("a", engine="bad|bad")
+
+    with pytest.raises(llm.LLMError, match="All engines failed"):
+        asyncio.run(hedged.agenerate("b", engine="bad|bad"))
+
+
+def test_async_hedge_releases_loser_slot(hedged):
+    hedged._cfg["llm"]["hedge"]["delay"] = 0.05
+
+    async def main():
+        results = [await hedged.agenerate(f"p{i}", engine="slow|fast") for i in range(4)]
+        await asyncio.sleep(0)
+        return results
+
+    assert asyncio.run(main()) == [f"fast:p{i}" for i in range(4)]
+    assert hedged._limiter("slow").concurrency.inflight == 0
+    assert hedged._limiter("fast").concurrency.inflight == 0
+
+
+def test_async_failure_while_another_runs_hedges_at_once(hedged):
+    hedged._cfg["llm"]["hedge"]["delay"] = 0.3
+    start = time.monotonic()
+    assert asyncio.run(hedged.agenerate("a", engine="slow|bad|fast")) == "fast:a"
+    assert time.monotonic() - start < 0.55
+
+
+@pytest.fixture
+def batch(manager, monkeypatch):
+    """
+    A stub engine whose latency falls with the prompt number, so
+    completion order is the reverse of input order; "fail" raises.
+    """
+    monkeypatch.setattr(llm, "ENGINES", dict(llm.ENGINES))
+    monkeypatch.setattr(llm, "_CUSTOM_ENGINES", {})
+    calls = []
+
+    def run(prompt, **opts):
+        calls.append(prompt)
+        if prompt == "fail":
+            raise RuntimeError("boom")
+        time.sleep(0.05 * (5 - int(prompt)))
+        return f"done:{prompt}"
+
+    llm.register_engine("stub", run)
+    manager.calls = calls
+    return manager
+
+
+def test_generate_many_ordered_with_per_item_errors(batch):
+    requests = ["0", {"id": "x", "prompt": "fail"}, "2", {"id": "y"},
+                {"prompt": "4", "engine": "nope"}, "3"]
+    records = list(batch.generate_many(requests, engine="stub", workers=4, ordered=True))
+    assert [r["id"] for r in records] == [0, "x", 2, "y", 4, 5]
+    assert [r.get("result") for r in records] == ["done:0", None, "done:2", None, None, "done:3"]
+    assert records[1]["error"] == "boom"
+    assert records[3]["error"] == "Missing prompt"
+    assert records[4]["error"] == "Unsupported LLM engine: nope"
+    assert sorted(batch.calls) == ["0", "2", "3", "fail"]
+
+
+def test_generate_many_unordered_yields_by_completion_and_hits_cache(batch):
+    first = list(batch.generate_many(["0", "1", "4"], engine="stub", workers=3))
+    assert [r["id"] for r in first] == [2, 1, 0]
+    again = list(batch.generate_many(["0", "1", "4"], engine="stub", workers=3))
+    assert sorted((r["id"], r["result"], r.get("cached")) for r in again) == [
+        (0, "done:0", True), (1, "done:1", True), (2, "done:4", True)]
+    assert len(batch.calls) == 3
@@ -0,0 +1,242 @@
+import json
+import socket
+import threading
+
+import pytest
+
+from monacode.pluginhost import (
+    INTERNAL_ERROR, INVALID_PARAMS, INVALID_REQUEST, PARSE_ERROR, HostError, PluginHost, call,
+)
+
+
+def make_plugin(plugins_dir, name, body, **metadata):
+    path = plugins_dir / name
+    path.mkdir(parents=True)
+    meta = {"name": name, "interface_version": "1.0.0", **metadata}
+    (path / "metadata.json").write_text(json.dumps(meta))
+    (path / "plugin.py").write_text('INTERFACE_VERSION = "1.0.0"\n\n' + body)
+
+
+@pytest.fixture
+def plugins_dir(tmp_path):
+    path = tmp_path / "plugins"
+    make_plugin(path, "echo", "def run(data):\n    return {'got': data}\n")
+    make_plugin(path, "fail", "def run(data):\n    raise ValueError(data['x'])\n")
+    return path
+
+
+@pytest.mark.parametrize("data", [0, "", [], False, None, {"a": 1}])
+def test_host_passes_falsy_payloads_through(plugins_dir, data):
+    host = PluginHost(str(plugins_dir))
+    reply = host.handle({"id": 1, "method": "run", "params": {"name": "echo", "data": data}})
+    assert reply["result"] == {"got": data}
+
+
+def test_host_defaults_missing_payload(plugins_dir):
+    host = PluginHost(str(plugins_dir))
+    reply = host.handle({"id": 1, "method": "run", "params": {"name": "echo"}})
+    assert reply["result"] == {"got": {}}
+
+
+@pytest.mark.parametrize("request_", [5, "run", None, [], [{"id": 1, "method": "ping"}]])
+def test_host_rejects_non_object_requests(plugins_dir, request_):
+    reply = PluginHost(str(plugins_dir)).handle(request_)
+    assert reply["id"] is None and reply["error"]["code"] == INVALID_REQUEST
+
+
+def test_host_rejects_non_object_params(plugins_dir):
+    reply = PluginHost(str(plugins_dir)).handle({"id": 7, "method": "run", "params": ["echo"]})
+    assert reply["id"] == 7 and reply["error"]["code"] == INVALID_PARAMS
+
+
+def test_stdio_survives_malformed_lines(plugins_dir, monkeypatch):
+    import io
+    import sys
+
+    make_plugin(plugins_dir, "loop", "def run(data):\n    x = []\n    x.append(x)\n    return x\n")
+    monkeypatch.setattr(sys, "stdout", sys.stdout)
+    stdin = io.BytesIO(b"\n".join([
+        b"{not json", b"5", b'[{"id": 1, "method": "ping"}]', b'{"id": 2, "params": 3}',
+        b'{"id": 3, "method": "run", "params": {"name": "loop"}}',
+        b'{"id": 4, "method": "run", "params": {"name": "echo", "data": 1}}',
+    ]) + b"\n")
+    stdout = io.BytesIO()
+    PluginHost(str(plugins_dir)).serve_stdio(stdin, stdout)
+    replies = [json.loads(line) for line in stdout.getvalue().splitlines()]
+    assert [r.get("error", {}).get("code") for r in replies] == [
+        PARSE_ERROR, INVALID_REQUEST, INVALID_REQUEST, INVALID_PARAMS, INTERNAL_ERROR, None]
+    assert replies[4]["id"] == 3
+    assert replies[5] == {"jsonrpc": "2.0", "id": 4, "result": {"got": 1}}
+
+
+def test_call_raises_host_error_on_eof(tmp_path):
+    path = tmp_path / "h.sock"
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(path))
+    server.listen(1)
+
+    def hang_up():
+        conn, _ = server.accept()
+        conn.recv(4096)
+        conn.close()
+
+    t = threading.Thread(target=hang_up)
+    t.start()
+    try:
+        with pytest.raises(HostError, match="without replying"):
+            call("ping", {}, path, timeout=5)
+    finally:
+        t.join()
+        server.close()
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_jsonl_bad_line_does_not_abort(home, workers):
+    from click.testing import CliRunner
+    from monacode.cli import cli
+
+    make_plugin(home / ".monacode" / "plugins", "echo", "def run(data):\n    return data\n")
+    lines = '{"n": 1}\n\n{"n": \nnot json\n{"n": 5}\n{"n": 6}\n'
+    result = CliRunner().invoke(cli, ["plugin", "run", "echo", "--jsonl", "-w", workers],
+                                input=lines)
+    assert result.exit_code == 1
+    assert [json.loads(line) for line in result.stdout.splitlines()] == [{"n": 1}, {"n": 5}, {"n": 6}]
+    errors = result.stderr.splitlines()
+    assert [e.split(":")[0] for e in errors] == ["line 3", "line 4"]
+
+
+@pytest.fixture
+def cached(tmp_path):
+    from monacode.git import PluginManager
+
+    plugins = tmp_path / "plugins"
+    make_plugin(plugins, "calls", "CALLS = []\n\ndef run(data):\n    CALLS.append(data)\n"
+                "    return data\n", cacheable=True)
+    pm = PluginManager(str(plugins))
+    return pm, pm.load_plugin("calls").CALLS
+
+
+@pytest.mark.parametrize("data", [
+    {"a": [1, 2.0, True, None, "x"]}, [{"b": {}}], "s", 0, {1: "a"}, {True: 1}, (1, 2),
+    {"t": (1,)}, float("nan"),
+])
+def test_memo_hit_equals_miss(cached, data):
+    pm, calls = cached
+    run = pm.runner("calls")
+    miss, hit = run(data), run(data)
+    assert type(hit) is type(miss) and repr(hit) == repr(miss) == repr(data)
+
+
+def test_memo_keys_do_not_collide(cached):
+    pm, calls = cached
+    run = pm.runner("calls")
+    assert run({"1": "a"}) == {"1": "a"}
+    assert run({1: "a"}) == {1: "a"}
+    assert run([1, 2]) == [1, 2]
+    assert run((1, 2)) == (1, 2)
+    assert run([1, 2]) == [1, 2]
+    assert len(calls) == 4  # only the repeated JSON-exact list was served from the memo
+
+
+def test_failed_check_unregisters_module(tmp_path):
+    import sys
+    from monacode.git import PluginManager
+
+    plugins = tmp_path / "plugins"
+    make_plugin(plugins, "norun", "VALUE = 1\n")
+    with pytest.raises(RuntimeError, match="run"):
+        PluginManager(str(plugins)).load_plugin("norun")
+    assert "monacode_plugins.norun" not in sys.modules
+
+
+@pytest.mark.parametrize("workers", ["1", "2"])
+def test_jsonl_unserializable_result_does_not_abort(home, workers):
+    from click.testing import CliRunner
+    from monacode.cli import cli
+
+    make_plugin(home / ".monacode" / "plugins", "sets",
+                "def run(data):\n    return {1, 2} if data['n'] == 2 else data\n")
+    lines = '{"n": 1}\n{"n": 2}\n{"n": 3}\n'
+    result = CliRunner().invoke(cli, ["plugin", "run", "sets", "--jsonl", "-w", workers],
+                                input=lines)
+    assert result.exit_code == 1
+    assert [json.loads(line) for line in result.stdout.splitlines()] == [{"n": 1}, {"n": 3}]
+    assert result.stderr.startswith("line 2: result is not JSON-serializable")
+    assert "Load error" not in result.stderr
+
+
+def test_registry_refreshes_only_changed_plugins(plugins_dir, monkeypatch):
+    import shutil
+    import sys
+    from monacode.git import PluginManager
+
+    monkeypatch.delitem(sys.modules, "monacode_plugins.echo", raising=False)
+    pm = PluginManager(str(plugins_dir))
+    saves = []
+    save = pm._save_registry
+    monkeypatch.setattr(pm, "_save_registry", lambda index: saves.append(1) or save(index))
+
+    first = pm.registry()
+    assert sorted(first) == ["echo", "fail"] and len(saves) == 1
+    assert "monacode_plugins.echo" not in sys.modules  # indexing imports nothing
+    assert pm.registry() == first and len(saves) == 1
+
+    (plugins_dir / "echo" / "plugin.py").write_text(
+        'INTERFACE_VERSION = "1.0.0"\n\ndef run(data):\n    return "v2"\n')
+    (plugins_dir / "bad").mkdir()
+    (plugins_dir / "bad" / "metadata.json").write_text("{")
+    shutil.rmtree(str(plugins_dir / "fail"))
+    second = pm.registry()
+    assert sorted(second) == ["bad", "echo"] and len(saves) == 2
+    assert second["echo"]["code_hash"] != first["echo"]["code_hash"]
+    assert second["bad"]["error"].startswith("invalid metadata.json")
+    assert PluginManager(str(plugins_dir)).registry() == second  # persisted
+    assert pm.run("echo", {}) == "v2"
+
+
+@pytest.fixture
+def pipeline_dir(tmp_path):
+    path = tmp_path / "plugins"
+    make_plugin(path, "inc", "def run(data):\n    return data + 1\n")
+    make_plugin(path, "check", "def run(data):\n    if data == 4:\n"
+                "        raise ValueError('four')\n    return data * 10\n")
+    return path
+
+
+def test_pipeline_stream_keeps_input_order(pipeline_dir):
+    from monacode.pipeline import Pipeline
+
+    pipe = Pipeline(["inc", "inc", "check"], str(pipeline_dir), queue_size=2)
+    records = [0, 5, 6] + list(range(10, 60))
+    assert list(pipe.stream(records)) == [(n + 2) * 10 for n in records]
+    assert [st["calls"] for st in pipe.timings()] == [len(records)] * 3
+
+
+def test_pipeline_stream_raises_at_the_failing_record(pipeline_dir):
+    from monacode.pipeline import Pipeline, PipelineError
+
+    out = []
+    with pytest.raises(PipelineError, match="Stage 'check' failed: ValueError: four"):
+        for item in Pipeline(["inc", "check"], str(pipeline_dir)).stream(range(10)):
+            out.append(item)
+    assert out == [10, 20, 30]
+
+
+def test_pipeline_stream_bounds_read_ahead(pipeline_dir):
+    import time
+    from monacode.pipeline import Pipeline
+
+    read = []
+
+    def source():
+        for n in range(1000):
+            read.append(n)
+            yield n
+
+    stream = Pipeline(["inc", "inc"], str(pipeline_dir), queue_size=1).stream(source())
+    assert next(stream) == 2
+    time.sleep(0.3)
+    # three queues of one, one record held per thread, one yielded
+    assert len(read) <= 7
+    stream.close()
+    assert len(read) <= 8
@@ -0,0 +1,116 @@
+import asyncio
+
+import pytest
+
+from monacode import ratelimit
+from monacode.ratelimit import AdaptiveConcurrency, EngineLimiter, TokenBucket
+
+
+class Throttled(Exception):
+    def __init__(self, status=429, headers=None):
+        super().__init__(f"HTTP {status}")
+        self.status_code = status
+        self.headers = headers or {}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_bucket_refills_over_time(clock):
+    bucket = TokenBucket(per_minute=60, burst=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(1.0)  # one token per second
+    clock[0] += 3
+    assert bucket.reserve() == 0.0  # refilled to capacity, not beyond
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() > 0
+
+
+def test_aimd_halves_on_throttle_and_grows_on_success():
+    conc = AdaptiveConcurrency(8)
+    conc.acquire()
+    conc.release(throttled=True, success=False)
+    assert conc.limit == 4
+    for _ in range(4):
+        conc.acquire()
+        conc.release()
+    assert conc.limit == pytest.approx(5.0, abs=0.1)
+    assert conc.inflight == 0
+
+
+def test_call_retries_429_and_honours_retry_after(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(ratelimit.time, "sleep", sleeps.append)
+    limiter = EngineLimiter(max_concurrency=8, backoff_base=0.01)
+    errors = [Throttled(429, {"Retry-After": "2"}), Throttled(503)]
+
+    def flaky():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    assert limiter.call(flaky) == "ok"
+    assert 2.0 <= max(sleeps) <= 2.01
+    assert limiter.concurrency.limit < 8  # halved twice, then grown once
+    assert limiter.concurrency.inflight == 0
+
+
+def test_call_does_not_retry_client_errors():
+    limiter = EngineLimiter(max_concurrency=2)
+    with pytest.raises(Throttled):
+        limiter.call(lambda: (_ for _ in ()).throw(Throttled(400)))
+    assert limiter.concurrency.inflight == 0
+    assert limiter.concurrency.limit == 2
+
+
+def test_call_releases_slot_on_base_exception():
+    limiter = EngineLimiter(max_concurrency=1)
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        limiter.call(interrupted)
+    assert limiter.concurrency.inflight == 0
+
+
+def test_iterate_releases_slot_when_closed_early():
+    limiter = EngineLimiter(max_concurrency=1)
+    stream = limiter.iterate(lambda: iter(range(10)))
+    assert next(stream) == 0
+    assert limiter.concurrency.inflight == 1
+    stream.close()
+    assert limiter.concurrency.inflight == 0
+
+
+def test_cancelled_calls_release_their_slots():
+    limiter = EngineLimiter(max_concurrency=2)
+
+    async def slow():
+        await asyncio.sleep(10)
+
+    async def chunks():
+        yield 1
+        await asyncio.sleep(10)
+        yield 2
+
+    async def consume():
+        async for _ in limiter.aiterate(chunks):
+            pass
+
+    async def main():
+        tasks = [asyncio.ensure_future(limiter.acall(slow)) for _ in range(2)]
+        tasks.append(asyncio.ensure_future(consume()))
+        await asyncio.sleep(0.05)
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        assert limiter.concurrency.inflight == 0
+        return await asyncio.wait_for(limiter.acall(lambda: asyncio.sleep(0, "ok")), 1)
+
+    assert asyncio.run(main()) == "ok"
@@ -0,0 +1,62 @@
+import os
+import shutil
+
+import pytest
+
+from monacode import scaffold
+from monacode.scaffold import TemplateIndex
+
+
+@pytest.fixture
+def template(tmp_path, monkeypatch):
+    monkeypatch.setattr(scaffold, "_REFLINK_SUPPORT", {})
+    root = tmp_path / "tpl"
+    (root / "sub").mkdir(parents=True)
+    (root / "rw.txt").write_text("writable\n")
+    (root / "sub" / "ro.txt").write_text("read-only\n")
+    os.chmod(str(root / "sub" / "ro.txt"), 0o444)
+    os.symlink("sub/ro.txt", str(root / "link"))
+    return root
+
+
+def test_without_reflink_hardlinks_read_only_and_copies_writable(template, tmp_path, monkeypatch):
+    tried = []
+    monkeypatch.setattr(scaffold, "reflink", lambda src, dst: tried.append(src) and False)
+    dest = tmp_path / "out"
+    counts = TemplateIndex.load(str(template)).instantiate(dest)
+    assert counts == {"reflink": 0, "hardlink": 1, "copy": 1, "symlink": 1}
+    assert len(tried) == 1  # the failed probe is remembered for the device pair
+
+    ro, rw = dest / "sub" / "ro.txt", dest / "rw.txt"
+    assert os.path.samefile(str(ro), str(template / "sub" / "ro.txt"))
+    assert not os.path.samefile(str(rw), str(template / "rw.txt"))
+    assert rw.read_text() == "writable\n"
+    assert os.stat(str(rw)).st_mtime_ns == os.stat(str(template / "rw.txt")).st_mtime_ns
+    assert os.readlink(str(dest / "link")) == "sub/ro.txt"
+    assert (dest / "link").read_text() == "read-only\n"
+
+
+def test_reflink_is_preferred_and_keeps_mode_and_mtime(template, tmp_path, monkeypatch):
+    def fake_reflink(src, dst):
+        shutil.copyfile(src, dst)
+        return True
+
+    monkeypatch.setattr(scaffold, "reflink", fake_reflink)
+    dest = tmp_path / "out"
+    counts = TemplateIndex.load(str(template)).instantiate(dest)
+    assert counts == {"reflink": 2, "hardlink": 0, "copy": 0, "symlink": 1}
+    src, ro = template / "sub" / "ro.txt", dest / "sub" / "ro.txt"
+    assert not os.path.samefile(str(ro), str(src))
+    assert oct(os.stat(str(ro)).st_mode & 0o777) == "0o444"
+    assert os.stat(str(ro)).st_mtime_ns == os.stat(str(src)).st_mtime_ns
+
+
+def test_instantiate_over_an_existing_copy(template, tmp_path, monkeypatch):
+    monkeypatch.setattr(scaffold, "reflink", lambda src, dst: False)
+    index = TemplateIndex.load(str(template))
+    dest = tmp_path / "out"
+    index.instantiate(dest)
+    (dest / "rw.txt").write_text("edited\n")
+    assert index.instantiate(dest)["symlink"] == 1
+    assert (dest / "rw.txt").read_text() == "writable\n"
+    assert os.readlink(str(dest / "link")) == "sub/ro.txt"
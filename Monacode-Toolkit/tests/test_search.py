@@ -0,0 +1,48 @@
+import subprocess
+
+import pytest
+
+from monacode.search import CodeIndex, required_literals
+
+
+@pytest.fixture
+def indexed(tmp_path, monkeypatch):
+    for who in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{who}_NAME", "test")
+        monkeypatch.setenv(f"GIT_{who}_EMAIL", "test@example.com")
+    monkeypatch.setattr(CodeIndex, "SEGMENT_DOCS", 1)
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "fr.txt").write_text("une ÉCOLE normale\n")
+    for i in range(4):
+        (repo / f"f{i}.py").write_text(f"def handler_{i}():\n    return {i}\n")
+    subprocess.run(["git", "init", "-q"], cwd=str(repo), check=True)
+    subprocess.run(["git", "add", "-A"], cwd=str(repo), check=True)
+    subprocess.run(["git", "commit", "-q", "-m", "init"], cwd=str(repo), check=True)
+    index = CodeIndex(str(repo))
+    index.update()
+    yield index
+    index.close()
+
+
+def test_required_literals_skip_case_folded_non_ascii():
+    assert required_literals("école normale") == ["école normale"]
+    assert required_literals("(?i)école") == []
+    assert required_literals("école", ignore_case=True) == []
+    assert required_literals("une(?i:école)normale") == ["une", "normale"]
+    assert required_literals("(?i)handler") == ["handler"]
+
+
+@pytest.mark.parametrize("pattern", ["(?i)école", "une (?i:école)", "(?i)ÉCOLE norm"])
+def test_inline_ignore_case_finds_non_ascii(indexed, pattern):
+    hits = list(indexed.search(pattern, regex=True))
+    assert [(path, line) for path, line, _ in hits] == [("fr.txt", 1)]
+
+
+def test_search_survives_concurrent_rebuild(indexed):
+    results = indexed.search("handler_", files_only=True)
+    first = next(results)
+    # a rebuild from another process replaces and prunes every segment
+    CodeIndex(str(indexed.top)).update(rebuild=True)
+    rest = list(results)
+    assert sorted([first[0]] + [path for path, _, _ in rest]) == [f"f{i}.py" for i in range(4)]
@@ -0,0 +1,40 @@
+import os
+import sys
+import json
+import subprocess
+from pathlib import Path
+
+import pytest
+
+SRC = str(Path(__file__).resolve().parent.parent / "src")
+
+HEAVY = ("openai", "anthropic", "huggingface_hub", "monacode.llm")
+
+PROBE = """
+import sys, json
+from monacode.cli import cli
+try:
+    cli.main(args=sys.argv[1:], prog_name="monacode", standalone_mode=False)
+finally:
+    sys.stdout.flush()
+    sys.stderr.write(json.dumps(sorted(sys.modules)))
+"""
+
+
+def _modules_after(home: Path, *args: str) -> set:
+    env = dict(os.environ, HOME=str(home),
+               PYTHONPATH=os.pathsep.join(filter(None, [SRC, os.environ.get("PYTHONPATH")])))
+    proc = subprocess.run([sys.executable, "-c", PROBE, *args], env=env, cwd=str(home),
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    return set(json.loads(proc.stderr.decode().splitlines()[-1]))
+
+
+@pytest.mark.parametrize("args", [("env", "list"), ("config", "show"), ("--help",)])
+def test_command_does_not_import_llm(home, args):
+    modules = _modules_after(home, *args)
+    assert not [m for m in HEAVY if m in modules]
+
+
+def test_list_engines_imports_no_sdk(home):
+    modules = _modules_after(home, "llm", "list-engines")
+    assert not [m for m in HEAVY[:3] if m in modules]
@@ -0,0 +1,52 @@
+import json
+import time
+import threading
+
+from monacode.store import LRUStore
+from monacode.llm import CacheManager
+
+
+def test_close_stops_compactor(tmp_path):
+    store = LRUStore(tmp_path / "c.db", ttl=60, compact_interval=30)
+    thread = store._compactor
+    assert thread is not None and thread.is_alive()
+    store.close()
+    assert not thread.is_alive()
+    assert "monacode-cache-compactor" not in [t.name for t in threading.enumerate()]
+
+
+def test_ttl_none_never_expires(tmp_path):
+    store = LRUStore(tmp_path / "c.db", ttl=None)
+    assert store._compactor is None
+    store.set_many([("k", "v", 0.0)])
+    assert store.get("k") == "v"
+    store.close()
+
+
+def test_ttl_zero_disables_caching():
+    cache = CacheManager(ttl=0)
+    cache.set("k", "v")
+    assert cache.get("k") is None
+    assert cache.store.stats()["entries"] == 0
+    cache.close()
+
+
+def test_ttl_expires(tmp_path):
+    store = LRUStore(tmp_path / "c.db", ttl=10, compact_interval=0)
+    store.set_many([("old", 1, time.time() - 60), ("new", 2, time.time())])
+    assert store.get("old") is None
+    assert store.get("new") == 2
+    store.close()
+
+
+def test_json_migration(home):
+    legacy = home / ".monacode" / "cache" / "llm_cache.json"
+    legacy.parent.mkdir(parents=True)
+    legacy.write_text(json.dumps({"k": {"ts": time.time(), "result": "r"}}))
+    cache = CacheManager(ttl=None)
+    assert cache.get("k") == "r"
+    assert not legacy.exists()
+    assert legacy.with_suffix(".json.migrated").exists()
+    # a second instance finds nothing left to import
+    cache._migrate_json(legacy)
+    cache.close()
@@ -0,0 +1,75 @@
+import pytest
+
+from monacode import agent
+from monacode.utils import VaultError, VaultManager
+
+
+@pytest.fixture
+def vault(monkeypatch):
+    monkeypatch.setattr(VaultManager, "ITERATIONS", 1000)
+    return VaultManager()
+
+
+def test_reads_do_not_create_the_store(vault):
+    with pytest.raises(VaultError, match="not found"):
+        vault.get_secret("A", password="typo")
+    assert vault.export_secrets(password="typo") == {}
+    assert not vault.check_path.exists()
+
+    vault.add_secret("A", "1", password="right")
+    with pytest.raises(VaultError, match="wrong password"):
+        vault.get_secret("A", password="typo")
+    assert vault.get_secret("A", password="right") == "1"
+
+
+def test_unlock_requires_a_vault(vault):
+    with pytest.raises(VaultError, match="empty"):
+        vault.unlock(password="pw")
+
+
+def test_swapped_entries_are_rejected(vault):
+    vault.add_many({"A": "1", "B": "2"}, password="pw")
+    fernet, id_key = vault._open(vault._get_key("pw"))
+    a, b = vault._entry_path(id_key, "A"), vault._entry_path(id_key, "B")
+    data = a.read_bytes()
+    a.write_bytes(b.read_bytes())
+    b.write_bytes(data)
+    with pytest.raises(VaultError, match="another key"):
+        vault.get_secret("A", password="pw")
+
+
+def test_lookup_tolerates_undecryptable_entries(vault, monkeypatch):
+    vault.add_secret("A", "1", password="pw")
+    key = vault._get_key("pw")
+    monkeypatch.setattr(agent, "agent_key", lambda home: key)
+    assert vault.lookup("A") == "1"
+
+    _, id_key = vault._open(key)
+    vault._entry_path(id_key, "A").write_bytes(b"garbage")
+    with pytest.raises(VaultError, match="decrypt"):
+        vault.get_secret("A", password="pw")
+    assert vault.lookup("A") is None
+
+
+def test_v1_vault_is_migrated_on_read(vault):
+    import json
+    from cryptography.fernet import Fernet
+
+    key = vault._get_key("pw")
+    vault.data_path.write_bytes(Fernet(key).encrypt(json.dumps({"A": "1"}).encode()))
+    assert vault.get_secret("A", password="pw") == "1"
+    assert vault.check_path.exists() and not vault.data_path.exists()
+
+
+def test_json_import_keeps_nested_values_as_json(vault):
+    import json
+    from click.testing import CliRunner
+    from monacode.cli import cli
+
+    source = {"S": "plain", "N": 1.5, "B": True, "OBJ": {"a": [1, "x"]}, "LIST": ["a"]}
+    result = CliRunner().invoke(cli, ["vault", "import", "-p", "pw"], input=json.dumps(source))
+    assert result.exit_code == 0, result.output
+    stored = vault.export_secrets(password="pw")
+    assert stored == {"S": "plain", "N": "1.5", "B": "true",
+                      "OBJ": '{"a": [1, "x"]}', "LIST": '["a"]'}
+    assert json.loads(stored["OBJ"]) == source["OBJ"]